@@ -0,0 +1,121 @@
+"""Synthetic CF datasets standing in for the THREDDS datasets xview serves.
+
+Every generator is deterministic for a given size, so results are comparable
+across commits. ``size`` is the approximate number of observations.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+SIZES = {"small": 10_000, "medium": 200_000, "large": 2_000_000}
+N_STATIONS = 10
+N_DEPTHS = 20
+
+
+def _rng(size: int) -> np.random.Generator:
+    return np.random.default_rng(size)
+
+
+def _station_names() -> np.ndarray:
+    return np.array([f"ST{i:03d}".encode() for i in range(N_STATIONS)])
+
+
+def time_series(size: int) -> xr.Dataset:
+    """Orthogonal multi-station timeSeries, ``(station, time)`` with a ``timeseries_id`` variable."""
+    rng = _rng(size)
+    n_time = max(1, size // N_STATIONS)
+    shape = (N_STATIONS, n_time)
+    lon = {"standard_name": "longitude", "units": "degrees_east"}
+    lat = {"standard_name": "latitude", "units": "degrees_north"}
+    return xr.Dataset(
+        {
+            "temperature": (("station", "time"), rng.normal(8, 3, shape), {"units": "degC"}),
+            "salinity": (("station", "time"), rng.normal(33, 1, shape), {"units": "1e-3"}),
+            "station_name": ("station", _station_names(), {"cf_role": "timeseries_id"}),
+        },
+        coords={
+            "time": ("time", pd.date_range("2020-01-01", periods=n_time, freq="10min"), {"standard_name": "time"}),
+            "longitude": ("station", np.linspace(5, 12, N_STATIONS), lon),
+            "latitude": ("station", np.linspace(58, 64, N_STATIONS), lat),
+        },
+        attrs={"featureType": "timeSeries", "title": f"benchmark timeSeries {size}"},
+    )
+
+
+def trajectory(size: int) -> xr.Dataset:
+    """A single ship track along ``time``, like a FerryBox dataset."""
+    rng = _rng(size)
+    t = np.arange(size)
+    return xr.Dataset(
+        {
+            "temperature": ("time", rng.normal(8, 3, size), {"units": "degC", "long_name": "Temperature"}),
+            "chlorophyll": ("time", np.abs(rng.normal(2, 1, size)), {"units": "mg m-3", "long_name": "Chlorophyll"}),
+        },
+        coords={
+            "time": ("time", pd.date_range("2020-01-01", periods=size, freq="1min"), {"standard_name": "time"}),
+            "longitude": ("time", 10 + np.sin(t / 5000), {"standard_name": "longitude", "units": "degrees_east"}),
+            "latitude": ("time", 59 + np.cos(t / 5000), {"standard_name": "latitude", "units": "degrees_north"}),
+        },
+        attrs={"featureType": "trajectory", "title": f"benchmark trajectory {size}"},
+    )
+
+
+def tsp_orthogonal(size: int) -> xr.Dataset:
+    """A single-station orthogonal timeSeriesProfile, ``(time, depth)``."""
+    rng = _rng(size)
+    n_time = max(1, size // N_DEPTHS)
+    shape = (n_time, N_DEPTHS)
+    return xr.Dataset(
+        {"temperature": (("time", "depth"), rng.normal(8, 3, shape), {"units": "degC", "long_name": "Temperature"})},
+        coords={
+            "time": ("time", pd.date_range("2020-01-01", periods=n_time, freq="h"), {"standard_name": "time"}),
+            "depth": ("depth", np.arange(N_DEPTHS, dtype=float), {"standard_name": "depth", "positive": "down"}),
+        },
+        attrs={"featureType": "timeSeriesProfile", "title": f"benchmark timeSeriesProfile {size}"},
+    )
+
+
+def tsp_ragged(size: int) -> xr.Dataset:
+    """A multi-station ragged timeSeriesProfile (CF H.5.3: indexed stations, contiguous profiles)."""
+    rng = _rng(size)
+    n_profiles = max(1, size // N_DEPTHS)
+    row_size = rng.integers(N_DEPTHS // 2, N_DEPTHS * 3 // 2 + 1, n_profiles)
+    n_obs = int(row_size.sum())
+    depth = np.concatenate([np.arange(n, dtype=float) for n in row_size])
+    lon = {"standard_name": "longitude", "units": "degrees_east"}
+    lat = {"standard_name": "latitude", "units": "degrees_north"}
+    return xr.Dataset(
+        {
+            "station_name": ("station", _station_names(), {"cf_role": "timeseries_id"}),
+            "lon": ("station", np.linspace(5, 12, N_STATIONS), lon),
+            "lat": ("station", np.linspace(58, 64, N_STATIONS), lat),
+            "stationIndex": ("profile", np.arange(n_profiles) % N_STATIONS, {"instance_dimension": "station"}),
+            "rowSize": ("profile", row_size, {"sample_dimension": "obs"}),
+            "time": ("profile", pd.date_range("2020-01-01", periods=n_profiles, freq="h"), {"standard_name": "time"}),
+            "z": ("obs", depth, {"standard_name": "depth", "positive": "down", "units": "m"}),
+            "temperature": ("obs", rng.normal(8, 3, n_obs), {"units": "degC", "long_name": "Temperature"}),
+        },
+        attrs={"featureType": "timeSeriesProfile", "title": f"benchmark ragged timeSeriesProfile {size}"},
+    )
+
+
+KINDS = {
+    "timeSeries": time_series,
+    "trajectory": trajectory,
+    "tsp_orthogonal": tsp_orthogonal,
+    "tsp_ragged": tsp_ragged,
+}
+
+
+def path(directory: str, kind: str, size: int) -> str:
+    """Write the *kind* dataset of *size* to *directory* once and return its path."""
+    os.makedirs(directory, exist_ok=True)
+    file = os.path.join(directory, f"{kind}-{size}.nc")
+    if not os.path.exists(file):
+        tmp = f"{file}.{os.getpid()}.tmp"
+        KINDS[kind](size).to_netcdf(tmp)
+        os.replace(tmp, file)
+    return file
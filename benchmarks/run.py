@@ -0,0 +1,309 @@
+"""Benchmark /data, the ragged expansion, JSON conversion, station subsetting and the viewer plots.
+
+Synthetic datasets (see ``benchmarks/datasets.py``) are written to local
+NetCDF files and opened by path, standing in for THREDDS. Each case runs in
+a forked process, so its peak RSS is not inflated by earlier cases.
+
+    python -m benchmarks.run --sizes small,medium --output results.json
+    python -m benchmarks.run --compare results.json --output new.json
+"""
+
+import argparse
+import functools
+import json
+import multiprocessing
+import os
+import platform
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable
+
+import xarray as xr
+
+from benchmarks import datasets
+
+FORMATS = ["json", "csv", "html", "arrow", "parquet", "netcdf"]
+
+
+@dataclass
+class Case:
+    name: str
+    kind: str
+    size: int
+    # Returns (rows, bytes) produced by one run
+    run: Callable[[], tuple[int, int]]
+    setup: Callable[[], None] = lambda: None
+
+
+def _rss_mb() -> float | None:
+    """Current resident set size in MB (Linux only)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return None
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+@functools.cache
+def _data_client():
+    from fastapi.testclient import TestClient
+
+    from xview.main import app
+
+    return TestClient(app)
+
+
+def _clear_caches() -> None:
+    """Forget responses and plots, keeping the dataset handles warm as in a running server."""
+    from xview import httpcache, viewer
+
+    httpcache.RESPONSES.clear()
+    httpcache.VERSIONS.clear()
+    viewer.PLOTS.clear()
+
+
+def _data_cases(kind: str, size: int, file: str) -> list[Case]:
+    def run(f: str) -> tuple[int, int]:
+        response = _data_client().get("/data", params={"url": file, "f": f})
+        response.raise_for_status()
+        return size, len(response.content)
+
+    return [Case(f"data[{f}]", kind, size, lambda f=f: run(f), _clear_caches) for f in FORMATS]
+
+
+def _function_cases(kind: str, size: int, file: str) -> list[Case]:
+    import holoviews as hv
+
+    from xview import utils, viewer
+
+    # Loaded on the warm-up run, so only the forked process running the case pays for it
+    load = functools.cache(lambda: xr.open_dataset(file).load())
+
+    def render(plot) -> None:
+        if isinstance(plot, hv.core.Dimensioned):
+            hv.render(plot, backend="bokeh")
+
+    cases = []
+    if kind == "tsp_ragged":
+
+        def expand():
+            return len(utils.expand_ragged_tsp(load())), 0
+
+        def ragged_plot():
+            plot = viewer.tsp_ragged_plot_widget("ST001", "temperature", file, "time", "z", "station_name")
+            render(plot)
+            return size // datasets.N_STATIONS, 0
+
+        cases += [
+            Case("expand_ragged_tsp", kind, size, expand),
+            Case("tsp_ragged_plot_widget", kind, size, ragged_plot, _clear_caches),
+        ]
+
+    if kind == "trajectory":
+
+        def to_json_types(fill_nan: bool):
+            utils.to_json_types(load(), fill_nan=fill_nan)
+            return size, 0
+
+        def time_plot():
+            render(viewer.time_plot_widget("temperature", load(), "time", None, None, None))
+            return size, 0
+
+        def map_plot():
+            ds = load()
+            end = ds.indexes["time"][-1].to_pydatetime()
+            start = ds.indexes["time"][0].to_pydatetime()
+            render(viewer.map_plot_widget(ds, "temperature", "time", end, start, None, True))
+            return size, 0
+
+        cases += [
+            Case("to_json_types[fill_nan]", kind, size, lambda: to_json_types(True)),
+            Case("to_json_types", kind, size, lambda: to_json_types(False)),
+            Case("time_plot_widget", kind, size, time_plot, _clear_caches),
+            Case("map_plot_widget", kind, size, map_plot, _clear_caches),
+        ]
+
+    if kind == "timeSeries":
+
+        def subset():
+            return utils.subset_by_timeseries_id(load(), "ST005").sizes["time"], 0
+
+        def station_plot():
+            render(viewer.multi_station_time_plot_widget("temperature", "ST005", load(), "time", None, None, None))
+            return size // datasets.N_STATIONS, 0
+
+        cases += [
+            Case("subset_by_timeseries_id", kind, size, subset),
+            Case("multi_station_time_plot_widget", kind, size, station_plot, _clear_caches),
+        ]
+
+    if kind == "tsp_orthogonal":
+
+        def heatmap():
+            render(viewer.tsp_heatmap_widget("temperature", load(), "time", "depth", None, None, None))
+            return size, 0
+
+        cases.append(Case("tsp_heatmap_widget", kind, size, heatmap, _clear_caches))
+    return cases
+
+
+def cases(directory: str, sizes: dict[str, int]) -> list[tuple[str, Callable[[], list[Case]]]]:
+    """Return ``(prefix, factory)`` pairs of case groups, one per dataset kind and size."""
+    result = []
+    for label, size in sizes.items():
+        for kind in datasets.KINDS:
+            prefix = f"{kind}/{label}"
+
+            def factory(kind=kind, size=size):
+                file = datasets.path(directory, kind, size)
+                return _data_cases(kind, size, file) + _function_cases(kind, size, file)
+
+            result.append((prefix, factory))
+    return result
+
+
+def _measure(factory: Callable[[], list[Case]], name: str, repeat: int, conn) -> None:
+    """Child process: run one case *repeat* times after a warm-up and send back its numbers."""
+    try:
+        case = next(c for c in factory() if c.name == name)
+        rss_start = _rss_mb()
+        case.setup()
+        case.run()
+        timings = []
+        for _ in range(repeat):
+            case.setup()
+            start = time.perf_counter()
+            rows, nbytes = case.run()
+            timings.append(time.perf_counter() - start)
+        conn.send(
+            {
+                "timings": timings,
+                "rows": rows,
+                "bytes": nbytes,
+                "rss_start_mb": rss_start,
+                "peak_rss_mb": _peak_rss_mb(),
+            }
+        )
+    except Exception as e:
+        conn.send({"error": f"{type(e).__name__}: {e}"})
+    finally:
+        conn.close()
+
+
+def run_case(factory, name: str, repeat: int) -> dict:
+    ctx = multiprocessing.get_context("fork")
+    parent, child = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_measure, args=(factory, name, repeat, child))
+    process.start()
+    child.close()
+    try:
+        result = parent.recv()
+    except EOFError:
+        result = None
+    process.join()
+    return result if result is not None else {"error": f"benchmark process exited with code {process.exitcode}"}
+
+
+def summarize(name: str, case: Case, result: dict) -> dict:
+    entry = {"name": name, "kind": case.kind, "size": case.size}
+    if "error" in result:
+        return {**entry, "error": result["error"]}
+    timings = result["timings"]
+    median = statistics.median(timings)
+    return {
+        **entry,
+        "seconds": {"min": min(timings), "median": median, "mean": statistics.fmean(timings), "max": max(timings)},
+        "rows": result["rows"],
+        "bytes": result["bytes"],
+        "rows_per_second": result["rows"] / median if median else None,
+        "mb_per_second": result["bytes"] / 2**20 / median if median and result["bytes"] else None,
+        "peak_rss_mb": result["peak_rss_mb"],
+        "rss_growth_mb": None if result["rss_start_mb"] is None else result["peak_rss_mb"] - result["rss_start_mb"],
+    }
+
+
+def _commit() -> str | None:
+    try:
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        git = subprocess.run(["git", "rev-parse", "HEAD"], cwd=root, capture_output=True, text=True, check=True)
+        return git.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous: dict, current: dict, threshold: float) -> list[str]:
+    """Return one line per case whose median time grew by more than *threshold* (a ratio)."""
+    before = {r["name"]: r for r in previous["results"] if "seconds" in r}
+    lines = []
+    for result in current["results"]:
+        old = before.get(result["name"])
+        if old is None or "seconds" not in result:
+            continue
+        ratio = result["seconds"]["median"] / old["seconds"]["median"]
+        if ratio > threshold:
+            old_median, new_median = old["seconds"]["median"], result["seconds"]["median"]
+            lines.append(f"{result['name']}: {old_median:.4f}s -> {new_median:.4f}s ({ratio:.2f}x)")
+    return lines
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="small,medium", help=f"comma separated, from {', '.join(datasets.SIZES)}")
+    parser.add_argument("--filter", default="", help="only run cases whose name matches this regular expression")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "xview-benchmarks"))
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="slowdown ratio reported as a regression")
+    args = parser.parse_args(argv)
+
+    sizes = {label: datasets.SIZES[label] for label in args.sizes.split(",")}
+    pattern = re.compile(args.filter)
+    results = []
+    for prefix, factory in cases(args.data_dir, sizes):
+        for case in factory():
+            name = f"{prefix}/{case.name}"
+            if not pattern.search(name):
+                continue
+            entry = summarize(name, case, run_case(factory, case.name, args.repeat))
+            results.append(entry)
+            if "error" in entry:
+                print(f"{name:60s} ERROR {entry['error']}", flush=True)
+            else:
+                print(f"{name:60s} {entry['seconds']['median']:9.4f}s {entry['peak_rss_mb']:8.1f} MB", flush=True)
+
+    report = {
+        "commit": _commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        for line in regressions:
+            print("REGRESSION", line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
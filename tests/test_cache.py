@@ -0,0 +1,63 @@
+import os
+import time
+
+import numpy as np
+import xarray as xr
+
+from xview import cache
+from xview.cache import LRUCache, normalize_url
+
+
+def test_lru_eviction():
+    c = LRUCache(maxsize=2)
+    c.put("a", 1)
+    c.put("b", 2)
+    c.get("a")
+    c.put("c", 3)
+    assert "a" in c
+    assert "b" not in c
+    assert len(c) == 2
+
+
+def test_byte_budget():
+    c = LRUCache(maxsize=10, maxbytes=10)
+    c.put("a", b"12345")
+    c.put("b", b"1234")
+    c.put("c", b"123")
+    assert "a" not in c and "b" in c and "c" in c
+    assert c.nbytes == 7
+    c.put("d", b"x" * 11)
+    assert "d" not in c and c.nbytes == 7
+
+
+def test_ttl_expiry():
+    c = LRUCache(maxsize=2, ttl=0.01)
+    c.put("a", 1)
+    time.sleep(0.02)
+    assert c.get("a") is None
+
+
+def test_get_or_create_runs_factory_once():
+    c = LRUCache(maxsize=2)
+    calls = []
+    for _ in range(3):
+        c.get_or_create("a", lambda: calls.append(1) or "value")
+    assert calls == [1]
+    assert (c.hits, c.misses) == (2, 1)
+
+
+def test_normalize_url():
+    assert normalize_url(" HTTPS://Thredds.NIVA.no:443/thredds/dodsC/x.nc#frag") == "https://thredds.niva.no/thredds/dodsC/x.nc"
+    assert normalize_url("http://host:8080/a.nc?x") == "http://host:8080/a.nc?x"
+    assert normalize_url("data/x.nc") == os.path.abspath("data/x.nc")
+
+
+def test_open_dataset_is_cached_and_isolated(tmp_path):
+    path = str(tmp_path / "ds.nc")
+    xr.Dataset({"temp": ("time", np.arange(3.0))}).to_netcdf(path)
+    cache.DATASETS.clear()
+
+    ds = cache.open_dataset(path)
+    ds["extra"] = ds["temp"] * 2
+    assert len(cache.DATASETS) == 1
+    assert "extra" not in cache.open_dataset(path)
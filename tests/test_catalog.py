@@ -0,0 +1,61 @@
+import asyncio
+
+import httpx
+
+from xview import catalog
+
+ROOT = "https://thredds.example.org/thredds/catalog.xml"
+SUB = "https://thredds.example.org/thredds/catalog/sub/niva.xml"
+
+CATALOGS = {
+    ROOT: """<catalog xmlns="http://www.unidata.ucar.edu/namespaces/thredds/InvCatalog/v1.0"
+        xmlns:xlink="http://www.w3.org/1999/xlink">
+      <service name="all" serviceType="Compound" base="">
+        <service name="odap" serviceType="OpenDAP" base="/thredds/dodsC/" />
+      </service>
+      <dataset name="a" urlPath="a.nc"><serviceName>all</serviceName></dataset>
+      <catalogRef xlink:href="sub/niva.xml" />
+      <catalogRef xlink:href="missing/catalog.xml" />
+    </catalog>""",
+    SUB: """<catalog xmlns="http://www.unidata.ucar.edu/namespaces/thredds/InvCatalog/v1.0">
+      <dataset name="b" urlPath="sub/b.nc"><serviceName>all</serviceName></dataset>
+      <dataset name="c" urlPath="sub/c.nc"><serviceName>http</serviceName></dataset>
+    </catalog>""",
+}
+
+
+def _transport(seen, fail_once=()):
+    failed = set()
+
+    def handler(request):
+        url = str(request.url)
+        seen.append((url, request.headers.get("if-none-match")))
+        if url in fail_once and url not in failed:
+            failed.add(url)
+            return httpx.Response(503)
+        if url not in CATALOGS:
+            return httpx.Response(404)
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, text=CATALOGS[url], headers={"ETag": '"v1"'})
+
+    return httpx.MockTransport(handler)
+
+
+def test_crawl_catalog(monkeypatch):
+    monkeypatch.setattr(catalog, "_RESPONSES", catalog.LRUCache(maxsize=16))
+    sleep = asyncio.sleep
+    monkeypatch.setattr(catalog.asyncio, "sleep", lambda s: sleep(0))
+    expected = {
+        "catalog": ["https://thredds.example.org/thredds/dodsC/a.nc"],
+        "niva": ["https://thredds.example.org/thredds/dodsC/sub/b.nc"],
+    }
+
+    seen = []
+    assert asyncio.run(catalog.crawl_catalog(ROOT, transport=_transport(seen, fail_once={SUB}))) == expected
+    assert [url for url, _ in seen].count(SUB) == 2
+
+    # Recrawl revalidates instead of downloading again
+    seen.clear()
+    assert asyncio.run(catalog.crawl_catalog(ROOT, transport=_transport(seen))) == expected
+    assert (ROOT, '"v1"') in seen and (SUB, '"v1"') in seen
@@ -0,0 +1,103 @@
+import asyncio
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from xview import catalogindex
+
+
+def _station(n_stations, lon, start):
+    return xr.Dataset(
+        {
+            "station_name": ("station", [f"S{i}" for i in range(n_stations)], {"cf_role": "timeseries_id"}),
+            "temp": (("time", "station"), np.zeros((3, n_stations)), {"standard_name": "sea_water_temperature"}),
+            "lon": ("station", np.full(n_stations, lon), {"standard_name": "longitude"}),
+            "lat": ("station", np.linspace(59, 60, n_stations), {"standard_name": "latitude"}),
+        },
+        coords={"time": pd.date_range(start, periods=3, freq="D")},
+        attrs={"title": f"stations at {lon}", "featureType": "timeSeries"},
+    )
+
+
+def test_describe_and_search(tmp_path):
+    path = str(tmp_path / "index.sqlite")
+    a = catalogindex.describe_dataset("a.nc", _station(2, 10.0, "2020-01-01"))
+    assert (a["lon_min"], a["lat_min"], a["lon_max"], a["lat_max"]) == (10.0, 59.0, 10.0, 60.0)
+    assert (a["time_start"], a["time_end"]) == ("2020-01-01T00:00:00", "2020-01-03T00:00:00")
+    assert a["stations"] == ["S0", "S1"]
+
+    with catalogindex.connect(path) as conn:
+        catalogindex.upsert(conn, "https://h/a.nc", "root", "cat", a)
+        b = catalogindex.describe_dataset("b.nc", _station(1, 5.0, "2021-01-01"))
+        catalogindex.upsert(conn, "https://h/b.nc", "root", "cat", b)
+        catalogindex.upsert(conn, "https://h/a.nc", "root", "cat", a)
+
+    with catalogindex.connect(path) as conn:
+
+        def urls(**filters):
+            return [d["url"] for d in catalogindex.search(conn, **filters)]
+
+        assert urls() == ["https://h/a.nc", "https://h/b.nc"]
+        assert urls(bbox=(9.0, 58.0, 11.0, 61.0)) == ["https://h/a.nc"]
+        assert urls(start=datetime(2020, 12, 1)) == ["https://h/b.nc"]
+        assert urls(start=datetime(2020, 1, 2), end=datetime(2020, 1, 2)) == ["https://h/a.nc"]
+        assert urls(variable="SEA_WATER_TEMPERATURE") == ["https://h/a.nc", "https://h/b.nc"]
+        assert urls(station="S1") == ["https://h/a.nc"]
+        assert urls(station="S1", bbox=(0, 0, 6, 90)) == []
+        result = catalogindex.search(conn, station="S0", limit=1)[0]
+        assert result["variables"] == ["station_name", "temp", "lon", "lat"]
+        assert result["timeseries_ids"] == ["S0", "S1"]
+
+
+def test_refresh_is_incremental(tmp_path, monkeypatch):
+    path = str(tmp_path / "index.sqlite")
+    files = [str(tmp_path / f"{name}.nc") for name in "ab"]
+    for i, f in enumerate(files):
+        _station(1, float(i), "2020-01-01").to_netcdf(f)
+    listing = {"cat": files}
+
+    async def crawl(catalog_base):
+        return listing
+
+    monkeypatch.setattr(catalogindex.catalog, "crawl_catalog", crawl)
+    assert asyncio.run(catalogindex.refresh("root", path)) == 2
+    assert asyncio.run(catalogindex.refresh("root", path)) == 0
+
+    listing = {"cat": files[:1]}
+    assert asyncio.run(catalogindex.refresh("root", path)) == 0
+    with catalogindex.connect(path) as conn:
+        assert [d["url"] for d in catalogindex.search(conn)] == files[:1]
+
+
+def test_index_lives_in_data_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(catalogindex.SETTINGS, "catalog_index_path", "")
+    monkeypatch.setattr(catalogindex.SETTINGS, "data_dir", str(tmp_path / "state"))
+    assert catalogindex.index_path() == str(tmp_path / "state" / "catalog.sqlite")
+    assert not catalogindex.exists()
+    with catalogindex.connect():
+        pass
+    assert catalogindex.exists()
+
+
+def test_only_one_worker_refreshes(monkeypatch, tmp_path):
+    monkeypatch.setattr(catalogindex.SETTINGS, "catalog_index_path", str(tmp_path / "index.sqlite"))
+    refreshed = []
+
+    async def refresh(catalog_base):
+        refreshed.append(catalog_base)
+        return 0
+
+    monkeypatch.setattr(catalogindex, "refresh", refresh)
+
+    async def run():
+        # Each task opens the lock file itself, so they exclude each other like separate processes
+        tasks = [asyncio.create_task(catalogindex.refresh_forever(name, interval=0.01)) for name in "ab"]
+        await asyncio.sleep(0.1)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run(run())
+    assert len(refreshed) > 1 and len(set(refreshed)) == 1
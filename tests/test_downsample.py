@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from xview.downsample import downsample, lttb_indices, minmax_indices
+
+
+def _series(n=10000):
+    y = np.sin(np.linspace(0, 20, n))
+    y[1234] = 50.0
+    y[4321] = -50.0
+    y[100:200] = np.nan
+    return y
+
+
+def test_minmax_keeps_extremes():
+    y = _series()
+    idx = minmax_indices(y, 200)
+    assert len(idx) <= 202
+    assert {0, 1234, 4321, len(y) - 1} <= set(idx)
+    assert not np.isnan(y[idx[1:-1]]).any()
+
+
+def test_lttb_keeps_spikes():
+    y = _series()
+    x = pd.date_range("2020-01-01", periods=len(y), freq="min").values
+    idx = lttb_indices(x, y, 500)
+    assert len(idx) == 500
+    assert np.all(np.diff(idx) > 0)
+    assert {1234, 4321} <= set(idx)
+
+
+def test_small_input_unchanged():
+    assert list(lttb_indices(np.arange(5), np.arange(5.0), 10)) == [0, 1, 2, 3, 4]
+    assert list(minmax_indices(np.arange(5.0), 10)) == [0, 1, 2, 3, 4]
+
+
+def test_downsample_dataset():
+    n = 10000
+    ds = xr.Dataset(
+        {"a": ("time", _series(n)), "b": ("time", np.arange(n, dtype=float))},
+        coords={"time": pd.date_range("2020-01-01", periods=n, freq="min")},
+    )
+    out = downsample(ds, 1000)
+    assert out.sizes["time"] <= 1004
+    assert out["a"].max() == 50.0 and out["a"].min() == -50.0
+    assert out["b"].max() == n - 1
+    assert downsample(ds, n) is ds
+
+
+def test_downsample_keeps_extremes_of_2d_variables():
+    n = 10000
+    temp = np.zeros((2, n))
+    temp[1, 1234] = 99.0
+    temp[0, 4321] = -99.0
+    ds = xr.Dataset(
+        {"temp": (("station", "time"), temp), "profile": (("time", "depth"), np.zeros((n, 3)))},
+        coords={"time": pd.date_range("2020-01-01", periods=n, freq="min")},
+    )
+    ds["profile"][5678, 2] = 7.0
+    out = downsample(ds, 100)
+    assert out.sizes["time"] <= 104
+    assert out["temp"].max() == 99.0 and out["temp"].min() == -99.0
+    assert out["profile"].max() == 7.0
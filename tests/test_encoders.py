@@ -0,0 +1,87 @@
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import xarray as xr
+
+from xview import encoders
+from xview.utils import to_json_types
+
+
+def _timeseries(n=5):
+    return xr.Dataset(
+        {
+            "temp": ("time", np.linspace(0, 1, n)),
+            "precip": ("time", [np.nan] + [0.1] * (n - 1)),
+        },
+        coords={"time": ("time", pd.date_range("2020-01-01", periods=n))},
+    )
+
+
+def test_iter_csv_matches_to_csv():
+    ds = _timeseries()
+    expected = to_json_types(ds.copy(), fill_nan=False).to_dataframe().to_csv()
+    assert "".join(encoders.iter_csv(ds, block_size=2)) == expected
+
+
+def test_iter_csv_profile():
+    ds = xr.Dataset(
+        {"temp": (("time", "depth"), np.arange(12.0).reshape(4, 3))},
+        coords={"time": pd.date_range("2020-01-01", periods=4), "depth": [1, 5, 10]},
+    )
+    expected = to_json_types(ds.copy(), fill_nan=False).to_dataframe().to_csv()
+    assert "".join(encoders.iter_csv(ds, block_size=3)) == expected
+
+
+def test_iter_csv_empty():
+    ds = _timeseries().isel(time=slice(0, 0))
+    assert "".join(encoders.iter_csv(ds, block_size=2)) == "time,temp,precip\n"
+
+
+def test_iter_df_csv_matches_to_csv():
+    df = pd.DataFrame({"a": range(5), "b": list("abcde")})
+    assert "".join(encoders.iter_df_csv(df, block_size=2)) == df.to_csv(index=False)
+
+
+def test_iter_json_matches_to_dict():
+    ds = _timeseries()
+    ds["count"] = ("time", np.arange(5))
+    ds["name"] = ("time", np.array([b"a", b"b", b"c", b"d", b"e"]))
+    ds["temp"].attrs = {"units": "degC", "valid_min": np.float32(-2)}
+    ds.attrs = {"title": "test"}
+
+    for exclude_data in (False, True):
+        expected = json.dumps(to_json_types(ds.copy()).to_dict(data=False if exclude_data else "list"))
+        assert "".join(encoders.iter_json(ds, exclude_data=exclude_data, block_size=2)) == expected
+
+
+def test_iter_json_nan_to_null():
+    ds = xr.Dataset({"temp": (("time", "depth"), [[1.0, np.nan], [np.nan, 4.0]])})
+    doc = json.loads("".join(encoders.iter_json(ds, block_size=1)))
+    assert doc["data_vars"]["temp"]["data"] == [[1.0, None], [None, 4.0]]
+
+
+def test_iter_arrow_and_parquet_roundtrip():
+    ds = _timeseries()
+    ds["temp"].attrs = {"units": "degC", "valid_min": -2}
+    ds.attrs = {"title": "test"}
+    expected = ds.to_dataframe().reset_index()
+
+    arrow = pa.ipc.open_stream(b"".join(encoders.iter_arrow(ds, block_size=2))).read_all()
+    parquet = pq.read_table(io.BytesIO(b"".join(encoders.iter_parquet(ds, block_size=2))))
+    for table in (arrow, parquet):
+        pd.testing.assert_frame_equal(table.to_pandas(), expected, check_dtype=False)
+        assert table.schema.field("temp").metadata == {b"units": b"degC", b"valid_min": b"-2"}
+        assert table.schema.metadata == {b"title": b"test"}
+
+
+def test_iter_netcdf_roundtrip(tmp_path):
+    ds = _timeseries()
+    ds["temp"].attrs = {"units": "degC"}
+    path = tmp_path / "out.nc"
+    path.write_bytes(b"".join(encoders.iter_netcdf(ds)))
+    with xr.open_dataset(path) as out:
+        xr.testing.assert_identical(out.load(), ds)
@@ -0,0 +1,38 @@
+import asyncio
+import threading
+import time
+
+from xview import executor
+
+
+def test_upstream_host():
+    assert executor.upstream_host("https://Thredds.niva.no/thredds/dodsC/x.nc") == "thredds.niva.no"
+    assert executor.upstream_host("/data/x.nc") == ""
+
+
+def test_run_limits_concurrency_per_host(monkeypatch):
+    monkeypatch.setattr(executor.SETTINGS, "upstream_concurrency", 1)
+    monkeypatch.setattr(executor, "_HOST_LIMITS", {})
+    lock = threading.Lock()
+    active = {"now": 0, "max": 0}
+
+    def work():
+        with lock:
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+        time.sleep(0.02)
+        with lock:
+            active["now"] -= 1
+
+    async def main():
+        await asyncio.gather(*(executor.run("http://slow.example/x.nc", work) for _ in range(3)))
+
+    asyncio.run(main())
+    assert active["max"] == 1
+
+
+def test_iterate():
+    async def main():
+        return [item async for item in executor.iterate("/data/x.nc", iter(range(3)))]
+
+    assert asyncio.run(main()) == [0, 1, 2]
@@ -0,0 +1,56 @@
+import asyncio
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from xview import httpcache
+
+
+def _dataset(n, **attrs):
+    return xr.Dataset(
+        {"temp": ("time", np.arange(n, dtype=float))},
+        coords={"time": pd.date_range("2020-01-01", periods=n, freq="h")},
+        attrs=attrs,
+    )
+
+
+def test_query_key_is_normalized():
+    a = httpcache.query_key("HTTPS://Host:443/x.nc", "sal, temp", datetime(2020, 1, 1), None, None, "csv")
+    b = httpcache.query_key("https://host/x.nc", "temp,sal", datetime(2020, 1, 1), None, None, "csv")
+    assert a == b
+    assert a != httpcache.query_key("https://host/x.nc", "temp", datetime(2020, 1, 1), None, None, "csv")
+
+
+def test_version_follows_dataset(monkeypatch):
+    monkeypatch.setattr(httpcache, "VERSIONS", httpcache.LRUCache(maxsize=4))
+    assert httpcache.known_version("/data/v.nc") is None
+    v1 = httpcache.dataset_version("/data/v.nc", _dataset(10))
+    assert httpcache.known_version("/data/v.nc") == v1
+    assert v1.last_modified == datetime.fromisoformat("2020-01-01T09:00:00+00:00")
+    assert httpcache.dataset_version("/data/v.nc", _dataset(10)).tag == v1.tag
+    assert httpcache.dataset_version("/data/v.nc", _dataset(11)).tag != v1.tag
+    v2 = httpcache.dataset_version("/data/v.nc", _dataset(11, date_modified="2024-05-01T12:00:00Z"))
+    assert v2.last_modified == datetime.fromisoformat("2024-05-01T12:00:00+00:00")
+
+
+def test_matches():
+    assert httpcache.matches('"a", W/"b"', '"b"')
+    assert httpcache.matches("*", '"c"')
+    assert not httpcache.matches('"a"', '"c"')
+    assert not httpcache.matches(None, '"c"')
+
+
+def test_record_stores_complete_body(monkeypatch):
+    monkeypatch.setattr(httpcache, "RESPONSES", httpcache.LRUCache(maxsize=4))
+
+    async def body():
+        for chunk in ("a,b\n", "1,2\n"):
+            yield chunk
+
+    async def main():
+        return [c async for c in httpcache.record('"t"', body(), "text/csv", "utf-8")]
+
+    assert asyncio.run(main()) == ["a,b\n", "1,2\n"]
+    assert httpcache.RESPONSES.get('"t"') == httpcache.CachedResponse(body=b"a,b\n1,2\n", media_type="text/csv")
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from xview import metadata
+
+
+def test_describe_gridded():
+    ds = xr.Dataset(
+        {"temp": ("time", np.arange(4.0), {"units": "degC"})},
+        coords={"time": pd.date_range("2020-01-01", periods=4, freq="D")},
+        attrs={"featureType": "timeSeries"},
+    )
+    meta = metadata.describe("/data/x.nc", ds)
+    assert meta["featureType"] == "timeSeries"
+    assert meta["sizes"] == {"time": 4}
+    assert meta["time"] == {"dim": "time", "start": "2020-01-01T00:00:00", "end": "2020-01-04T00:00:00", "size": 4}
+    temp = {"dims": ("time",), "attrs": {"units": "degC"}, "dtype": "float64", "shape": (4,)}
+    assert meta["data_vars"]["temp"] == temp
+    assert "timeseries_ids" not in meta
+
+
+def test_get_is_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(metadata, "METADATA", metadata.LRUCache(maxsize=4))
+    path = str(tmp_path / "x.nc")
+    xr.Dataset({"a": ("station", [1.0, 2.0])}, coords={"station": [0, 1]}).to_netcdf(path)
+    assert metadata.get(path) is metadata.get(path)
+    assert metadata.get(path)["time"] is None
@@ -0,0 +1,51 @@
+import asyncio
+
+import numpy as np
+import xarray as xr
+
+from xview import executor, metrics
+
+
+def test_render_prometheus_text():
+    counter = metrics.Counter("test_things_total", "Things", ("kind",))
+    histogram = metrics.Histogram("test_seconds", "Time", ("kind",), buckets=(0.1, 1.0))
+    counter.inc(2, kind='a"b')
+    histogram.observe(0.5, kind="x")
+    histogram.observe(5.0, kind="x")
+    text = metrics.render()
+    assert '# TYPE test_things_total counter\ntest_things_total{kind="a\\"b"} 2.0\n' in text
+    assert 'test_seconds_bucket{kind="x",le="0.1"} 0\n' in text
+    assert 'test_seconds_bucket{kind="x",le="1.0"} 1\n' in text
+    assert 'test_seconds_bucket{kind="x",le="+Inf"} 2\n' in text
+    assert 'test_seconds_sum{kind="x"} 5.5\ntest_seconds_count{kind="x"} 2\n' in text
+
+
+def test_labels_reach_executor_and_streams():
+    request = dict(endpoint="/test", format="csv", host="example.org")
+
+    def work():
+        with metrics.stage("subset"):
+            pass
+        return metrics.count_stream(iter(["ab", "c"]))
+
+    async def main():
+        with metrics.labels(**request):
+            stream = await executor.run("http://example.org/x.nc", work)
+        # The body is produced after the labels went out of scope
+        return [chunk async for chunk in executor.iterate("http://example.org/x.nc", stream)]
+
+    before = metrics.RESPONSE_BYTES.value(**request)
+    assert asyncio.run(main()) == ["ab", "c"]
+    assert metrics.STAGE_SECONDS.count(stage="subset", **request) >= 1
+    assert metrics.STAGE_SECONDS.count(stage="encode", **request) >= 3
+    assert metrics.RESPONSE_BYTES.value(**request) - before == 3
+
+
+def test_count_reads():
+    ds = xr.Dataset({"temp": ("time", np.arange(100.0))}, coords={"time": np.arange(100)})
+    before = metrics.UPSTREAM_BYTES.value(host="counted.example")
+    counted = metrics.count_reads("counted.example", ds)
+    assert metrics.UPSTREAM_BYTES.value(host="counted.example") - before == 800
+    np.testing.assert_array_equal(counted["temp"][10:20].values, ds["temp"][10:20].values)
+    assert metrics.UPSTREAM_BYTES.value(host="counted.example") - before == 880
+    assert counted.identical(ds)
@@ -0,0 +1,72 @@
+import os
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from xview import mirror
+
+
+def _dataset(n=1000, offset=0.0):
+    return xr.Dataset(
+        {"temp": (("time", "depth"), np.arange(n * 2, dtype=float).reshape(n, 2) + offset)},
+        coords={"time": pd.date_range("2020-01-01", periods=n, freq="h"), "lon": ("time", np.linspace(0, 1, n))},
+    )
+
+
+def _configure(monkeypatch, tmp_path, quota=2**30):
+    monkeypatch.setattr(mirror.SETTINGS, "mirror_dir", str(tmp_path))
+    monkeypatch.setattr(mirror.SETTINGS, "mirror_chunk_bytes", 1600)
+    monkeypatch.setattr(mirror.SETTINGS, "mirror_quota", quota)
+    monkeypatch.setattr(mirror.SETTINGS, "mirror_revalidate", 10)
+    monkeypatch.setattr(mirror, "_usage", None)
+
+
+def test_reads_match_source(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path)
+    ds = _dataset()
+    wrapped = mirror.wrap("/data/x.nc", ds)
+    assert wrapped.identical(ds)
+    for key in [slice(5, 700, 7), slice(None, None, -3), 999, slice(990, None), [1, 5, 400]]:
+        np.testing.assert_array_equal(wrapped["temp"][key].values, ds["temp"][key].values)
+    np.testing.assert_array_equal(wrapped["temp"][:, 1].values, ds["temp"][:, 1].values)
+
+
+def test_chunks_are_served_from_disk(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path)
+    mirror.wrap("/data/x.nc", _dataset())["temp"].values
+
+    # Same layout, different values upstream: stable chunks come from disk, the mutable tail does not
+    changed = _dataset(offset=0.5)
+    temp = mirror.wrap("/data/x.nc", changed)["temp"].values
+    np.testing.assert_array_equal(temp[:900], _dataset()["temp"].values[:900])
+    np.testing.assert_array_equal(temp[-10:], changed["temp"].values[-10:])
+
+    # Reprocessed upstream: a new date_modified means none of the old chunks are used
+    changed = changed.assign_coords(lon=changed["lon"] + 1)
+    changed.attrs["date_modified"] = "2024-01-01T00:00:00Z"
+    wrapped = mirror.wrap("/data/x.nc", changed)
+    np.testing.assert_array_equal(wrapped["temp"].values, changed["temp"].values)
+    np.testing.assert_array_equal(wrapped["lon"].values, changed["lon"].values)
+
+
+def test_quota_evicts_least_recently_read(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path, quota=5000)
+    wrapped = mirror.wrap("/data/x.nc", _dataset())
+    wrapped["temp"][:300].values
+    total = sum(size for _, size, _ in mirror._scan())
+    assert 0 < total <= 5000
+    directory = wrapped["temp"].variable._data.array.directory
+    assert sorted(os.listdir(directory)) == ["1.npy", "2.npy"]
+
+
+def test_partial_chunk_grows_with_dataset(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path)
+    mirror.wrap("/data/x.nc", _dataset(n=50))["temp"].values
+    chunk = os.path.join(tmp_path, mirror._digest("/data/x.nc"))
+    (directory,) = os.listdir(chunk)
+    assert np.load(os.path.join(chunk, directory, "0.npy")).shape == (40, 2)
+
+    grown = _dataset(n=80)
+    np.testing.assert_array_equal(mirror.wrap("/data/x.nc", grown)["temp"].values, grown["temp"].values)
+    assert np.load(os.path.join(chunk, directory, "0.npy")).shape == (70, 2)
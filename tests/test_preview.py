@@ -0,0 +1,15 @@
+from xview import preview
+from xview.config import SETTINGS
+
+
+def test_worker_url_pins_clients(monkeypatch):
+    monkeypatch.setattr(SETTINGS, "bokeh_urls", [])
+    monkeypatch.setattr(SETTINGS, "bokeh_url", "http://localhost:5000/")
+    assert preview.worker_url("10.0.0.1") == "http://localhost:5000"
+
+    urls = [f"http://localhost:{5000 + i}" for i in range(4)]
+    monkeypatch.setattr(SETTINGS, "bokeh_urls", urls)
+    clients = [f"10.0.0.{i}" for i in range(64)]
+    chosen = [preview.worker_url(client) for client in clients]
+    assert chosen == [preview.worker_url(client) for client in clients]
+    assert set(chosen) == set(urls)
@@ -0,0 +1,50 @@
+import time
+
+from xview import profiling
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+    return "done"
+
+
+def _unprofiled(seconds):
+    return _busy(seconds)
+
+
+def test_authorization_and_signed_ids(monkeypatch):
+    monkeypatch.setattr(profiling.SETTINGS, "admin_token", "")
+    assert not profiling.authorized("")
+    assert profiling.verify(profiling.sign("abc")) is None
+
+    monkeypatch.setattr(profiling.SETTINGS, "admin_token", "s3cret")
+    assert profiling.authorized("s3cret") and not profiling.authorized("wrong")
+    token = profiling.sign("abc")
+    assert profiling.verify(token) == "abc"
+    assert profiling.verify(token[:-1] + ("0" if token[-1] != "0" else "1")) is None
+    assert profiling.verify("abc.1.deadbeef") is None
+
+    monkeypatch.setattr(profiling.SETTINGS, "profile_max_seconds", -1)
+    assert profiling.verify(profiling.sign("abc")) is None
+
+
+def test_only_attached_threads_are_sampled(monkeypatch):
+    monkeypatch.setattr(profiling.SETTINGS, "profile_interval", 0.001)
+    assert profiling.traced(_busy) is _busy
+
+    profile = profiling.Profile("/data", {"url": "x.nc"}).start()
+    _unprofiled(0.05)
+    with profiling.activate(profile):
+        assert profiling.traced(_busy)(0.1) == "done"
+        assert list(profiling.bind(iter([1, 2]))) == [1, 2]
+    profile.finish()
+    profile.finish()
+
+    record = profiling.get(profile.id)
+    assert record["query"] == {"url": "x.nc"} and record["samples"] > 0
+    stacks = record["folded"].splitlines()
+    assert any(line.split(";")[-1].startswith("_busy") for line in stacks)
+    assert not any("_unprofiled" in line for line in stacks)
+    assert profile.id in [p["id"] for p in profiling.summaries()]
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from xview import resampling
+
+
+@pytest.mark.parametrize("freq", ["1h", "7min", "MS"])
+@pytest.mark.parametrize("agg", resampling.AGGREGATIONS)
+def test_resample_matches_pandas(agg, freq):
+    time = pd.date_range("2020-01-01", periods=600, freq="1min")
+    values = np.random.default_rng(0).normal(size=(3, 600))
+    values[0, 5] = np.nan
+    values[1, :60] = np.nan
+    ds = xr.Dataset(
+        {
+            "temp": (("station", "time"), values, {"units": "degC"}),
+            "name": ("time", np.array(["x"] * 600)),
+        },
+        coords={"time": time, "lon": ("time", np.linspace(0, 1, 600))},
+    )
+    # Drop a whole hour, which is left out rather than filled with NaN
+    ds = ds.isel(time=np.r_[0:120, 180:600])
+
+    out = resampling.resample(ds, freq, agg)
+
+    nonempty = (pd.Series(1, index=ds.indexes["time"]).resample(freq).count() > 0).values
+    expected = ds["temp"].to_pandas().T.resample(freq).agg(agg)[nonempty]
+    np.testing.assert_allclose(out["temp"].values, expected.T.values)
+    np.testing.assert_array_equal(out["time"].values, expected.index.values)
+    np.testing.assert_allclose(out["lon"].values, ds["lon"].to_pandas().resample(freq).mean()[nonempty].values)
+    assert "name" not in out
+    if agg == "count":
+        assert out["temp"].attrs == {"units": "1"}
+    else:
+        assert out["temp"].attrs == {"units": "degC", "cell_methods": f"time: {resampling._CELL_METHODS[agg]}"}
+
+
+def test_resample_frame_per_station_and_depth():
+    df = pd.DataFrame(
+        {
+            "station": ["a", "a", "a", "b", "b"],
+            "lat": [1.0, 1.0, 1.0, 2.0, 2.0],
+            "time": pd.to_datetime(
+                ["2020-01-01T01", "2020-01-01T02", "2020-01-02T00", "2020-01-01T00", "2020-01-01T00"]
+            ),
+            "z": [0.0, 0.0, 0.0, 0.0, 5.0],
+            "temp": [1.0, 3.0, 5.0, 7.0, 9.0],
+        }
+    )
+    out = resampling.resample_frame(df, "time", "1D", "mean", by=("station", "z"), first=("lat",))
+    assert list(out.columns) == list(df.columns)
+    assert out["temp"].tolist() == [2.0, 5.0, 7.0, 9.0]
+    assert out["lat"].tolist() == [1.0, 1.0, 2.0, 2.0]
+
+
+def test_check_freq():
+    resampling.check_freq("1h")
+    for freq in ("0h", "-1h", "-1MS", "1x"):
+        with pytest.raises(ValueError):
+            resampling.check_freq(freq)
+
+
+def test_fine_frequency_over_long_span():
+    # About 86 million one-second bins between the first and last time, but only 1000 hold data
+    time = pd.date_range("2020-01-01 00:00:30", periods=1000, freq="D")
+    ds = xr.Dataset({"temp": ("time", np.arange(1000.0))}, coords={"time": time})
+    out = resampling.resample(ds, "1s", "mean")
+    np.testing.assert_array_equal(out["time"].values, time.values)
+    np.testing.assert_array_equal(out["temp"].values, ds["temp"].values)
+
+    df = pd.DataFrame({"station": ["a"] * 1000, "time": time, "temp": np.arange(1000.0)})
+    out = resampling.resample_frame(df, "time", "1s", "max", by=("station",))
+    assert out["temp"].tolist() == df["temp"].tolist()
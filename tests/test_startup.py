@@ -0,0 +1,33 @@
+import json
+import subprocess
+import sys
+
+# Budgets for a /data-only worker; importing the plotting stack takes about 5 s and 300 MB
+IMPORT_SECONDS = 4.0
+IMPORT_RSS_MB = 250
+PLOTTING = ["panel", "bokeh", "hvplot", "holoviews", "geoviews", "datashader", "geopandas", "cartopy"]
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from xview.main import create_data_app
+app = create_data_app()
+print(json.dumps({
+    "seconds": time.perf_counter() - start,
+    # Peak RSS of this process image; ru_maxrss would include the parent's peak from before exec
+    "rss_mb": next(int(line.split()[1]) for line in open("/proc/self/status") if line.startswith("VmHWM")) / 2**10,
+    "modules": sorted(sys.modules),
+    "paths": sorted(route.path for route in app.routes),
+}))
+"""
+
+
+def test_data_app_import_budget():
+    output = subprocess.run([sys.executable, "-c", SCRIPT], capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.splitlines()[-1])
+
+    loaded = {name.split(".")[0] for name in result["modules"]}
+    assert loaded.isdisjoint(PLOTTING), sorted(loaded.intersection(PLOTTING))
+    assert "/data" in result["paths"] and "/panel" not in result["paths"]
+    assert result["seconds"] < IMPORT_SECONDS
+    assert result["rss_mb"] < IMPORT_RSS_MB
@@ -0,0 +1,99 @@
+import fcntl
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from xview import tailcache
+
+
+def _dataset(n, correction=None):
+    temp = np.arange(n, dtype=float)
+    if correction is not None:
+        temp[correction] = -1.0
+    return xr.Dataset(
+        {"temp": ("time", temp, {"units": "degC"}), "flag": ("time", np.arange(n) % 3)},
+        coords={"time": pd.date_range("2020-01-01", periods=n, freq="h"), "lon": ("time", np.arange(n) * 0.01)},
+        attrs={"title": "ferrybox"},
+    )
+
+
+def _configure(monkeypatch, tmp_path):
+    monkeypatch.setattr(tailcache.SETTINGS, "tail_cache_dir", str(tmp_path))
+    monkeypatch.setattr(tailcache.SETTINGS, "tail_cache_window", 3 * 86400.0)
+    monkeypatch.setattr(tailcache.SETTINGS, "tail_cache_revalidate", 5)
+    monkeypatch.setattr(tailcache.SETTINGS, "tail_cache_interval", 0.0)
+    monkeypatch.setattr(tailcache.timeindex, "TIME_INDEXES", tailcache.timeindex.LRUCache(maxsize=4))
+
+
+def test_tail_is_mirrored_and_memory_mapped(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path)
+    ds = _dataset(200)
+    local = tailcache.open_tail("/data/fb.nc", ds)
+    assert local.sizes["time"] == 73
+    assert isinstance(local["temp"].variable._data, np.memmap)
+    assert local.identical(ds.isel(time=slice(127, None)))
+
+
+def test_sync_fetches_only_new_and_revalidated_steps(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path)
+    tailcache.open_tail("/data/fb.nc", _dataset(200))
+
+    written = []
+    write_rows = tailcache._write_rows
+
+    def record(root, manifest, i, row, values):
+        written.append((row, len(values)))
+        write_rows(root, manifest, i, row, values)
+
+    monkeypatch.setattr(tailcache, "_write_rows", record)
+    grown = _dataset(230, correction=197)
+    local = tailcache.open_tail("/data/fb.nc", grown)
+
+    # 5 revalidated steps before the old end (row 73) plus 30 new ones, for each of the 4 variables
+    assert set(written) == {(68, 35)} and len(written) == 4
+    assert local["temp"].sel(time=grown.time[197]).item() == -1.0
+    assert local.identical(grown.isel(time=slice(127, None)))
+
+
+def test_window(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path)
+    ds = _dataset(200)
+    assert tailcache.window("/data/fb.nc", ds, datetime(2020, 1, 8)) is not ds
+    assert tailcache.window("/data/fb.nc", ds, datetime(2020, 1, 2)) is ds
+    assert tailcache.window("/data/fb.nc", ds, 10) is ds
+
+    monkeypatch.setattr(tailcache.SETTINGS, "tail_cache_dir", "")
+    assert tailcache.window("/data/fb.nc", ds, datetime(2020, 1, 8)) is ds
+
+
+def test_window_does_not_sync_for_older_start(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path)
+    synced = []
+    monkeypatch.setattr(tailcache, "sync", lambda url, ds: synced.append(url))
+    ds = _dataset(200)
+    assert tailcache.window("/data/fb.nc", ds, datetime(2020, 1, 2)) is ds
+    assert synced == []
+
+
+def test_sync_excludes_other_processes(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path)
+    root = tailcache._store_dir("/data/fb.nc")
+    with tailcache._locked(root, exclusive=True):
+        # flock conflicts between open file descriptions, as it does between processes
+        with open(os.path.join(root, "lock")) as f:
+            with pytest.raises(BlockingIOError):
+                fcntl.flock(f, fcntl.LOCK_SH | fcntl.LOCK_NB)
+
+
+def test_window_moves_without_refetching(monkeypatch, tmp_path):
+    _configure(monkeypatch, tmp_path)
+    tailcache.open_tail("/data/fb.nc", _dataset(200))
+    ds = _dataset(300)
+    local = tailcache.open_tail("/data/fb.nc", ds)
+    # More than half the store fell out of the window, so it was compacted locally
+    assert local.sizes["time"] == 73
+    assert local.identical(ds.isel(time=slice(227, None)))
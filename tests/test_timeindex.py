@@ -0,0 +1,51 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from xview import timeindex, utils
+from xview.timeindex import TimeIndex
+
+
+def _dataset(n=100):
+    return xr.Dataset(
+        {"temp": ("time", np.arange(n, dtype=float))},
+        coords={"time": pd.date_range("2020-01-01", periods=n, freq="h")},
+    )
+
+
+def test_slice_matches_sel():
+    ds = _dataset()
+    index = TimeIndex.from_dataset(ds)
+    assert len(index) == 100
+    assert index.min == pd.Timestamp("2020-01-01") and index.max == pd.Timestamp("2020-01-05 03:00")
+    for start, end in [
+        (datetime(2020, 1, 1, 5), datetime(2020, 1, 2, 5)),
+        (datetime(2020, 1, 1, 5, 30), datetime(2020, 1, 1, 7, 30)),
+        (datetime(2019, 1, 1), datetime(2021, 1, 1)),
+        (datetime(2021, 1, 1), datetime(2022, 1, 1)),
+    ]:
+        expected = ds.sel(time=slice(start, end))
+        assert ds.isel(time=index.slice(start, end)).identical(expected)
+
+
+def test_subset_uses_index():
+    ds = _dataset()
+    index = TimeIndex.from_dataset(ds)
+    start, end = datetime(2020, 1, 1, 10), datetime(2020, 1, 3)
+    assert utils.subset(ds, None, start, end, 3, index).identical(utils.subset(ds, None, start, end, 3))
+
+
+def test_non_monotonic_and_non_datetime():
+    ds = _dataset().isel(time=[3, 1, 2])
+    assert TimeIndex.from_dataset(ds).slice(datetime(2020, 1, 1), datetime(2020, 1, 2)) is None
+    assert TimeIndex.from_dataset(xr.Dataset({"a": ("x", [1, 2])})) is None
+
+
+def test_get_rebuilds_when_size_changes(monkeypatch):
+    monkeypatch.setattr(timeindex, "TIME_INDEXES", timeindex.LRUCache(maxsize=4))
+    first = timeindex.get("/data/x.nc", _dataset(10))
+    assert timeindex.get("/data/x.nc", _dataset(10)) is first
+    grown = timeindex.get("/data/x.nc", _dataset(12))
+    assert grown is not first and len(grown) == 12
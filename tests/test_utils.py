@@ -1,7 +1,22 @@
 import xarray as xr
 import pandas as pd
 import numpy as np
-from xview.utils import to_json_types
+import pytest
+from datetime import datetime
+
+from xview.utils import (
+    STATION_INDEXES,
+    _decode_bytes,
+    expand_ragged_tsp,
+    expand_ragged_tsp_indexed,
+    match_timeseries_ids,
+    ragged_tsp_schema,
+    read_ragged_tsp,
+    station_index,
+    subset_by_timeseries_id,
+    subset_by_timeseries_ids,
+    to_json_types,
+)
 
 def test_to_friendly_types():
     ds = xr.Dataset(
@@ -17,3 +32,121 @@ def test_to_friendly_types():
     assert ds["time"].values[0] == "2020-01-01T00:00:00"
     assert ds["temp"].values[0] == 1.0
     assert ds["temp"].values[1] == None
+
+
+def _ragged_dataset():
+    station_index = np.array([1, 0, 1, 2, 0])
+    row_size = np.array([2, 1, 3, 2, 2])
+    return xr.Dataset(
+        {
+            "station_name": ("station", np.array([b"A", b"B", b"C"]), {"cf_role": "timeseries_id"}),
+            "stationIndex": ("profile", station_index, {"instance_dimension": "station"}),
+            "rowSize": ("profile", row_size, {"sample_dimension": "obs"}),
+            "time": ("profile", pd.date_range("2020-01-01", periods=5)),
+            "depth": ("obs", np.arange(row_size.sum(), dtype=float)),
+        }
+    )
+
+
+def test_expand_ragged_tsp_indexed():
+    ds = _ragged_dataset()
+    ragged = expand_ragged_tsp_indexed(ds)
+    df = expand_ragged_tsp(ds)
+
+    assert list(ragged.station_offsets) == [0, 3, 8, 10]
+    assert list(ragged.profile_order) == [1, 4, 0, 2, 3]
+    assert list(ragged.profile_offsets) == [0, 1, 3, 5, 8, 10]
+    for sid in ("A", "B", "C"):
+        expected = df[df["station_name"] == sid].reset_index(drop=True)
+        pd.testing.assert_frame_equal(ragged.station(sid).reset_index(drop=True), expected)
+
+
+def test_read_ragged_tsp_pushdown():
+    ds = _ragged_dataset()
+    ds["temp"] = ("obs", np.arange(10.0) * 2)
+    ds = ds.set_coords("depth")
+    df = expand_ragged_tsp(ds)
+
+    ragged = read_ragged_tsp(
+        ds, variables={"temp"}, timeseries_ids=["B"], start=datetime(2020, 1, 2), end=datetime(2020, 1, 5), max_gap=0
+    )
+    expected = df[(df["station_name"] == "B") & (df["time"] >= "2020-01-02") & (df["time"] <= "2020-01-05")]
+    expected = expected[[c for c in df.columns if c in ("station_name", "depth", "temp")]].reset_index(drop=True)
+    pd.testing.assert_frame_equal(ragged.df, expected)
+    assert list(ragged.station_offsets) == [0, 0, 3, 3]
+    assert list(ragged.profile_order) == [2]
+
+
+def test_ragged_tsp_schema_matches_read():
+    ds = _ragged_dataset()
+    ds["obs_time"] = ("obs", pd.date_range("2020-01-01", periods=10, freq="12h"))
+    ds = ds.rename({"time": "profile_time", "obs_time": "time"})
+    for selection in [{}, {"timeseries_ids": ["B"]}, {"start": datetime(2020, 1, 2), "end": datetime(2020, 1, 4)}]:
+        df = read_ragged_tsp(ds, **selection).df
+        schema = ragged_tsp_schema(ds, **selection)
+        assert list(schema) == list(df.columns)
+        assert {len(v) for v in schema.values()} == {len(df)}
+        assert all(v.strides == (0,) for v in schema.values())
+
+
+def test_subset_by_timeseries_ids():
+    ds = xr.Dataset(
+        {
+            "temp": (("station", "time"), np.arange(12.0).reshape(4, 3)),
+            "station_name": ("station", np.array([b"NO1", b"NO2", b"SE1", b"SE2"]), {"cf_role": "timeseries_id"}),
+        },
+        coords={"time": pd.date_range("2020-01-01", periods=3)},
+    )
+    assert list(match_timeseries_ids(["NO1", "NO2", "SE1"], ["SE1", "NO*"])) == [0, 1, 2]
+    assert list(match_timeseries_ids(["NO1", "NO2", "SE1"], ["N?2", "[S]E1", "DK1"])) == [1, 2]
+
+    subset = subset_by_timeseries_ids(ds, ["SE2", "NO*"])
+    assert subset.sizes == {"station": 3, "time": 3}
+    assert list(subset["station_name"].values) == [b"NO1", b"NO2", b"SE2"]
+    assert subset["temp"].values[2, 0] == 9.0
+    with pytest.raises(ValueError):
+        subset_by_timeseries_ids(ds, ["DK*"])
+
+    df = read_ragged_tsp(_ragged_dataset(), timeseries_ids=["A", "[C]"]).df
+    assert set(df["station_name"]) == {"A", "C"}
+    with pytest.raises(ValueError):
+        read_ragged_tsp(_ragged_dataset(), timeseries_ids=["NOPE"])
+
+
+def test_decode_bytes_utf8_with_latin1_fallback():
+    values = np.array([b"abc", b"\xc3\xb8st", b"\xf8st"])
+    assert _decode_bytes(values).tolist() == ["abc", "\xf8st", "\xf8st"]
+    assert _decode_bytes(np.array([b"ab", b"c\xc3\xb8"])).tolist() == ["ab", "c\xf8"]
+    assert _decode_bytes(np.array([b"\xc3\xb8", None, b"x"], dtype=object)).tolist() == ["\xf8", None, "x"]
+    assert _decode_bytes(np.array([b"\xf8", "y", 1], dtype=object)).tolist() == ["\xf8", "y", 1]
+
+
+def test_station_index_is_reused_per_url():
+    ds = xr.Dataset(
+        {"station_name": ("station", np.array([b"NO1", b"NO2", b"NO1"]), {"cf_role": "timeseries_id"})}
+    )
+    url = "https://example.com/thredds/dodsC/stations.nc"
+    STATION_INDEXES.clear()
+    index = station_index(ds, url)
+    assert index.ids.tolist() == ["NO1", "NO2", "NO1"]
+    assert {k: v.tolist() for k, v in index.positions.items()} == {"NO1": [0, 2], "NO2": [1]}
+    assert index.match(["NO2", "NO*"]).tolist() == [0, 1, 2]
+    # Exact ids select every duplicate, as patterns and match_timeseries_ids do
+    assert index.match(["NO1"]).tolist() == [0, 2]
+    assert index.match(["NO1"]).tolist() == match_timeseries_ids(index.ids, ["NO1"]).tolist()
+    assert subset_by_timeseries_ids(ds, ["NO1"], url).sizes["station"] == 2
+    assert station_index(ds.copy(), url) is index
+    assert station_index(ds.isel(station=[0, 1]), url) is not index
+
+
+def test_numeric_station_ids():
+    ds = xr.Dataset(
+        {
+            "temp": (("station", "time"), np.arange(6.0).reshape(3, 2)),
+            "station_id": ("station", np.array([101, 102, 201]), {"cf_role": "timeseries_id"}),
+        }
+    )
+    assert station_index(ds).ids.tolist() == ["101", "102", "201"]
+    assert subset_by_timeseries_ids(ds, ["101"])["temp"].values.tolist() == [[0.0, 1.0]]
+    assert subset_by_timeseries_ids(ds, ["1*"]).sizes["station"] == 2
+    assert subset_by_timeseries_id(ds, "201")["temp"].values.tolist() == [4.0, 5.0]
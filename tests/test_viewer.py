@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from xview import viewer
+
+
+def _trajectory(n=100):
+    return xr.Dataset(
+        {"temp": ("time", np.arange(n, dtype=float))},
+        coords={"time": ("time", pd.date_range("2020-01-01", periods=n, freq="h"))},
+    )
+
+
+def _track(n):
+    return xr.Dataset(
+        {"temp": ("time", np.arange(n, dtype=float), {"units": "degC"})},
+        coords={
+            "time": pd.date_range("2020-01-01", periods=n, freq="min"),
+            "lon": ("time", np.linspace(5, 6, n), {"standard_name": "longitude", "units": "degrees_east"}),
+            "lat": ("time", np.linspace(60, 61, n), {"standard_name": "latitude", "units": "degrees_north"}),
+        },
+    )
+
+
+def test_plots_are_cached_by_url_and_window(tmp_path):
+    viewer.PLOTS.clear()
+    url = str(tmp_path / "trajectory.nc")
+    ds = _trajectory()
+    start, end = ds.indexes["time"][10], ds.indexes["time"][50]
+
+    plot = viewer.time_plot_widget("temp", ds, "time", start, end, 1, url=url)
+    assert viewer.time_plot_widget("temp", ds, "time", start, end, 1, url=url) is plot
+    assert viewer.time_plot_widget("temp", ds, "time", start, end, 2, url=url) is not plot
+    # A grown dataset gets a new plot
+    assert viewer.time_plot_widget("temp", _trajectory(120), "time", start, end, 1, url=url) is not plot
+    assert len(viewer.PLOTS) == 3
+    assert viewer.PLOTS.nbytes >= 3 * 41 * 8
+
+    # Without a URL nothing is cached
+    assert viewer.time_plot_widget("temp", ds, "time", start, end, 1) is not plot
+    assert len(viewer.PLOTS) == 3
+    viewer.PLOTS.clear()
+
+
+def test_long_tracks_are_rasterized(monkeypatch):
+    monkeypatch.setattr(viewer.SETTINGS, "map_rasterize_threshold", 1000)
+    monkeypatch.setattr(viewer.SETTINGS, "map_hover_points", 100)
+
+    plot = viewer.map_plot_widget(_track(5000), "temp", "time", 4999, 0, 1, True)
+    overlay = plot[()]
+    assert [type(el).__name__ for el in overlay] == ["WMTS", "Image", "Points"]
+    # Hover comes from an evenly decimated copy, not every point
+    assert len(overlay.Points.I) == 100
+
+    short = viewer.map_plot_widget(_track(500), "temp", "time", 499, 0, 1, True)
+    assert "Image" not in [type(el).__name__ for el in short[()]]
@@ -0,0 +1,170 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+from urllib.parse import urlsplit, urlunsplit
+
+import xarray as xr
+
+from xview import executor, metrics, mirror
+from xview.config import SETTINGS
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+class LRUCache:
+    """Thread-safe mapping with LRU eviction, an optional TTL and a size cap.
+
+    With *maxbytes*, entries are also evicted until the summed ``sizeof`` of
+    the values fits the budget; a value larger than the whole budget is not
+    stored at all.
+
+    ``get_or_create`` serializes creation per key, so concurrent requests for
+    the same missing key only run the (usually expensive) factory once.
+
+    Lookups are counted in ``hits``/``misses``; a cache given a *name* is
+    reported on /metrics.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float | None = None,
+        maxbytes: int | None = None,
+        sizeof: Callable[[Any], int] = len,
+        name: str | None = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any, int]] = OrderedDict()
+        self._lock = threading.RLock()
+        self._key_locks: dict[Hashable, threading.Lock] = {}
+        if name is not None:
+            metrics.CACHES[name] = self
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and time.monotonic() - created > self.ttl
+
+    def _remove(self, key: Hashable) -> tuple[float, Any, int] | None:
+        item = self._data.pop(key, None)
+        if item is not None:
+            self.nbytes -= item[2]
+        return item
+
+    def _lookup(self, key: Hashable, default: Any) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            if self._expired(item[0]):
+                self._remove(key)
+                return default
+            self._data.move_to_end(key)
+            return item[1]
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        missing = object()
+        value = self._lookup(key, missing)
+        with self._lock:
+            if value is missing:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        size = self.sizeof(value) if self.maxbytes is not None else 0
+        with self._lock:
+            self._remove(key)
+            if self.maxbytes is not None and size > self.maxbytes:
+                return
+            self._data[key] = (time.monotonic(), value, size)
+            self.nbytes += size
+            while len(self._data) > self.maxsize or (self.maxbytes is not None and self.nbytes > self.maxbytes):
+                self._remove(next(iter(self._data)))
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # Created by a concurrent caller while this one waited; already counted as a miss
+            value = self._lookup(key, missing)
+            if value is missing:
+                value = factory()
+                self.put(key, value)
+        with self._lock:
+            self._key_locks.pop(key, None)
+        return value
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._remove(key)
+            return default if item is None else item[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    def items(self) -> list[tuple[Hashable, Any]]:
+        """Return the unexpired entries, least recently used first, without counting lookups."""
+        with self._lock:
+            return [(key, item[1]) for key, item in self._data.items() if not self._expired(item[0])]
+
+    def __contains__(self, key: Hashable) -> bool:
+        missing = object()
+        return self._lookup(key, missing) is not missing
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+def normalize_url(url: str) -> str:
+    """Return a canonical form of *url* for use as a cache key.
+
+    Scheme and host are lower-cased, default ports and fragments dropped.
+    Plain file paths are made absolute.
+    """
+    url = url.strip()
+    parts = urlsplit(url)
+    if len(parts.scheme) <= 1:
+        # No scheme (or a Windows drive letter): a local path
+        return os.path.abspath(url)
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if parts.port is not None and _DEFAULT_PORTS.get(scheme) == parts.port:
+        netloc = netloc.rsplit(":", 1)[0]
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+
+DATASETS = LRUCache(maxsize=SETTINGS.dataset_cache_size, ttl=SETTINGS.dataset_cache_ttl, name="datasets")
+
+
+def open_dataset(url: str) -> xr.Dataset:
+    """Open *url* through the process-wide dataset handle cache.
+
+    With ``mirror_dir`` set, variable reads go through the on-disk chunk mirror.
+
+    Returns a shallow copy, so callers can add or replace variables without
+    touching the cached handle. Array data stays lazy and is shared.
+    """
+    key = normalize_url(url)
+    ds = DATASETS.get_or_create(key, lambda: _open(key, url))
+    return ds.copy(deep=False)
+
+
+def _open(key: str, url: str) -> xr.Dataset:
+    with metrics.stage("open_dataset"):
+        ds = metrics.count_reads(executor.upstream_host(url), xr.open_dataset(url))
+    return mirror.wrap(key, ds) if SETTINGS.mirror_dir else ds
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import os
+from urllib.parse import urlparse
+
+import elementpath
+import httpx
+from lxml import etree
+
+from xview import executor, metrics
+from xview.cache import LRUCache
+from xview.config import SETTINGS
+
+logger = logging.getLogger(__name__)
+
+XLINK_HREF = "{http://www.w3.org/1999/xlink}href"
+
+# Last response per catalog URL as (etag, last_modified, content), for conditional re-fetch
+_RESPONSES = LRUCache(maxsize=SETTINGS.catalog_cache_size, name="catalog")
+
+
+def _child_catalogs(cat: str, doc: etree._Element) -> list[str]:
+    base = cat.rsplit(".", 1)[0]
+    return [f"{base}/{el.get(XLINK_HREF)}" for el in doc if el.tag.endswith("catalogRef")]
+
+
+async def _fetch(client: httpx.AsyncClient, url: str, retries: int) -> bytes:
+    """GET *url*, revalidating a previous response and retrying timeouts, transport errors and 5xx."""
+    cached = _RESPONSES.get(url)
+    headers = {}
+    if cached is not None:
+        etag, last_modified, _ = cached
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+    for attempt in range(retries + 1):
+        try:
+            response = await client.get(url, headers=headers)
+            if response.status_code == 304 and cached is not None:
+                return cached[2]
+            if response.status_code >= 500:
+                response.raise_for_status()
+            break
+        except (httpx.TransportError, httpx.HTTPStatusError) as e:
+            if attempt == retries:
+                raise
+            logger.info("Retrying %s after %s", url, e)
+            await asyncio.sleep(0.5 * 2**attempt)
+
+    response.raise_for_status()
+    metrics.UPSTREAM_BYTES.inc(len(response.content), host=executor.upstream_host(url))
+    _RESPONSES.put(url, (response.headers.get("etag"), response.headers.get("last-modified"), response.content))
+    return response.content
+
+
+async def crawl_catalog(
+    catalog_base: str,
+    concurrency: int = SETTINGS.catalog_concurrency,
+    timeout: float = SETTINGS.catalog_timeout,
+    retries: int = SETTINGS.catalog_retries,
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> dict[str, list]:
+    """Crawl a THREDDS catalog tree and return ``{catalog_name: [opendap_urls]}``.
+
+    Catalogs are fetched concurrently over one pooled client, at most
+    *concurrency* at a time, each with *timeout* and *retries*. Unchanged
+    catalogs are revalidated with ETag/Last-Modified on later crawls. The
+    documents are then resolved in breadth-first order, so the result matches
+    the sequential crawl: OPeNDAP services declared in a catalog apply to the
+    catalogs visited after it. A sub-catalog that cannot be fetched or parsed
+    is logged and left out.
+    """
+    docs: dict[str, etree._Element] = {}
+    limit = asyncio.Semaphore(concurrency)
+
+    async def visit(client: httpx.AsyncClient, cat: str):
+        async with limit:
+            try:
+                docs[cat] = etree.fromstring(await _fetch(client, cat, retries))
+            except (httpx.HTTPError, etree.XMLSyntaxError) as e:
+                if cat == catalog_base:
+                    raise
+                logger.warning("Skipping catalog %s: %s", cat, e)
+                return
+        children = [c for c in _child_catalogs(cat, docs[cat]) if c not in seen]
+        seen.update(children)
+        await asyncio.gather(*(visit(client, c) for c in children))
+
+    seen = {catalog_base}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=timeout, follow_redirects=True, transport=transport) as client:
+        await visit(client, catalog_base)
+
+    catalog_url = f"{urlparse(catalog_base).scheme}://{urlparse(catalog_base).netloc}"
+    catalogs = [catalog_base]
+    visited = set()
+    dap_lookup = {}
+    datasets = {}
+    while catalogs:
+        cat = catalogs.pop(0)
+        if cat in visited or cat not in docs:
+            continue
+        visited.add(cat)
+        cat_doc = docs[cat]
+        name = os.path.basename(cat).split(".")[0]
+        datasets[name] = []
+        catalogs.extend(_child_catalogs(cat, cat_doc))
+        for el in cat_doc:
+            if el.tag.endswith("service"):
+                services = elementpath.select(el, "//*[lower-case(@serviceType)='opendap']")
+                if services:
+                    for service in services:
+                        dap_lookup[service.getparent().get("name")] = service.get("base")
+            elif el.tag.endswith("dataset"):
+                for t in el:
+                    if t.tag.endswith("serviceName") and t.text in dap_lookup:
+                        datasets[name].append(f"{catalog_url}{dap_lookup[t.text]}{el.get('urlPath')}")
+
+    return datasets
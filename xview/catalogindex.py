@@ -0,0 +1,277 @@
+import asyncio
+import contextlib
+import fcntl
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from xview import catalog, executor, metadata
+from xview.config import SETTINGS
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    url TEXT PRIMARY KEY,
+    root TEXT NOT NULL,
+    catalog TEXT,
+    title TEXT,
+    feature_type TEXT,
+    lon_min REAL,
+    lat_min REAL,
+    lon_max REAL,
+    lat_max REAL,
+    time_start TEXT,
+    time_end TEXT,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS variables (
+    url TEXT NOT NULL REFERENCES datasets(url) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    standard_name TEXT,
+    long_name TEXT,
+    units TEXT
+);
+CREATE TABLE IF NOT EXISTS stations (
+    url TEXT NOT NULL REFERENCES datasets(url) ON DELETE CASCADE,
+    station_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS datasets_root ON datasets(root);
+CREATE INDEX IF NOT EXISTS datasets_time ON datasets(time_start, time_end);
+CREATE INDEX IF NOT EXISTS datasets_bbox ON datasets(lon_min, lon_max, lat_min, lat_max);
+CREATE INDEX IF NOT EXISTS variables_url ON variables(url);
+CREATE INDEX IF NOT EXISTS variables_name ON variables(name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS variables_standard_name ON variables(standard_name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS stations_url ON stations(url);
+CREATE INDEX IF NOT EXISTS stations_id ON stations(station_id);
+"""
+
+
+def index_path(path: str | None = None) -> str:
+    """Return *path*, or the configured location of the index."""
+    return path or SETTINGS.catalog_index_path or os.path.join(SETTINGS.data_dir, "catalog.sqlite")
+
+
+def exists(path: str | None = None) -> bool:
+    """Return whether the index has been created; searches don't create an empty one."""
+    return os.path.exists(index_path(path))
+
+
+@contextlib.contextmanager
+def connect(path: str | None = None) -> Iterator[sqlite3.Connection]:
+    """Open the index (creating it and its directory if needed), commit on success and close afterwards."""
+    path = index_path(path)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.executescript(_SCHEMA)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _iso(value) -> str | None:
+    """Format a time as naive UTC ISO 8601, the form times are stored and compared in."""
+    if value is None:
+        return None
+    ts = pd.Timestamp(value)
+    if ts.tz is not None:
+        ts = ts.tz_convert("UTC").tz_localize(None)
+    return ts.isoformat()
+
+
+def _bounds(ds: xr.Dataset, standard_name: str, attr: str) -> tuple[float, float] | tuple[None, None]:
+    lo, hi = ds.attrs.get(f"geospatial_{attr}_min"), ds.attrs.get(f"geospatial_{attr}_max")
+    if lo is not None and hi is not None:
+        return float(lo), float(hi)
+    names = ds.cf.standard_names.get(standard_name, []) or ds.cf.coordinates.get(standard_name, [])
+    values = [np.asarray(ds[name].values, dtype=float).ravel() for name in names]
+    values = np.concatenate(values) if values else np.array([])
+    if not np.isfinite(values).any():
+        return None, None
+    return float(np.nanmin(values)), float(np.nanmax(values))
+
+
+def describe_dataset(url: str, ds: xr.Dataset) -> dict:
+    """Collect the searchable metadata of *ds*; reads only time, position and station id variables."""
+    meta = metadata.describe(url, ds)
+    lon_min, lon_max = _bounds(ds, "longitude", "lon")
+    lat_min, lat_max = _bounds(ds, "latitude", "lat")
+    extent = meta["time"] or {}
+    return {
+        "title": ds.attrs.get("title"),
+        "feature_type": meta["featureType"],
+        "lon_min": lon_min,
+        "lat_min": lat_min,
+        "lon_max": lon_max,
+        "lat_max": lat_max,
+        "time_start": _iso(extent.get("start")),
+        "time_end": _iso(extent.get("end")),
+        "variables": [
+            (name, var.attrs.get("standard_name"), var.attrs.get("long_name"), var.attrs.get("units"))
+            for name, var in ds.data_vars.items()
+        ],
+        "stations": [str(s) for s in meta.get("timeseries_ids", [])],
+    }
+
+
+def upsert(conn: sqlite3.Connection, url: str, root: str, catalog_name: str, record: dict) -> None:
+    conn.execute("DELETE FROM datasets WHERE url = ?", (url,))
+    conn.execute(
+        "INSERT INTO datasets VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            url,
+            root,
+            catalog_name,
+            record["title"],
+            record["feature_type"],
+            record["lon_min"],
+            record["lat_min"],
+            record["lon_max"],
+            record["lat_max"],
+            record["time_start"],
+            record["time_end"],
+            time.time(),
+        ),
+    )
+    conn.executemany("INSERT INTO variables VALUES (?, ?, ?, ?, ?)", [(url, *v) for v in record["variables"]])
+    conn.executemany("INSERT INTO stations VALUES (?, ?)", [(url, s) for s in record["stations"]])
+
+
+def index_dataset(url: str, root: str, catalog_name: str, path: str | None = None) -> None:
+    """Open *url*, describe it and store it in the index; runs in the data executor."""
+    with xr.open_dataset(url) as ds:
+        record = describe_dataset(url, ds)
+    with connect(path) as conn:
+        upsert(conn, url, root, catalog_name, record)
+
+
+async def refresh(catalog_base: str, path: str | None = None, max_age: float = SETTINGS.catalog_reindex_age) -> int:
+    """Bring the index for *catalog_base* up to date and return the number of datasets (re)indexed.
+
+    Datasets that are new in the catalog, or were indexed more than *max_age*
+    seconds ago, are opened and described; datasets no longer listed are
+    removed. Unchanged catalogs are only revalidated by the crawler.
+    """
+    found = await catalog.crawl_catalog(catalog_base)
+    wanted = {url: name for name, urls in found.items() for url in urls}
+    with connect(path) as conn:
+        indexed = dict(conn.execute("SELECT url, indexed_at FROM datasets WHERE root = ?", (catalog_base,)).fetchall())
+        conn.executemany("DELETE FROM datasets WHERE url = ?", [(url,) for url in indexed if url not in wanted])
+
+    now = time.time()
+    stale = [url for url in wanted if now - indexed.get(url, 0) > max_age]
+    results = await asyncio.gather(
+        *(executor.run(url, index_dataset, url, catalog_base, wanted[url], path) for url in stale),
+        return_exceptions=True,
+    )
+    for url, result in zip(stale, results):
+        if isinstance(result, Exception):
+            logger.warning("Could not index %s: %s", url, result)
+    return sum(not isinstance(result, Exception) for result in results)
+
+
+async def refresh_forever(catalog_base: str, interval: float = SETTINGS.catalog_refresh_interval) -> None:
+    """Refresh the index every *interval* seconds until cancelled.
+
+    Every worker runs this, but only the one holding a lock on the file next
+    to the index refreshes it. The others try again each interval, so one of
+    them takes over when that worker exits.
+    """
+    path = index_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(f"{path}.lock", "a") as lock:
+        while True:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                await asyncio.sleep(interval)
+                continue
+            try:
+                n = await refresh(catalog_base)
+                logger.info("Catalog index refreshed, %d datasets (re)indexed", n)
+            except Exception:
+                logger.exception("Catalog index refresh failed")
+            await asyncio.sleep(interval)
+
+
+def search(
+    conn: sqlite3.Connection,
+    bbox: tuple[float, float, float, float] | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    variable: str | None = None,
+    station: str | None = None,
+    feature_type: str | None = None,
+    limit: int = 100,
+) -> list[dict]:
+    """Return indexed datasets matching all given filters.
+
+    *bbox* is ``(lon_min, lat_min, lon_max, lat_max)`` and matches datasets whose
+    extent intersects it; *start*/*end* match datasets whose time coverage
+    overlaps the range. *variable* matches a variable name or standard_name,
+    case-insensitively.
+    """
+    where, args = [], []
+    if bbox is not None:
+        where.append("lon_min <= ? AND lon_max >= ? AND lat_min <= ? AND lat_max >= ?")
+        args += [bbox[2], bbox[0], bbox[3], bbox[1]]
+    if start is not None:
+        where.append("time_end >= ?")
+        args.append(_iso(start))
+    if end is not None:
+        where.append("time_start <= ?")
+        args.append(_iso(end))
+    if variable is not None:
+        where.append(
+            "url IN (SELECT url FROM variables WHERE name = ? COLLATE NOCASE OR standard_name = ? COLLATE NOCASE)"
+        )
+        args += [variable, variable]
+    if station is not None:
+        where.append("url IN (SELECT url FROM stations WHERE station_id = ?)")
+        args.append(station)
+    if feature_type is not None:
+        where.append("feature_type = ? COLLATE NOCASE")
+        args.append(feature_type)
+
+    sql = "SELECT * FROM datasets" + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY url LIMIT ?"
+    rows = conn.execute(sql, [*args, limit]).fetchall()
+    if not rows:
+        return []
+
+    urls = [row["url"] for row in rows]
+    marks = ",".join("?" * len(urls))
+    variables, stations = {}, {}
+    for row in conn.execute(f"SELECT url, name FROM variables WHERE url IN ({marks})", urls):
+        variables.setdefault(row["url"], []).append(row["name"])
+    for row in conn.execute(f"SELECT url, station_id FROM stations WHERE url IN ({marks})", urls):
+        stations.setdefault(row["url"], []).append(row["station_id"])
+
+    def bbox(row):
+        return None if row["lon_min"] is None else [row["lon_min"], row["lat_min"], row["lon_max"], row["lat_max"]]
+
+    return [
+        {
+            "url": row["url"],
+            "catalog": row["catalog"],
+            "title": row["title"],
+            "featureType": row["feature_type"],
+            "bbox": bbox(row),
+            "time_start": row["time_start"],
+            "time_end": row["time_end"],
+            "variables": variables.get(row["url"], []),
+            "timeseries_ids": stations.get(row["url"], []),
+        }
+        for row in rows
+    ]
@@ -1,3 +1,5 @@
+import os
+
 import pydantic_settings
 
 
@@ -5,6 +7,88 @@ class Settings(pydantic_settings.BaseSettings):
     server_url: str = "http://localhost:8000"
     bokeh_url: str = "http://localhost:5000"
 
+    # Panel preview workers (python -m xview.preview). With bokeh_urls, one base URL per worker,
+    # /panel pins each client to one of them, since a session only exists in the worker that made it
+    bokeh_workers: int = 1
+    bokeh_urls: list[str] = []
+    # Extra hosts allowed to open preview websockets, besides the host of server_url
+    bokeh_websocket_origins: list[str] = []
+
+    # Dataset handle cache shared by /data and the Panel preview
+    dataset_cache_size: int = 32
+    dataset_cache_ttl: float = 300.0
+
+    # Thread pool for blocking dataset I/O and serialization in /data, and the
+    # maximum number of those running against a single upstream host
+    data_workers: int = 8
+    upstream_concurrency: int = 4
+
+    # Complete /data responses kept in memory, keyed by the normalized query and
+    # the dataset version
+    response_cache_size: int = 256
+    response_cache_bytes: int = 256 * 2**20
+
+    # Number of time steps (or rows) per block when streaming CSV
+    csv_block_size: int = 10000
+
+    # Default number of points drawn by the time series plots
+    plot_max_points: int = 2000
+
+    # Preview plots kept across sessions, keyed on URL, variable, station and time window
+    plot_cache_size: int = 512
+    plot_cache_bytes: int = 512 * 2**20
+
+    # Trajectory maps with more points than this are rasterized with datashader,
+    # keeping hover on about map_hover_points of them
+    map_rasterize_threshold: int = 20000
+    map_hover_points: int = 2000
+
+    # THREDDS catalog crawling: parallel requests, per-request timeout and retries,
+    # and how many catalog responses are kept for conditional re-fetch
+    catalog_concurrency: int = 16
+    catalog_timeout: float = 30.0
+    catalog_retries: int = 3
+    catalog_cache_size: int = 4096
+
+    # Directory for local state that is not a cache of its own, such as the catalog index
+    data_dir: str = os.path.join(os.path.expanduser("~"), ".local", "share", "xview")
+
+    # SQLite index behind /catalog/search, data_dir/catalog.sqlite unless catalog_index_path
+    # is set. With catalog_url set, the tree under it is recrawled every
+    # catalog_refresh_interval seconds, by one worker at a time; datasets are re-read when
+    # new or older than catalog_reindex_age seconds
+    catalog_url: str = ""
+    catalog_index_path: str = ""
+    catalog_refresh_interval: float = 3600.0
+    catalog_reindex_age: float = 86400.0
+
+    # Local tail cache for growing (near-real-time) datasets. With tail_cache_dir set, the
+    # last tail_cache_window seconds of each dataset are kept in memory-mapped files;
+    # syncs, at most every tail_cache_interval seconds, only read new time steps plus
+    # the last tail_cache_revalidate cached ones
+    tail_cache_dir: str = ""
+    tail_cache_window: float = 30 * 86400.0
+    tail_cache_revalidate: int = 10
+    tail_cache_interval: float = 60.0
+
+    # Optional on-disk mirror of dataset chunks, shared by all workers and kept across
+    # restarts; the least recently read chunks are evicted beyond mirror_quota bytes.
+    # The last mirror_revalidate time steps of a dataset are always read upstream
+    mirror_dir: str = ""
+    mirror_quota: int = 10 * 2**30
+    mirror_chunk_bytes: int = 4 * 2**20
+    mirror_revalidate: int = 10
+
+    # Requests carrying this token in the X-Admin-Token header may ask for a profile with
+    # profile=true (or an X-Xview-Profile header); empty disables profiling. Profiles sample
+    # every profile_interval seconds for at most profile_max_seconds, and the last
+    # profile_cache_size are kept in memory, and in profile_dir when set
+    admin_token: str = ""
+    profile_interval: float = 0.005
+    profile_max_seconds: float = 300.0
+    profile_cache_size: int = 32
+    profile_dir: str = ""
+
     class Config:
         env_file = ".env"
 
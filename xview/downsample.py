@@ -0,0 +1,106 @@
+import numpy as np
+import xarray as xr
+
+from xview import utils
+
+
+def _as_float(x: np.ndarray) -> np.ndarray:
+    if x.dtype.kind in "Mm":
+        return x.astype("int64").astype("float64")
+    return x.astype("float64")
+
+
+def minmax_indices(y: np.ndarray, n_out: int, y_max: np.ndarray | None = None) -> np.ndarray:
+    """Return sorted indices of the min and max of *y* in ``n_out // 2`` equal-count buckets.
+
+    With *y_max*, *y* holds the minimum and *y_max* the maximum of each step
+    (see :func:`extremes`). The first and last points are always kept, NaNs
+    are ignored.
+    """
+    y = _as_float(np.asarray(y))
+    y_max = y if y_max is None else _as_float(np.asarray(y_max))
+    n = len(y)
+    n_buckets = max(1, n_out // 2)
+    if n <= n_out or n < 3:
+        return np.arange(n)
+
+    size = -(-n // n_buckets)
+    offsets = np.arange(n_buckets) * size
+
+    def buckets(values: np.ndarray, fill: float) -> np.ndarray:
+        padded = np.full(n_buckets * size, fill)
+        padded[:n] = np.where(np.isnan(values), fill, values)
+        return padded.reshape(n_buckets, size)
+
+    valid = ~np.isnan(buckets(y, np.nan)).all(axis=1)
+    lo = buckets(y, np.inf).argmin(axis=1) + offsets
+    hi = buckets(y_max, -np.inf).argmax(axis=1) + offsets
+    return np.unique(np.concatenate([[0, n - 1], lo[valid], hi[valid]]))
+
+
+def extremes(values: np.ndarray, axis: int) -> tuple[np.ndarray, np.ndarray]:
+    """Return the minimum and maximum of *values* at each step along *axis*, over all other axes, ignoring NaNs."""
+    flat = np.moveaxis(np.asarray(values), axis, 0).reshape(values.shape[axis], -1)
+    return np.fmin.reduce(flat, axis=1), np.fmax.reduce(flat, axis=1)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Return the indices selected by Largest-Triangle-Three-Buckets.
+
+    The loop runs once per output point; all work within a bucket is vectorized.
+    NaNs in *y* are skipped.
+    """
+    x, y = _as_float(np.asarray(x)), _as_float(np.asarray(y))
+    keep = np.flatnonzero(~np.isnan(y))
+    x, y = x[keep], y[keep]
+    n = len(keep)
+    if n <= n_out or n_out < 3:
+        return keep
+
+    # Bucket i (1..n_out-2) covers points edges[i-1]:edges[i]; first/last are fixed
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    csum_x = np.concatenate([[0.0], np.cumsum(x)])
+    csum_y = np.concatenate([[0.0], np.cumsum(y)])
+
+    out = np.empty(n_out, dtype=int)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(1, n_out - 1):
+        lo, hi = edges[i - 1], edges[i]
+        if i < n_out - 2:
+            nlo, nhi = edges[i], edges[i + 1]
+            avg_x = (csum_x[nhi] - csum_x[nlo]) / (nhi - nlo)
+            avg_y = (csum_y[nhi] - csum_y[nlo]) / (nhi - nlo)
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        out[i] = a
+    return keep[out]
+
+
+def downsample(ds: xr.Dataset, max_points: int) -> xr.Dataset:
+    """Reduce *ds* to about *max_points* time steps with min/max-per-bucket selection.
+
+    The indices chosen for each numeric variable along time are merged, so
+    extremes of every variable survive. Variables with more dimensions, such
+    as ``(station, time)``, keep the steps holding the minimum and maximum over
+    all their other dimensions. Returns *ds* unchanged when it is already
+    small enough or has no time dimension.
+    """
+    dim_name = utils.time_dim_name(ds)
+    if not dim_name or dim_name not in ds.dims or ds.sizes[dim_name] <= max_points:
+        return ds
+
+    series = [v for v in ds.data_vars if dim_name in ds[v].dims and ds[v].dtype.kind in "fiu"]
+    if not series:
+        idx = np.unique(np.linspace(0, ds.sizes[dim_name] - 1, max_points).astype(int))
+        return ds.isel({dim_name: idx})
+
+    per_var = max(2, max_points // len(series))
+    chosen = []
+    for v in series:
+        lo, hi = extremes(ds[v].values, ds[v].dims.index(dim_name))
+        chosen.append(minmax_indices(lo, per_var, hi))
+    idx = np.unique(np.concatenate(chosen))
+    return ds.isel({dim_name: idx})
@@ -0,0 +1,262 @@
+import io
+import json
+import math
+import os
+import tempfile
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import xarray as xr
+
+from xview import utils
+
+
+def iter_csv(ds: xr.Dataset, block_size: int) -> Iterator[str]:
+    """Yield *ds* as CSV text, ``block_size`` time steps at a time.
+
+    Produces the same text as ``to_json_types(ds, fill_nan=False).to_dataframe().to_csv()``
+    while only holding one block in memory. Datasets whose leading dimension is
+    not time are written in a single block to keep the row order unchanged.
+    """
+    dim_name = utils.time_dim_name(ds)
+    dims = list(ds.dims)
+    if not dims or dims[0] != dim_name or ds.sizes[dim_name] == 0:
+        yield utils.to_json_types(ds, fill_nan=False).to_dataframe().to_csv()
+        return
+
+    for i in range(0, ds.sizes[dim_name], block_size):
+        block = utils.to_json_types(ds.isel({dim_name: slice(i, i + block_size)}), fill_nan=False)
+        yield block.to_dataframe().to_csv(header=i == 0)
+
+
+def iter_df_csv(df: pd.DataFrame, block_size: int) -> Iterator[str]:
+    """Yield *df* as CSV text (without index), ``block_size`` rows at a time."""
+    if len(df) == 0:
+        yield df.to_csv(index=False)
+        return
+
+    for i in range(0, len(df), block_size):
+        yield df.iloc[i : i + block_size].to_csv(index=False, header=i == 0)
+
+
+def _json_data(values: np.ndarray, data_var: bool):
+    """Convert *values* to (nested) Python lists the way ``to_json_types`` + ``to_dict`` would.
+
+    Data variables get NaN/NaT mapped to ``None`` and integers promoted to float,
+    matching ``Dataset.fillna(None)``; coordinates are left unfilled.
+    """
+    kind = values.dtype.kind
+    mask = None
+    if kind == "M":
+        mask = np.isnat(values)
+        values = np.datetime_as_string(values, unit="s")
+    elif kind == "S":
+        values = values.astype(str)
+    elif data_var and kind == "f":
+        mask = np.isnan(values)
+    elif data_var and kind in "biu":
+        return values.astype("float64").tolist()
+    elif data_var and kind == "O":
+        mask = pd.isnull(values)
+
+    if mask is None or not mask.any():
+        return values.tolist()
+    out = values.astype(object)
+    out[mask] = None if data_var else float("nan")
+    return out.tolist()
+
+
+def _json_dtype(var: xr.Variable, data_var: bool) -> str:
+    """Return the dtype ``to_json_types`` would leave *var* with."""
+    kind = var.dtype.kind
+    if kind == "M" or (data_var and kind in "fSUO"):
+        return "object"
+    if data_var and kind in "biu":
+        return "float64"
+    return str(var.dtype)
+
+
+def _iter_json_array(var: xr.Variable, data_var: bool, block_size: int) -> Iterator[str]:
+    if var.ndim == 0 or var.shape[0] == 0:
+        yield json.dumps(_json_data(var.values, data_var))
+        return
+
+    rows = max(1, block_size // max(1, math.prod(var.shape[1:])))
+    yield "["
+    for i in range(0, var.shape[0], rows):
+        text = json.dumps(_json_data(var[i : i + rows].values, data_var))
+        yield ("" if i == 0 else ", ") + text[1:-1]
+    yield "]"
+
+
+def iter_json(ds: xr.Dataset, exclude_data: bool = False, block_size: int = 65536) -> Iterator[str]:
+    """Yield *ds* as CF-style JSON, reading at most ``block_size`` values at a time.
+
+    The text is identical to ``json.dumps(to_json_types(ds).to_dict(data="list"))``
+    (or ``data=False`` with *exclude_data*), but is built straight from the NumPy
+    arrays without casting whole variables to object dtype.
+    """
+    skeleton = ds.to_dict(data=False)
+    yield "{"
+    for n, (section, value) in enumerate(skeleton.items()):
+        yield ("" if n == 0 else ", ") + json.dumps(section) + ": "
+        if section not in ("coords", "data_vars"):
+            yield json.dumps(value)
+            continue
+
+        data_var = section == "data_vars"
+        yield "{"
+        for m, (name, entry) in enumerate(value.items()):
+            var = ds.variables[name]
+            prefix = ("" if m == 0 else ", ") + json.dumps(name) + ": "
+            if exclude_data:
+                yield prefix + json.dumps({**entry, "dtype": _json_dtype(var, data_var)})
+                continue
+            head = json.dumps({k: v for k, v in entry.items() if k not in ("dtype", "shape")})
+            yield prefix + head[:-1] + ', "data": '
+            yield from _iter_json_array(var, data_var, block_size)
+            yield "}"
+        yield "}"
+    yield "}"
+
+
+MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+    "netcdf": "application/x-netcdf",
+}
+
+# Encoding keys that still hold after subsetting; the rest (chunk sizes,
+# source paths, ...) refer to the upstream file and can break to_netcdf
+_NETCDF_ENCODING_KEYS = ("dtype", "_FillValue", "scale_factor", "add_offset", "units", "calendar")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands out what was written since the last ``take``."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def take(self) -> bytes:
+        out = b"".join(self._chunks)
+        self._chunks = []
+        return out
+
+
+def _arrow_metadata(attrs: dict) -> dict[str, str]:
+    """Arrow metadata is str -> str: keep strings as-is and JSON-encode other values."""
+    return {k: v if isinstance(v, str) else json.dumps(v) for k, v in attrs.items()}
+
+
+def _arrow_table(ds: xr.Dataset, schema: pa.Schema | None = None) -> pa.Table:
+    """Flatten *ds* to one row per point of its dimensions, in ``to_dataframe`` order.
+
+    Dimension columns come first, then the other variables, each broadcast
+    from its own NumPy buffer. Variable and global attrs are kept as
+    field and schema metadata.
+    """
+    sizes = dict(ds.sizes)
+    skeleton = ds.to_dict(data=False)
+    names = list(sizes) + [v for v in ds.variables if v not in sizes]
+
+    fields, arrays = [], []
+    for name in names:
+        if name in ds.variables:
+            var = ds.variables[name]
+            attrs = skeleton["coords"].get(name, skeleton["data_vars"].get(name, {})).get("attrs", {})
+        else:
+            var = xr.Variable(name, np.arange(sizes[name]))
+            attrs = {}
+        values = var.set_dims(sizes).transpose(*sizes).values.ravel()
+        if values.dtype.kind == "S":
+            values = utils._decode_bytes(values)
+        type_ = schema.field(name).type if schema is not None else None
+        array = pa.array(values, type=type_, from_pandas=True)
+        if array.type == pa.null():
+            # All-missing object column: assume strings so later blocks still fit
+            array = array.cast(pa.string())
+        fields.append(pa.field(name, array.type, metadata=_arrow_metadata(attrs)))
+        arrays.append(array)
+
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields, metadata=_arrow_metadata(skeleton["attrs"])))
+
+
+def _iter_tables(ds: xr.Dataset, block_size: int) -> Iterator[pa.Table]:
+    """Yield *ds* as Arrow tables of ``block_size`` steps along its leading dimension.
+
+    All tables share the schema of the first one.
+    """
+    dims = list(ds.dims)
+    if not dims or ds.sizes[dims[0]] == 0:
+        yield _arrow_table(ds)
+        return
+    schema = None
+    for i in range(0, ds.sizes[dims[0]], block_size):
+        table = _arrow_table(ds.isel({dims[0]: slice(i, i + block_size)}), schema)
+        schema = table.schema
+        yield table
+
+
+def _iter_written(tables: Iterator[pa.Table], open_writer) -> Iterator[bytes]:
+    sink = _ChunkSink()
+    writer = None
+    for table in tables:
+        if writer is None:
+            writer = open_writer(sink, table.schema)
+        writer.write_table(table)
+        yield sink.take()
+    writer.close()
+    yield sink.take()
+
+
+def iter_arrow(ds: xr.Dataset, block_size: int) -> Iterator[bytes]:
+    """Yield *ds* as an Arrow IPC stream, one record batch per block."""
+    return _iter_written(_iter_tables(ds, block_size), pa.ipc.new_stream)
+
+
+def iter_parquet(ds: xr.Dataset, block_size: int) -> Iterator[bytes]:
+    """Yield *ds* as a Parquet file, one row group per block."""
+    return _iter_written(_iter_tables(ds, block_size), pq.ParquetWriter)
+
+
+def iter_netcdf(ds: xr.Dataset, chunk_size: int = 1 << 20) -> Iterator[bytes]:
+    """Write *ds* to a temporary NetCDF4 file and yield its bytes."""
+    ds = ds.copy(deep=False)
+    for var in ds.variables.values():
+        var.encoding = {k: v for k, v in var.encoding.items() if k in _NETCDF_ENCODING_KEYS}
+
+    fd, path = tempfile.mkstemp(suffix=".nc")
+    os.close(fd)
+    try:
+        ds.to_netcdf(path, engine="netcdf4")
+        with open(path, "rb") as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+    finally:
+        os.remove(path)
+
+
+def iter_binary(ds: xr.Dataset, f: str, block_size: int) -> Iterator[bytes]:
+    """Yield *ds* in one of the binary formats in ``MEDIA_TYPES``."""
+    if f == "arrow":
+        return iter_arrow(ds, block_size)
+    if f == "parquet":
+        return iter_parquet(ds, block_size)
+    if f == "netcdf":
+        return iter_netcdf(ds)
+    raise ValueError(f"Unsupported binary format: {f}")
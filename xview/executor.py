@@ -0,0 +1,46 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterator
+from urllib.parse import urlsplit
+
+from xview.config import SETTINGS
+
+_EXECUTOR = ThreadPoolExecutor(max_workers=SETTINGS.data_workers, thread_name_prefix="xview-data")
+_HOST_LIMITS: dict[str, asyncio.Semaphore] = {}
+
+
+def upstream_host(url: str) -> str:
+    """Return the host part of *url* used to group upstream requests ('' for local files)."""
+    return urlsplit(url.strip()).netloc.lower()
+
+
+def _host_limit(url: str) -> asyncio.Semaphore:
+    host = upstream_host(url)
+    if host not in _HOST_LIMITS:
+        _HOST_LIMITS[host] = asyncio.Semaphore(SETTINGS.upstream_concurrency)
+    return _HOST_LIMITS[host]
+
+
+async def run(url: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run blocking *func* in the data thread pool.
+
+    At most ``upstream_concurrency`` calls for the host of *url* run at once,
+    so one slow OPeNDAP server cannot occupy the whole pool. *func* runs in a
+    copy of the caller's context, so metric labels carry over.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    async with _host_limit(url):
+        return await loop.run_in_executor(_EXECUTOR, functools.partial(context.run, func, *args, **kwargs))
+
+
+async def iterate(url: str, iterator: Iterator[Any]) -> AsyncIterator[Any]:
+    """Drain a blocking *iterator* in the data thread pool, one item per call."""
+    done = object()
+    while True:
+        item = await run(url, next, iterator, done)
+        if item is done:
+            break
+        yield item
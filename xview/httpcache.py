@@ -0,0 +1,116 @@
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import AsyncIterator
+
+import pandas as pd
+import xarray as xr
+
+from xview import timeindex
+from xview.cache import LRUCache, normalize_url
+from xview.config import SETTINGS
+
+
+@dataclass(frozen=True)
+class Version:
+    """What a dataset looked like when it was last opened; changes when its contents do."""
+
+    tag: str
+    last_modified: datetime | None
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    media_type: str
+
+
+# Versions expire with the dataset handles they were derived from
+VERSIONS = LRUCache(maxsize=SETTINGS.dataset_cache_size, ttl=SETTINGS.dataset_cache_ttl, name="versions")
+# Complete /data bodies by ETag, which covers both the query and the dataset version
+RESPONSES = LRUCache(
+    maxsize=SETTINGS.response_cache_size,
+    maxbytes=SETTINGS.response_cache_bytes,
+    sizeof=lambda r: len(r.body),
+    name="responses",
+)
+
+
+def query_key(url: str, param_name: str | None, start, end, step, f: str, *options) -> tuple:
+    """Return a canonical key for a /data query; equivalent spellings map to the same key."""
+    names = ",".join(sorted({v.strip() for v in (param_name or "").split(",") if v.strip()}))
+    bounds = tuple(v.isoformat() if isinstance(v, datetime) else v for v in (start, end))
+    return (normalize_url(url), names, *bounds, step, f, *options)
+
+
+def _parse_date(value) -> datetime | None:
+    try:
+        ts = pd.Timestamp(value)
+    except (TypeError, ValueError):
+        return None
+    if pd.isna(ts):
+        return None
+    ts = ts.tz_localize("UTC") if ts.tz is None else ts.tz_convert("UTC")
+    return ts.to_pydatetime()
+
+
+def dataset_version(url: str, ds: xr.Dataset) -> Version:
+    """Derive the version of *ds* from its ``date_modified``/``history`` attrs and time extent and remember it."""
+    index = timeindex.get(url, ds)
+    parts = [str(ds.attrs.get("date_modified", "")), str(ds.attrs.get("history", "")), json.dumps(dict(ds.sizes))]
+    if index is not None:
+        parts += [index.min.isoformat(), index.max.isoformat()]
+    tag = hashlib.sha1("\n".join(parts).encode()).hexdigest()
+
+    last_modified = _parse_date(ds.attrs.get("date_modified"))
+    if last_modified is None and index is not None:
+        last_modified = _parse_date(index.max)
+    if last_modified is not None:
+        last_modified = min(last_modified, datetime.now(timezone.utc))
+
+    version = Version(tag=tag, last_modified=last_modified)
+    VERSIONS.put(normalize_url(url), version)
+    return version
+
+
+def known_version(url: str) -> Version | None:
+    """Return the last version seen for *url* without opening it, or None if it has expired."""
+    return VERSIONS.get(normalize_url(url))
+
+
+def etag(version: Version, key: tuple) -> str:
+    return '"' + hashlib.sha1(f"{version.tag}{key!r}".encode()).hexdigest()[:32] + '"'
+
+
+def headers(version: Version, tag: str) -> dict[str, str]:
+    result = {"ETag": tag}
+    if version.last_modified is not None:
+        result["Last-Modified"] = format_datetime(version.last_modified, usegmt=True)
+    return result
+
+
+def matches(if_none_match: str | None, tag: str) -> bool:
+    """Return True if an ``If-None-Match`` header value matches *tag* (weak comparison)."""
+    if not if_none_match:
+        return False
+    tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return "*" in tags or tag in tags
+
+
+async def record(tag: str, iterator: AsyncIterator, media_type: str, charset: str) -> AsyncIterator:
+    """Pass a response body through, storing it under *tag* once complete if it fits the budget."""
+    chunks, size = [], 0
+    async for chunk in iterator:
+        yield chunk
+        if chunks is None:
+            continue
+        chunk = chunk.encode(charset) if isinstance(chunk, str) else bytes(chunk)
+        size += len(chunk)
+        if size > SETTINGS.response_cache_bytes:
+            chunks = None
+        else:
+            chunks.append(chunk)
+    if chunks is not None:
+        RESPONSES.put(tag, CachedResponse(body=b"".join(chunks), media_type=media_type))
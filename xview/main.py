@@ -1,25 +1,39 @@
+import asyncio
 import logging
+import secrets
+import time
 import uvicorn
 import sys
 
 # %%
 import xarray as xr
-import json
-import panel as pn
 import pandas as pd
+import numpy as np
 from typing import Annotated
-from bokeh.embed import server_document
-from fastapi import FastAPI, Request, Query, HTTPException
+from fastapi import APIRouter, FastAPI, Request, Query, HTTPException
 from fastapi.templating import Jinja2Templates
-from xview.viewer import create_app
-from xview import utils
-import panel as pn
+from xview import (
+    cache,
+    catalogindex,
+    downsample,
+    encoders,
+    executor,
+    httpcache,
+    metadata,
+    metrics,
+    preview,
+    profiling,
+    resampling,
+    tailcache,
+    timeindex,
+    utils,
+)
+from contextlib import asynccontextmanager
 from datetime import datetime
 from pydantic import BeforeValidator
 from typing import Union
-import cf_xarray
 import xarray as xr
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
 from xview.config import SETTINGS
 
 
@@ -29,12 +43,32 @@ logging.basicConfig(
     handlers=[logging.StreamHandler(sys.stdout)],
 )
 
-app = FastAPI(
-    docs_url="/docs",
-    title="xview",
-    version="v1",
-    root_path="/xview"
-)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Keep the catalog search index fresh in the background when a catalog is configured
+    refresh = None
+    if SETTINGS.catalog_url:
+        refresh = asyncio.create_task(catalogindex.refresh_forever(SETTINGS.catalog_url))
+    yield
+    if refresh is not None:
+        refresh.cancel()
+
+
+# /data, /metadata, /catalog, /health, /profiles and /metrics; nothing here imports the plotting stack
+router = APIRouter()
+# /panel, which embeds a session of the preview server (see xview.preview)
+preview_router = APIRouter()
+
+
+async def observe_request(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    metrics.REQUEST_SECONDS.observe(
+        time.perf_counter() - start, endpoint=getattr(route, "path", "other"), status=response.status_code
+    )
+    return response
 
 templates = Jinja2Templates(directory="templates")
 
@@ -55,7 +89,7 @@ def parse_slice_param(value):
 
 StartEndParam = Annotated[Union[int, datetime, None], BeforeValidator(parse_slice_param)]
 
-@app.get("/panel")
+@preview_router.get("/panel")
 async def xview(
     url: Annotated[str, Query(description="OPeNDAP URL")],
     request: Request,
@@ -64,124 +98,404 @@ async def xview(
     end: Annotated[StartEndParam, Query(description="End time in ISO 8601 or index")] = None,
     step: Annotated[int | None, Query(description="Select every step number of points between start and stop")] = None,
     timeseries_id: Annotated[str | None, Query(alias="timeseries-id", description="Subset to a specific timeseries_id (cf_role=timeseries_id)")] = None,
+    profile: Annotated[bool, Query(description="Profile building the preview session (requires X-Admin-Token)")] = False,
 ):
     """
     Render of a panel preview using xarray.
 
     The timeSeries and trajectory featureTypes are supported in simple form.
 
+    With profile=true (or an X-Xview-Profile header) and a valid X-Admin-Token header, the preview
+    session is built under the sampling profiler. The X-Xview-Profile response header names the
+    profile, see /profiles.
+
     Returns:
         TemplateResponse: A response object rendering a html template with the embedded Bokeh script.
     """
 
-    query_params = request.query_params
+    query_params = dict(request.query_params)
     if start is not None and end is not None and type(start) != type(end):
         return Response(content="start and end must be of the same type if both are provided", status_code=400)
 
-    script = server_document(f"{SETTINGS.bokeh_url}/bokeh/preview", arguments=query_params)
-    return templates.TemplateResponse("base.html", {"request": request, "script": script})
+    profile_id = None
+    query_params.pop("profile", None)
+    if profiling.requested(profile, request.headers.get(profiling.PROFILE_HEADER)):
+        _require_admin(request)
+        profile_id = secrets.token_hex(8)
+        # The session runs in the Bokeh server; a signed id lets it profile itself without the admin token
+        query_params["profile"] = profiling.sign(profile_id)
+
+    # Pin the client to one preview worker, so its session and websocket land in the same process
+    client = request.headers.get("x-forwarded-for", "").split(",")[0].strip() or getattr(request.client, "host", "")
+    from bokeh.embed import server_document
+
+    script = server_document(f"{preview.worker_url(client)}{preview.PREFIX}/preview", arguments=query_params)
+    response = templates.TemplateResponse("base.html", {"request": request, "script": script})
+    if profile_id is not None:
+        response.headers[profiling.PROFILE_HEADER] = profile_id
+    return response
 
 
-@app.get("/data")
+@router.get("/data")
 async def xdata_url(
     url: Annotated[str, Query(description="OPeNDAP URL")],
+    request: Request,
     param_name: Annotated[str, Query(alias="parameter-name", description="Data variables in dataset to return, comma separated string")] = None,
     start: Annotated[StartEndParam, Query(description="Start time in ISO 8601 or index")] = None,
     end: Annotated[StartEndParam, Query(description="End time in ISO 8601 or index")] = None,
     step: Annotated[int, Query(description="Step size")] = None,
-    f: Annotated[str, Query(description="Output format", pattern="^(html|json|csv)$")] = "html",
+    f: Annotated[str, Query(description="Output format", pattern="^(html|json|csv|arrow|parquet|netcdf)$")] = "html",
     exclude_data: Annotated[bool, Query(alias="exclude-data", description="Exclude data from json output")] = False,
-    timeseries_id: Annotated[str | None, Query(alias="timeseries-id", description="Subset to a specific timeseries_id (cf_role=timeseries_id)")] = None,
+    timeseries_id: Annotated[str | None, Query(alias="timeseries-id", description="Subset to these comma separated timeseries_ids (cf_role=timeseries_id) or glob patterns, e.g. NO*")] = None,
+    max_points: Annotated[int | None, Query(alias="max-points", ge=3, description="Reduce to about this many time steps, keeping the min and max of every bucket")] = None,
+    resample: Annotated[str | None, Query(description="Aggregate along time into bins of this pandas frequency, e.g. 1h or 1D")] = None,
+    agg: Annotated[str, Query(description="Aggregation used with resample", pattern=f"^({'|'.join(resampling.AGGREGATIONS)})$")] = "mean",
+    profile: Annotated[bool, Query(description="Run the request under the sampling profiler (requires X-Admin-Token)")] = False,
 ):
     """
-    Convert a dataset into csv, json or html.
+    Convert a dataset into csv, json, html or one of the binary formats arrow (IPC stream), parquet and netcdf.
     The timeSeries, trajectory and timeSeriesProfile featureTypes are supported.
 
     For large datasets, the exclude-data parameter can be used to exclude the data from the json output.
     This is useful for fetching the size and requesting the data in smaller batches using the start and end index parameters,
     indexing is 0-based. Indexing from the end is supported using negative indices [e.g. -1 is the last point].
+    With exclude-data no data values are read. See also /metadata.
 
     Currently only the time dimension is supported for start, end and step.
 
+    The timeseries-id parameter selects stations by their cf_role=timeseries_id value. It takes a comma
+    separated list, and entries containing *, ? or [ are glob patterns (e.g. timeseries-id=NO*,SE012).
+    All matching stations are returned in one response, with the station as a dimension (or a column of
+    ragged timeSeriesProfile data).
+
+    The max-points parameter downsamples gridded data along time by keeping the minimum and maximum
+    of each variable per bucket, so spikes survive. It does not apply to ragged timeSeriesProfile data.
+
+    The resample parameter aggregates along time into bins of a pandas frequency (e.g. 10min, 1h, 1D, MS)
+    with agg=mean|min|max|count|median, ignoring missing values. Empty bins are left out, and each bin is
+    labelled with its start time. Gridded and multi-station data are reduced per time series, with
+    coordinates along time (such as a ship's position) averaged. Ragged timeSeriesProfile data are
+    reduced per station and depth. Resampling is applied after start, end and step, and before max-points.
+
+    Responses carry an ETag and Last-Modified derived from the dataset's date_modified and history
+    attributes and time extent. A matching If-None-Match returns 304 Not Modified, and repeated
+    queries are answered from a server-side cache until the dataset changes.
+
+    With profile=true (or an X-Xview-Profile header) and a valid X-Admin-Token header, the request
+    bypasses the response cache and runs under the sampling profiler. The X-Xview-Profile response
+    header names the profile, which is available from /profiles once the body has been sent.
+
     Returns:
-        Data in the requested format (json, csv, html) based on the f parameter.
+        Data in the requested format (json, csv, html, arrow, parquet, netcdf) based on the f parameter.
     """
 
     if start is not None and end is not None and type(start) != type(end):
         return Response(content="start and end must be of the same type if both are provided", status_code=400)
 
-    ds = xr.open_dataset(url)
+    if resample is not None:
+        try:
+            resampling.check_freq(resample)
+        except ValueError:
+            raise HTTPException(status_code=422, detail=f"Invalid resample frequency: {resample}")
+
+    key = httpcache.query_key(
+        url, param_name, start, end, step, f, exclude_data, timeseries_id, max_points, resample, resample and agg
+    )
+    if_none_match = request.headers.get("if-none-match")
+    profile = _start_profile(request, "/data", profile)
+    with metrics.labels(endpoint="/data", format=f, host=executor.upstream_host(url)), profiling.activate(profile):
+        version = httpcache.known_version(url) if profile is None else None
+        if version is not None:
+            cached = _cached_response(version, key, if_none_match)
+            if cached is not None:
+                return cached
+
+        response = await executor.run(
+            url,
+            profiling.traced(_data_response),
+            url,
+            key,
+            if_none_match,
+            param_name,
+            start,
+            end,
+            step,
+            f,
+            exclude_data,
+            timeseries_id,
+            max_points,
+            resample,
+            agg,
+            refresh=profile is not None,
+        )
+    return _finish_profile(profile, response)
+
 
+def _require_admin(request: Request) -> None:
+    if not profiling.authorized(request.headers.get(profiling.ADMIN_HEADER)):
+        raise HTTPException(status_code=403, detail="A valid X-Admin-Token header is required")
+
+
+def _start_profile(request: Request, endpoint: str, flag: bool) -> profiling.Profile | None:
+    """Start profiling the request if it asks for it; None for normal traffic."""
+    if not profiling.requested(flag, request.headers.get(profiling.PROFILE_HEADER)):
+        return None
+    _require_admin(request)
+    query = {k: v for k, v in request.query_params.items() if k != "profile"}
+    return profiling.Profile(endpoint, query).start()
+
+
+def _finish_profile(profile: profiling.Profile | None, response: Response) -> Response:
+    """Name the profile in the response and finish it once the body has been produced."""
+    if profile is None:
+        return response
+    response.headers[profiling.PROFILE_HEADER] = profile.id
+    if isinstance(response, StreamingResponse):
+        response.body_iterator = profiling.finish_after(profile, response.body_iterator)
+    else:
+        profile.finish()
+    return response
+
+
+def _cached_response(version: httpcache.Version, key: tuple, if_none_match: str | None) -> Response | None:
+    """Answer from the ETag alone (304) or from the response cache; None if the query has to run."""
+    tag = httpcache.etag(version, key)
+    headers = httpcache.headers(version, tag)
+    if httpcache.matches(if_none_match, tag):
+        metrics.RESPONSES.inc(cache="not_modified", **metrics.current_labels())
+        return Response(status_code=304, headers=headers)
+    cached = httpcache.RESPONSES.get(tag)
+    if cached is not None:
+        metrics.RESPONSES.inc(cache="hit", **metrics.current_labels())
+        metrics.RESPONSE_BYTES.inc(len(cached.body), **metrics.current_labels())
+        return Response(content=cached.body, media_type=cached.media_type, headers=headers)
+    return None
+
+
+def _store_response(response: Response, version: httpcache.Version, key: tuple) -> Response:
+    """Tag a successful response with ETag/Last-Modified and record its body in the response cache."""
+    if response.status_code != 200:
+        return response
+    tag = httpcache.etag(version, key)
+    response.headers.update(httpcache.headers(version, tag))
+    if isinstance(response, StreamingResponse):
+        response.body_iterator = httpcache.record(tag, response.body_iterator, response.media_type, response.charset)
+    else:
+        cached = httpcache.CachedResponse(body=bytes(response.body), media_type=response.media_type)
+        httpcache.RESPONSES.put(tag, cached)
+    return response
+
+
+def _stream(url: str, iterator, media_type: str) -> StreamingResponse:
+    """Stream a blocking iterator, pulling each chunk through the data executor."""
+    iterator = profiling.bind(metrics.count_stream(iterator))
+    return StreamingResponse(executor.iterate(url, iterator), media_type=media_type)
+
+
+def _data_response(
+    url: str,
+    key: tuple,
+    if_none_match: str | None,
+    param_name,
+    start,
+    end,
+    step,
+    f: str,
+    exclude_data: bool,
+    timeseries_id: str | None,
+    max_points: int | None,
+    resample: str | None = None,
+    agg: str = "mean",
+    refresh: bool = False,
+) -> Response:
+    """Open, subset and serialize a dataset for /data unless it is cached (or *refresh*); runs in the data executor."""
+    ds = cache.open_dataset(url)
+    version = httpcache.dataset_version(url, ds)
+    cached = None if refresh else _cached_response(version, key, if_none_match)
+    if cached is not None:
+        return cached
+    metrics.RESPONSES.inc(cache="miss", **metrics.current_labels())
+    response = _render_data(
+        url, ds, param_name, start, end, step, f, exclude_data, timeseries_id, max_points, resample, agg
+    )
+    return _store_response(response, version, key)
+
+
+def _render_data(
+    url: str,
+    ds: xr.Dataset,
+    param_name,
+    start,
+    end,
+    step,
+    f: str,
+    exclude_data: bool,
+    timeseries_id: str | None,
+    max_points: int | None,
+    resample: str | None = None,
+    agg: str = "mean",
+) -> Response:
     if utils.is_ragged_tsp(ds):
-        return _ragged_tsp_response(ds, param_name, start, end, f, timeseries_id, exclude_data)
+        return _ragged_tsp_response(url, ds, param_name, start, end, f, timeseries_id, exclude_data, resample, agg)
 
-    if timeseries_id is not None:
+    # Recent time windows of growing datasets are served from the local tail cache
+    local = tailcache.window(url, ds, start)
+    time_index = timeindex.get(url, ds) if local is ds else None
+    timeseries_ids = utils.parse_timeseries_ids(timeseries_id)
+    if timeseries_ids is not None:
         try:
-            ds = utils.subset_by_timeseries_id(ds, timeseries_id)
+            local = utils.subset_by_timeseries_ids(local, timeseries_ids, url)
         except ValueError as e:
             return Response(content=str(e), status_code=404)
-        return _ragged_tsp_response(ds, param_name, start, end, f, timeseries_id, exclude_data)
+    ds = utils.subset(local, param_name, start, end, step, time_index)
+    if resample:
+        ds = resampling.resample(ds, resample, agg)
+    if max_points:
+        ds = downsample.downsample(ds, max_points)
+    if not exclude_data:
+        metrics.ROWS.inc(int(np.prod(list(ds.sizes.values()))), **metrics.current_labels())
+    if f == "csv":
+        return _stream(url, encoders.iter_csv(ds, SETTINGS.csv_block_size), "text/csv")
 
-    ds = utils.subset(ds, param_name, start, end, step)
-    ds = utils.to_json_types(ds, fill_nan=f == "json")
     if f == "json":
-        return Response(
-            content=json.dumps(ds.to_dict(data=False if exclude_data else "list")),
-            media_type="application/json",
-        )
-    elif f == "csv":
-        return Response(content=ds.to_dataframe().to_csv(), media_type="text/csv")
-    else:
-        return Response(content=ds.to_dataframe().to_html(), media_type="text/html")
-
-
-def _ragged_tsp_response(ds: xr.Dataset, param_name, start, end, f: str, timeseries_id: str | None = None, exclude_data: bool = False) -> Response:
-    """Expand a ragged-array timeSeriesProfile and return the requested format."""
-    df = utils.expand_ragged_tsp(ds)
-
-    if timeseries_id is not None:
-        stn_id_var = utils.get_timeseries_id_var(ds)
-        if stn_id_var and stn_id_var in df.columns:
-            df = df[df[stn_id_var] == timeseries_id]
-
-    if param_name:
-        requested = {v.strip() for v in param_name.split(",")}
-        coord_cols = {c for c in df.columns if c not in ds.data_vars or ds[c].attrs.get("cf_role")}
-        keep = coord_cols | (requested & set(df.columns))
-        df = df[[c for c in df.columns if c in keep]]
-
-    time_col = next((c for c in df.columns if c in ("time", "TIME")), None)
-    if time_col and isinstance(start, datetime):
-        df[time_col] = pd.to_datetime(df[time_col])
-        if start is not None:
-            df = df[df[time_col] >= start]
-        if end is not None:
-            df = df[df[time_col] <= end]
+        return _stream(url, encoders.iter_json(ds, exclude_data=exclude_data), "application/json")
+
+    if f in encoders.MEDIA_TYPES:
+        return _stream(url, encoders.iter_binary(ds, f, SETTINGS.csv_block_size), encoders.MEDIA_TYPES[f])
+
+    with metrics.stage("encode"):
+        content = utils.to_json_types(ds, fill_nan=False).to_dataframe().to_html()
+    metrics.RESPONSE_BYTES.inc(len(content.encode()), **metrics.current_labels())
+    return Response(content=content, media_type="text/html")
+
+
+def _frame_to_dataset(df: pd.DataFrame | dict[str, np.ndarray], ds: xr.Dataset) -> xr.Dataset:
+    """Wrap an expanded ragged frame (or its columns) as a 1-D ``obs`` dataset carrying the attrs of *ds*."""
+    ds_out = xr.Dataset(
+        {col: xr.DataArray(np.asarray(values), dims=["obs"]) for col, values in df.items()}
+    )
+    for var in list(ds_out.data_vars) + list(ds_out.coords):
+        if var in ds:
+            ds_out[var].attrs = ds[var].attrs
+    ds_out.attrs = ds.attrs
+    return ds_out
+
+
+def _resample_ragged(df: pd.DataFrame, ds: xr.Dataset, freq: str, agg: str) -> pd.DataFrame:
+    """Aggregate an expanded ragged frame over time per station and depth; station and profile columns keep their first value."""
+    time_var = next((v for v in ("time", "TIME") if v in df.columns), None)
+    if time_var is None or df[time_var].dtype.kind != "M":
+        return df
+    row_size_var, _ = utils.ragged_counting_vars(ds)
+    obs_dim = ds[row_size_var].attrs["sample_dimension"]
+    by = tuple(c for c in (utils.get_timeseries_id_var(ds), utils.ragged_depth_var(ds)) if c in df.columns)
+    first = tuple(c for c in df.columns if ds[c].dims != (obs_dim,))
+    return resampling.resample_frame(df, time_var, freq, agg, by=by, first=first)
+
+
+def _ragged_tsp_response(url: str, ds: xr.Dataset, param_name, start, end, f: str, timeseries_id: str | None = None, exclude_data: bool = False, resample: str | None = None, agg: str = "mean") -> Response:
+    """Read the requested part of a ragged-array timeSeriesProfile and return the requested format."""
+    time_range = isinstance(start, datetime)
+    selection = dict(
+        variables={v.strip() for v in param_name.split(",")} if param_name else None,
+        timeseries_ids=utils.parse_timeseries_ids(timeseries_id) if utils.get_timeseries_id_var(ds) else None,
+        start=start if time_range else None,
+        end=end if time_range else None,
+        url=url,
+    )
+    schema_only = f == "json" and exclude_data
+    try:
+        if schema_only:
+            schema = utils.ragged_tsp_schema(ds, **selection)
+        else:
+            df = utils.read_ragged_tsp(ds, **selection).df
+    except ValueError as e:
+        return Response(content=str(e), status_code=404)
+    if schema_only:
+        ds_out = _frame_to_dataset(schema, ds)
+        return _stream(url, encoders.iter_json(ds_out, exclude_data=True), "application/json")
+
+    if resample:
+        df = _resample_ragged(df, ds, resample, agg)
+    metrics.ROWS.inc(len(df), **metrics.current_labels())
 
     if f == "json":
-        ds_out = xr.Dataset(
-            {col: xr.DataArray(df[col].values, dims=["obs"]) for col in df.columns}
-        )
-        for var in list(ds_out.data_vars) + list(ds_out.coords):
-            if var in ds:
-                ds_out[var].attrs = ds[var].attrs
-        ds_out.attrs = ds.attrs
-        ds_out = utils.to_json_types(ds_out, fill_nan=True)
-        return Response(
-            content=json.dumps(ds_out.to_dict(data=False if exclude_data else "list")),
-            media_type="application/json",
-        )
+        ds_out = _frame_to_dataset(df, ds)
+        return _stream(url, encoders.iter_json(ds_out, exclude_data=exclude_data), "application/json")
+
+    if f in encoders.MEDIA_TYPES:
+        ds_out = _frame_to_dataset(df, ds)
+        return _stream(url, encoders.iter_binary(ds_out, f, SETTINGS.csv_block_size), encoders.MEDIA_TYPES[f])
 
     for col in df.select_dtypes(include=["datetime64[ns]", "datetimetz"]).columns:
         df[col] = df[col].dt.strftime("%Y-%m-%dT%H:%M:%S")
 
     if f == "csv":
-        return Response(content=df.to_csv(index=False), media_type="text/csv")
+        return _stream(url, encoders.iter_df_csv(df, SETTINGS.csv_block_size), "text/csv")
     else:
-        return Response(content=df.to_html(index=False), media_type="text/html")
+        with metrics.stage("encode"):
+            content = df.to_html(index=False)
+        metrics.RESPONSE_BYTES.inc(len(content.encode()), **metrics.current_labels())
+        return Response(content=content, media_type="text/html")
     
  
-@app.get("/health")
+@router.get("/metadata")
+async def xmetadata_url(url: Annotated[str, Query(description="OPeNDAP URL")]):
+    """
+    Describe a dataset without reading its data: dims and sizes, attrs, featureType,
+    time bounds and the variables with their dims, dtype, shape and attrs.
+
+    Use it to plan paged /data requests with the start and end index parameters.
+    The result is cached per URL.
+
+    Returns:
+        A JSON object with the dataset metadata.
+    """
+    with metrics.labels(endpoint="/metadata", format="json", host=executor.upstream_host(url)):
+        return await executor.run(url, metadata.get, url)
+
+
+def parse_bbox(value: str | None) -> tuple[float, float, float, float] | None:
+    if value is None or value == "":
+        return None
+    try:
+        bbox = tuple(float(v) for v in value.split(","))
+    except ValueError:
+        bbox = ()
+    if len(bbox) != 4:
+        raise HTTPException(status_code=422, detail=f"Invalid bbox, expected lon_min,lat_min,lon_max,lat_max: {value}")
+    return bbox
+
+
+@router.get("/catalog/search")
+def catalog_search(
+    bbox: Annotated[str | None, Query(description="Bounding box as lon_min,lat_min,lon_max,lat_max")] = None,
+    start: Annotated[datetime | None, Query(description="Start of the time range in ISO 8601")] = None,
+    end: Annotated[datetime | None, Query(description="End of the time range in ISO 8601")] = None,
+    variable: Annotated[str | None, Query(description="Variable name or CF standard_name")] = None,
+    station: Annotated[str | None, Query(description="Station id (cf_role=timeseries_id)")] = None,
+    feature_type: Annotated[str | None, Query(alias="feature-type", description="CF featureType")] = None,
+    limit: Annotated[int, Query(ge=1, le=10000, description="Maximum number of datasets returned")] = 100,
+):
+    """
+    Search the local catalog index for datasets intersecting a bounding box and time range,
+    having a variable or containing a station. All given filters must match.
+
+    The index is filled by crawling the THREDDS catalog at catalog_url in the background.
+
+    Returns:
+        A JSON list of datasets with their OPeNDAP URL, title, featureType, bbox, time coverage,
+        variables and timeseries ids.
+    """
+    bounds = parse_bbox(bbox)
+    if not catalogindex.exists():
+        # Nothing has been indexed yet
+        return []
+    with catalogindex.connect() as conn:
+        return catalogindex.search(conn, bounds, start, end, variable, station, feature_type, limit)
+
+
+@router.get("/health")
 async def health_check():
     """
     Health check endpoint to verify the service is running.
@@ -190,16 +504,73 @@ async def health_check():
     """
     return {"status": "ok"}
 
-pn.extension(template="fast")
-pn.serve(
-    {"/preview": create_app},
-    port=5000,
-    allow_websocket_origin=[f"{SETTINGS.server_url.split('//')[1]}"],
-    address="0.0.0.0",
-    show=False,
-    prefix="/bokeh",
 
-)
+@router.get("/profiles")
+def list_profiles(request: Request):
+    """
+    List the stored profiles (requires X-Admin-Token), newest first, with the query each was taken for.
+    Returns:
+        A JSON list of profile summaries.
+    """
+    _require_admin(request)
+    return profiling.summaries()
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile(
+    profile_id: str,
+    request: Request,
+    f: Annotated[str, Query(description="Output format", pattern="^(folded|json)$")] = "folded",
+):
+    """
+    Return one profile (requires X-Admin-Token). The folded format has one line per sampled stack
+    with its sample count, as read by flamegraph.pl and speedscope; json adds the query and timing.
+    Returns:
+        The profile as text/plain (folded) or JSON.
+    """
+    _require_admin(request)
+    record = profiling.get(profile_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found (or not finished yet)")
+    if f == "json":
+        return record
+    return Response(content=record["folded"], media_type="text/plain")
+
+
+@router.get("/metrics")
+async def metrics_endpoint():
+    """
+    Metrics in the Prometheus text format: per-stage timings of /data (open_dataset, subset,
+    expand_ragged_tsp, to_json_types, encode), bytes read from upstream, response bytes, rows
+    emitted and cache hits and misses, labelled by endpoint, format and upstream host.
+    Returns:
+        The metrics as text/plain.
+    """
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def create_app(preview: bool = True) -> FastAPI:
+    """Build the API; without *preview* there is no /panel, for workers that only serve data."""
+    app = FastAPI(
+        docs_url="/docs",
+        title="xview",
+        version="v1",
+        root_path="/xview",
+        lifespan=lifespan,
+    )
+    app.middleware("http")(observe_request)
+    app.include_router(router)
+    if preview:
+        app.include_router(preview_router)
+    return app
+
+
+def create_data_app() -> FastAPI:
+    """The API without /panel: ``uvicorn --factory xview.main:create_data_app``."""
+    return create_app(preview=False)
+
+
+app = create_app()
 
 
 if __name__ == "__main__":
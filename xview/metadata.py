@@ -0,0 +1,57 @@
+import pandas as pd
+import xarray as xr
+
+from xview import cache, timeindex, utils
+from xview.cache import LRUCache, normalize_url
+from xview.config import SETTINGS
+
+METADATA = LRUCache(maxsize=SETTINGS.dataset_cache_size, ttl=SETTINGS.dataset_cache_ttl, name="metadata")
+
+
+def _time_bounds(url: str, ds: xr.Dataset) -> dict | None:
+    index = timeindex.get(url, ds)
+    if index is not None:
+        return {"dim": index.dim, "start": index.min.isoformat(), "end": index.max.isoformat(), "size": len(index)}
+
+    # Ragged layouts keep time on the profile or obs dimension instead of a time dimension
+    time_var = next((v for v in ("time", "TIME") if v in ds and ds[v].dtype.kind == "M"), None)
+    if time_var is None:
+        return None
+    values = pd.to_datetime(ds[time_var].values.ravel())
+    if values.isna().all():
+        return None
+    return {
+        "dim": ds[time_var].dims[0],
+        "start": values.min().isoformat(),
+        "end": values.max().isoformat(),
+        "size": ds[time_var].size,
+    }
+
+
+def describe(url: str, ds: xr.Dataset) -> dict:
+    """Describe *ds* without reading data variables.
+
+    Only the time coordinate (usually already in memory as an index) and, for
+    ragged or multi-station data, the small station id variable are read.
+    """
+    skeleton = ds.to_dict(data=False)
+    meta = {
+        "url": url,
+        "featureType": ds.attrs.get("featureType"),
+        "ragged": utils.is_ragged_tsp(ds),
+        "dims": list(skeleton["dims"]),
+        "sizes": skeleton["dims"],
+        "time": _time_bounds(url, ds),
+        "attrs": skeleton["attrs"],
+        "coords": skeleton["coords"],
+        "data_vars": skeleton["data_vars"],
+    }
+    index = utils.station_index(ds, url)
+    if index is not None:
+        meta["timeseries_ids"] = index.ids.tolist()
+    return meta
+
+
+def get(url: str) -> dict:
+    """Return the cached metadata document for *url*."""
+    return METADATA.get_or_create(normalize_url(url), lambda: describe(url, cache.open_dataset(url)))
@@ -0,0 +1,245 @@
+import contextlib
+import contextvars
+import functools
+import math
+import threading
+import time
+from typing import Any, Callable, Iterator
+
+import numpy as np
+import xarray as xr
+from xarray.backends import BackendArray
+from xarray.core import indexing
+
+# Request labels (endpoint, format, host) of the code running now; copied into the data executor
+_LABELS: contextvars.ContextVar[dict[str, str]] = contextvars.ContextVar("xview_metric_labels", default={})
+_REQUEST_LABELS = ("endpoint", "format", "host")
+
+_REGISTRY: list["_Metric"] = []
+# Caches reported on /metrics by name, see ``LRUCache(name=...)``
+CACHES: dict[str, Any] = {}
+
+TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def _key(self, labels: dict[str, Any]) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        with self._lock:
+            samples = list(self._samples())
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.type}\n"
+        return header + "".join(f"{line}\n" for line in samples)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    """A monotonically increasing total per label combination."""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> Iterator[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative ``le`` buckets, with their sum and count."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets=TIME_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        i = int(np.searchsorted(self.buckets, value))
+        with self._lock:
+            counts, total = self._values.get(key, (None, 0.0))
+            if counts is None:
+                counts = [0] * len(self.buckets)
+            counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            counts, _ = self._values.get(self._key(labels), ([0], 0.0))
+            return sum(counts)
+
+    def _samples(self) -> Iterator[str]:
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}"
+
+
+STAGE_SECONDS = Histogram(
+    "xview_stage_seconds",
+    "Time spent in each stage of a request (open_dataset, subset, expand_ragged_tsp, to_json_types, encode)",
+    _REQUEST_LABELS + ("stage",),
+)
+REQUEST_SECONDS = Histogram("xview_request_seconds", "Time to the response headers per endpoint", ("endpoint", "status"))
+UPSTREAM_BYTES = Counter("xview_upstream_bytes_total", "Bytes read from upstream datasets and catalogs", ("host",))
+RESPONSE_BYTES = Counter("xview_response_bytes_total", "Response body bytes sent", _REQUEST_LABELS)
+ROWS = Counter("xview_rows_total", "Table rows emitted by /data", _REQUEST_LABELS)
+RESPONSES = Counter(
+    "xview_responses_total", "Responses by how they were produced (hit, miss, not_modified)", _REQUEST_LABELS + ("cache",)
+)
+
+
+def current_labels() -> dict[str, str]:
+    return _LABELS.get()
+
+
+@contextlib.contextmanager
+def labels(**values: str) -> Iterator[None]:
+    """Attach request labels to the metrics recorded inside the block (and in executor calls made from it)."""
+    token = _LABELS.set({**_LABELS.get(), **values})
+    try:
+        yield
+    finally:
+        _LABELS.reset(token)
+
+
+@contextlib.contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time the block as *name* under the current request labels."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=name, **_LABELS.get())
+
+
+def timed(name: str) -> Callable:
+    """Decorate a function to be timed as stage *name*."""
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def count_stream(iterator: Iterator, charset: str = "utf-8") -> Iterator:
+    """Pass a response body through, timing each chunk as stage ``encode`` and counting the bytes sent.
+
+    The labels are taken when this is called, since the body is produced
+    after the endpoint has returned.
+    """
+    request_labels = _LABELS.get()
+
+    def chunks():
+        while True:
+            token = _LABELS.set(request_labels)
+            try:
+                with stage("encode"):
+                    chunk = next(iterator, None)
+            finally:
+                _LABELS.reset(token)
+            if chunk is None:
+                return
+            RESPONSE_BYTES.inc(len(chunk.encode(charset) if isinstance(chunk, str) else chunk), **request_labels)
+            yield chunk
+
+    return chunks()
+
+
+class _CountedArray(BackendArray):
+    """Count the bytes of every read from *source* as upstream bytes of *host*."""
+
+    def __init__(self, source: xr.Variable, host: str):
+        self.source = source
+        self.host = host
+        self.shape = source.shape
+        self.dtype = source.dtype
+
+    def _getitem(self, key: tuple) -> np.ndarray:
+        values = np.asarray(self.source[key].values)
+        UPSTREAM_BYTES.inc(values.nbytes, host=self.host)
+        return values
+
+    def __getitem__(self, key: indexing.ExplicitIndexer) -> np.ndarray:
+        return indexing.explicit_indexing_adapter(key, self.shape, indexing.IndexingSupport.OUTER, self._getitem)
+
+
+def count_reads(host: str, ds: xr.Dataset) -> xr.Dataset:
+    """Count the bytes read from the variables of a freshly opened *ds* as upstream bytes of *host*.
+
+    Index coordinates are loaded by ``xr.open_dataset`` itself and counted at once.
+    """
+    variables = {}
+    for name, var in ds.variables.items():
+        if name in ds.indexes:
+            UPSTREAM_BYTES.inc(var.nbytes, host=host)
+        elif var.ndim:
+            array = indexing.LazilyIndexedArray(_CountedArray(var, host))
+            variables[name] = xr.Variable(var.dims, array, var.attrs, var.encoding)
+    return ds.assign(variables) if variables else ds
+
+
+def render() -> str:
+    """Return all metrics in the Prometheus text exposition format."""
+    lines = [metric.render() for metric in _REGISTRY]
+    caches = [
+        ("xview_cache_hits_total", "counter", "Cache lookups that found an entry", lambda c: c.hits),
+        ("xview_cache_misses_total", "counter", "Cache lookups that found nothing", lambda c: c.misses),
+        ("xview_cache_entries", "gauge", "Entries currently cached", len),
+        ("xview_cache_bytes", "gauge", "Bytes currently cached, for caches with a byte budget", lambda c: c.nbytes),
+    ]
+    for name, kind, documentation, value in caches:
+        lines.append(f"# HELP {name} {documentation}\n# TYPE {name} {kind}\n")
+        lines.extend(f'{name}{{cache="{_escape(cache)}"}} {value(CACHES[cache])}\n' for cache in sorted(CACHES))
+    return "".join(lines)
@@ -0,0 +1,166 @@
+import hashlib
+import logging
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+from xarray.backends import BackendArray
+from xarray.core import indexing
+
+from xview.config import SETTINGS
+
+logger = logging.getLogger(__name__)
+
+_USAGE_LOCK = threading.Lock()
+# Bytes on disk as last counted by this process, None until the first write
+_usage: int | None = None
+
+
+def _digest(*parts) -> str:
+    return hashlib.sha1("\n".join(map(str, parts)).encode()).hexdigest()
+
+
+def _scan() -> list[tuple[float, int, str]]:
+    """Return ``(mtime, size, path)`` of every chunk in the mirror."""
+    chunks = []
+    for root, _, files in os.walk(SETTINGS.mirror_dir):
+        for name in files:
+            if not name.endswith(".npy"):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            chunks.append((stat.st_mtime, stat.st_size, path))
+    return chunks
+
+
+def _evict() -> int:
+    """Remove the least recently read chunks until the mirror is below 90% of its quota; return bytes in use."""
+    chunks = sorted(_scan())
+    total = sum(size for _, size, _ in chunks)
+    target = SETTINGS.mirror_quota * 0.9
+    for _, size, path in chunks:
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+    return total
+
+
+def _account(nbytes: int) -> None:
+    global _usage
+    with _USAGE_LOCK:
+        if _usage is None:
+            # Other workers write to the same directory; start from what is on disk
+            _usage = sum(size for _, size, _ in _scan())
+        else:
+            _usage += nbytes
+        if _usage > SETTINGS.mirror_quota:
+            _usage = _evict()
+
+
+class MirroredArray(BackendArray):
+    """Read a variable chunk by chunk along its first dimension through the on-disk mirror.
+
+    Chunks are ``.npy`` files read with ``mmap_mode="r"``. Missing rows are
+    read from *source* and the chunk is rewritten atomically, so several
+    workers can share the mirror. Rows at or after *mutable_from* are never
+    stored and always read from *source*.
+    """
+
+    def __init__(self, source: xr.Variable, directory: str, chunk_rows: int, mutable_from: int):
+        self.source = source
+        self.directory = directory
+        self.chunk_rows = chunk_rows
+        self.mutable_from = mutable_from
+        self.shape = source.shape
+        self.dtype = source.dtype
+
+    def _chunk(self, c: int) -> np.ndarray:
+        start, stop = c * self.chunk_rows, min((c + 1) * self.chunk_rows, self.shape[0])
+        stable = max(start, min(stop, self.mutable_from))
+        path = os.path.join(self.directory, f"{c}.npy")
+        try:
+            cached = np.load(path, mmap_mode="r")
+            if cached.shape[0] > stable - start:
+                cached = cached[:0]
+            else:
+                os.utime(path)
+        except (OSError, ValueError):
+            cached = self.source[start:start].values
+
+        if start + cached.shape[0] == stop:
+            return cached
+        # Read what is missing: a whole new chunk, or the rows a grown dataset added to it
+        fetched = np.asarray(self.source[start + cached.shape[0] : stop].values)
+        values = np.concatenate([cached, fetched]) if cached.shape[0] else fetched
+        if stable > start + cached.shape[0]:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, values[: stable - start])
+            os.replace(tmp, path)
+            _account(os.path.getsize(path))
+        return values
+
+    def _rows(self, lo: int, hi: int) -> np.ndarray:
+        first, last = lo // self.chunk_rows, (hi - 1) // self.chunk_rows
+        chunks = [self._chunk(c) for c in range(first, last + 1)]
+        block = chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+        return block[lo - first * self.chunk_rows : hi - first * self.chunk_rows]
+
+    def _getitem(self, key: tuple) -> np.ndarray:
+        rows = range(self.shape[0])[key[0]]
+        if isinstance(rows, int):
+            return np.asarray(self._rows(rows, rows + 1)[0][key[1:]])
+        if len(rows) == 0:
+            return np.asarray(self.source[key].values)
+        lo, hi = min(rows[0], rows[-1]), max(rows[0], rows[-1]) + 1
+        block = self._rows(lo, hi)
+        return np.asarray(block[np.arange(len(rows)) * rows.step + (rows[0] - lo)][(slice(None), *key[1:])])
+
+    def __getitem__(self, key: indexing.ExplicitIndexer) -> np.ndarray:
+        return indexing.explicit_indexing_adapter(key, self.shape, indexing.IndexingSupport.BASIC, self._getitem)
+
+
+def _time_dim(ds: xr.Dataset) -> str | None:
+    return next((dim for dim, index in ds.indexes.items() if isinstance(index, pd.DatetimeIndex)), None)
+
+
+def wrap(key: str, ds: xr.Dataset) -> xr.Dataset:
+    """Route reads of the non-index variables of *ds* through the on-disk mirror.
+
+    Chunk directories are keyed by *key* (the normalized URL), the dataset's
+    ``date_modified`` and ``history`` attrs, the variable's dtype and shape,
+    and the first time step. A dataset that grows along its time dimension
+    keeps its chunks; only the last ``mirror_revalidate`` steps are never
+    mirrored, so late corrections there are still seen. A reprocessed dataset
+    gets new directories, and the old chunks are left to quota eviction.
+    """
+    time_dim = _time_dim(ds)
+    anchor = ds.indexes[time_dim][0] if time_dim is not None and len(ds.indexes[time_dim]) else None
+    version = (ds.attrs.get("date_modified", ""), ds.attrs.get("history", ""))
+    base = os.path.join(SETTINGS.mirror_dir, _digest(key))
+
+    variables = {}
+    for name, var in ds.variables.items():
+        if var.ndim == 0 or var.size == 0 or var.dtype.kind == "O" or name in ds.indexes:
+            continue
+        growing = var.dims[0] == time_dim
+        shape = var.shape[1:] if growing else var.shape
+        row_bytes = max(1, var.dtype.itemsize * int(np.prod(var.shape[1:])))
+        array = MirroredArray(
+            var,
+            os.path.join(base, _digest(name, var.dtype.str, shape, anchor, *version)),
+            chunk_rows=max(1, SETTINGS.mirror_chunk_bytes // row_bytes),
+            mutable_from=var.shape[0] - SETTINGS.mirror_revalidate if growing else var.shape[0],
+        )
+        variables[name] = xr.Variable(var.dims, indexing.LazilyIndexedArray(array), var.attrs, var.encoding)
+    return ds.assign(variables) if variables else ds
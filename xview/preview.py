@@ -0,0 +1,95 @@
+"""The Panel preview server, run separately from the FastAPI app.
+
+    python -m xview.preview --workers 4 --port 5000
+
+Worker ``i`` listens on ``port + i`` under the ``/bokeh`` prefix. A Bokeh
+session lives in the process that created it, so the websocket of a page must
+reach the same worker as its script: list one URL per worker in
+``SETTINGS.bokeh_urls`` and /panel pins each client to one of them.
+"""
+
+import argparse
+import logging
+import multiprocessing
+import multiprocessing.connection
+import signal
+import sys
+import zlib
+
+from xview.config import SETTINGS
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "/bokeh"
+
+
+def worker_urls() -> list[str]:
+    """Base URLs of the preview workers, one per process."""
+    return [url.rstrip("/") for url in SETTINGS.bokeh_urls] or [SETTINGS.bokeh_url.rstrip("/")]
+
+
+def worker_url(client: str) -> str:
+    """Return the preview worker for *client*; the same client always gets the same worker."""
+    urls = worker_urls()
+    return urls[zlib.crc32(client.encode()) % len(urls)]
+
+
+def serve(port: int, address: str = "0.0.0.0") -> None:
+    """Run one preview worker in this process until it is stopped."""
+    import panel as pn
+
+    from xview.viewer import create_app
+
+    pn.extension(template="fast")
+    pn.serve(
+        {"/preview": create_app},
+        port=port,
+        address=address,
+        allow_websocket_origin=[SETTINGS.server_url.split("//")[1], *SETTINGS.bokeh_websocket_origins],
+        show=False,
+        prefix=PREFIX,
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=SETTINGS.bokeh_workers, help="number of worker processes")
+    parser.add_argument("--port", type=int, default=5000, help="port of the first worker")
+    parser.add_argument("--address", default="0.0.0.0")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(module)s.%(funcName)s %(levelname)s - %(message)s",
+        handlers=[logging.StreamHandler(sys.stdout)],
+    )
+    if args.workers <= 1:
+        serve(args.port, args.address)
+        return 0
+
+    # Spawned, so no worker inherits the state of another one's Bokeh server
+    ctx = multiprocessing.get_context("spawn")
+    workers = [
+        ctx.Process(target=serve, args=(args.port + i, args.address), name=f"xview-preview-{i}")
+        for i in range(args.workers)
+    ]
+    for port, worker in enumerate(workers, args.port):
+        worker.start()
+        logger.info("Preview worker %s on port %d (pid %d)", worker.name, port, worker.pid)
+
+    def stop(signum, frame):
+        for worker in workers:
+            worker.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    # One worker exiting takes the pool down, so a supervisor sees it and restarts the whole pool
+    multiprocessing.connection.wait([worker.sentinel for worker in workers])
+    stop(None, None)
+    for worker in workers:
+        worker.join()
+    return max(0, *(worker.exitcode for worker in workers))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+import collections
+import contextlib
+import contextvars
+import functools
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import sys
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Iterator
+
+from xview.cache import LRUCache
+from xview.config import SETTINGS
+
+logger = logging.getLogger(__name__)
+
+ADMIN_HEADER = "x-admin-token"
+PROFILE_HEADER = "x-xview-profile"
+
+# The profile of the request being handled, None for normal traffic
+_CURRENT: contextvars.ContextVar["Profile | None"] = contextvars.ContextVar("xview_profile", default=None)
+_ACTIVE: set["Profile"] = set()
+_ACTIVE_LOCK = threading.Lock()
+_sampler: threading.Thread | None = None
+
+_END = object()
+
+# Finished profiles by id; also written to profile_dir when set
+PROFILES = LRUCache(maxsize=SETTINGS.profile_cache_size, name="profiles")
+
+
+class Profile:
+    """Stack samples of the threads working on one request, in collapsed (folded) form."""
+
+    def __init__(self, endpoint: str, query: dict[str, Any], profile_id: str | None = None):
+        self.id = profile_id or secrets.token_hex(8)
+        self.endpoint = endpoint
+        self.query = query
+        self.started = time.time()
+        self.stacks: collections.Counter[str] = collections.Counter()
+        self.samples = 0
+        self._threads: collections.Counter[int] = collections.Counter()
+        self._lock = threading.Lock()
+        self._finished = False
+
+    @contextlib.contextmanager
+    def attach(self) -> Iterator[None]:
+        """Sample the current thread while inside the block."""
+        ident = threading.get_ident()
+        with self._lock:
+            self._threads[ident] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._threads[ident] -= 1
+                if not self._threads[ident]:
+                    del self._threads[ident]
+
+    def _sample(self, frames: dict[int, Any]) -> None:
+        with self._lock:
+            threads = list(self._threads)
+        stacks = [_collapse(frames[ident]) for ident in threads if ident in frames]
+        with self._lock:
+            self.stacks.update(stacks)
+            self.samples += len(stacks)
+
+    def record(self) -> dict[str, Any]:
+        with self._lock:
+            stacks, samples = self.stacks.most_common(), self.samples
+        return {
+            "id": self.id,
+            "endpoint": self.endpoint,
+            "query": self.query,
+            "started": self.started,
+            "duration": time.time() - self.started,
+            "interval": SETTINGS.profile_interval,
+            "samples": samples,
+            "folded": "".join(f"{stack} {count}\n" for stack, count in stacks),
+        }
+
+    def start(self) -> "Profile":
+        global _sampler
+        with _ACTIVE_LOCK:
+            _ACTIVE.add(self)
+            if _sampler is None:
+                _sampler = threading.Thread(target=_sample_forever, name="xview-profiler", daemon=True)
+                _sampler.start()
+        return self
+
+    def finish(self) -> None:
+        """Stop sampling and store the profile; later calls do nothing."""
+        with _ACTIVE_LOCK:
+            if self._finished:
+                return
+            self._finished = True
+            _ACTIVE.discard(self)
+        record = self.record()
+        PROFILES.put(self.id, record)
+        if SETTINGS.profile_dir:
+            os.makedirs(SETTINGS.profile_dir, exist_ok=True)
+            with open(os.path.join(SETTINGS.profile_dir, f"{self.id}.json"), "w") as f:
+                json.dump(record, f)
+        logger.info("Profile %s of %s %s: %d samples", self.id, self.endpoint, self.query, self.samples)
+
+
+def _collapse(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        qualname = getattr(code, "co_qualname", code.co_name)
+        names.append(f"{qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def _sample_forever() -> None:
+    """Sample the attached threads of all active profiles; exits once none are left."""
+    global _sampler
+    while True:
+        with _ACTIVE_LOCK:
+            if not _ACTIVE:
+                _sampler = None
+                return
+            active = list(_ACTIVE)
+        now = time.time()
+        frames = sys._current_frames()
+        for profile in active:
+            if now - profile.started > SETTINGS.profile_max_seconds:
+                # Abandoned, e.g. the client went away mid-stream
+                profile.finish()
+            else:
+                profile._sample(frames)
+        del frames
+        time.sleep(SETTINGS.profile_interval)
+
+
+def current() -> Profile | None:
+    return _CURRENT.get()
+
+
+@contextlib.contextmanager
+def activate(profile: Profile | None) -> Iterator[None]:
+    """Make *profile* current for the block, so ``traced`` and ``bind`` attach to it."""
+    token = _CURRENT.set(profile)
+    try:
+        yield
+    finally:
+        _CURRENT.reset(token)
+
+
+def traced(func: Callable) -> Callable:
+    """Return *func*, sampled while it runs if a profile is current; unchanged otherwise."""
+    profile = _CURRENT.get()
+    if profile is None:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with profile.attach():
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def bind(iterator: Iterator) -> Iterator:
+    """Return *iterator*, sampled while producing each item if a profile is current; unchanged otherwise."""
+    profile = _CURRENT.get()
+    if profile is None:
+        return iterator
+
+    def items():
+        while True:
+            with profile.attach():
+                item = next(iterator, _END)
+            if item is _END:
+                return
+            yield item
+
+    return items()
+
+
+async def finish_after(profile: Profile, iterator: AsyncIterator) -> AsyncIterator:
+    """Pass a response body through and finish *profile* once it has been sent (or abandoned)."""
+    try:
+        async for chunk in iterator:
+            yield chunk
+    finally:
+        profile.finish()
+
+
+def authorized(token: str | None) -> bool:
+    """Return True if *token* is the admin token; always False while no admin token is configured."""
+    if not SETTINGS.admin_token or not token:
+        return False
+    return hmac.compare_digest(token.encode(), SETTINGS.admin_token.encode())
+
+
+def requested(flag: bool, header_value: str | None) -> bool:
+    """Return True if a request asks for a profile with ``profile=true`` or the X-Xview-Profile header."""
+    return flag or (header_value or "").strip().lower() in ("1", "true", "yes")
+
+
+def _signature(message: str) -> str:
+    return hmac.new(SETTINGS.admin_token.encode(), message.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def sign(profile_id: str) -> str:
+    """Return a token that lets a preview session started from /panel profile itself under *profile_id*."""
+    message = f"{profile_id}.{int(time.time())}"
+    return f"{message}.{_signature(message)}"
+
+
+def verify(token: str | None) -> str | None:
+    """Return the profile id of a token made by ``sign``, or None if it is missing, forged or expired."""
+    if not SETTINGS.admin_token or not token or token.count(".") != 2:
+        return None
+    message, signature = token.rsplit(".", 1)
+    profile_id, issued = message.split(".")
+    if not hmac.compare_digest(signature, _signature(message)) or not issued.isdigit():
+        return None
+    return profile_id if time.time() - int(issued) <= SETTINGS.profile_max_seconds else None
+
+
+def get(profile_id: str) -> dict[str, Any] | None:
+    """Return a finished profile from memory or ``profile_dir``."""
+    record = PROFILES.get(profile_id)
+    if record is not None or not SETTINGS.profile_dir or not profile_id.isalnum():
+        return record
+    try:
+        with open(os.path.join(SETTINGS.profile_dir, f"{profile_id}.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def summaries() -> list[dict[str, Any]]:
+    """Return the stored profiles without their stacks, newest first."""
+    records = {}
+    if SETTINGS.profile_dir and os.path.isdir(SETTINGS.profile_dir):
+        for name in os.listdir(SETTINGS.profile_dir):
+            if name.endswith(".json"):
+                record = get(name[: -len(".json")])
+                if record is not None:
+                    records[record["id"]] = record
+    records.update(PROFILES.items())
+    summaries = [{k: v for k, v in r.items() if k != "folded"} for r in records.values()]
+    return sorted(summaries, key=lambda r: r["started"], reverse=True)
@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from xview import metrics, utils
+
+AGGREGATIONS = ("mean", "min", "max", "count", "median")
+
+# CF cell_methods names; count has none and is given units of 1 instead
+_CELL_METHODS = {"mean": "mean", "min": "minimum", "max": "maximum", "median": "median"}
+_VALUE_ATTRS = ("units", "standard_name", "valid_min", "valid_max", "valid_range", "scale_factor", "add_offset")
+
+
+def check_freq(freq: str) -> None:
+    """Raise ``ValueError`` unless *freq* is a positive pandas frequency such as ``1h`` or ``1D``."""
+    if pd.tseries.frequencies.to_offset(freq).n <= 0:
+        raise ValueError(f"Resample frequency must be positive: {freq}")
+
+
+def _floor(times: np.ndarray, offset: pd.offsets.Tick) -> np.ndarray:
+    """Label every time with its fixed-size *offset* bin, as ``resample`` would with its default ``start_day`` origin.
+
+    Only the bins that hold data are ever formed, however fine *offset* is
+    compared to the span of *times*. NaT stays NaT.
+    """
+    ns = np.asarray(times, dtype="datetime64[ns]").view("int64")
+    valid = ns != np.iinfo(np.int64).min
+    labels = np.full(len(ns), np.iinfo(np.int64).min)
+    if valid.any():
+        origin = pd.Timestamp(ns[valid].min()).normalize().value
+        labels[valid] = origin + (ns[valid] - origin) // offset.nanos * offset.nanos
+    return labels.view("datetime64[ns]")
+
+
+def _bins(times: np.ndarray, freq: str) -> tuple[pd.DatetimeIndex, np.ndarray]:
+    """Return the labels and start positions of the non-empty *freq* bins of sorted *times*."""
+    offset = pd.tseries.frequencies.to_offset(freq)
+    if isinstance(offset, pd.offsets.Tick):
+        labels, starts = np.unique(_floor(times, offset), return_index=True)
+        return pd.DatetimeIndex(labels), starts
+    # Calendar frequencies (weeks, months, ...) are coarse, so binning the whole span stays small
+    counts = pd.Series(np.zeros(len(times)), index=pd.DatetimeIndex(times)).resample(freq).count().astype(int)
+    starts = np.concatenate([[0], np.cumsum(counts.to_numpy())[:-1]])
+    nonempty = counts.to_numpy() > 0
+    return counts.index[nonempty], starts[nonempty]
+
+
+def reduce_bins(values: np.ndarray, starts: np.ndarray, agg: str) -> np.ndarray:
+    """Reduce the contiguous bins of *values* starting at *starts* along axis 0, ignoring NaNs.
+
+    Every aggregation is a handful of ``ufunc.reduceat`` calls (the median
+    sorts each bin once with ``lexsort``), so the cost does not grow with the
+    number of bins. Bins without valid values give NaN, or 0 for count.
+    """
+    shape = values.shape
+    values = values.reshape(len(values), -1)
+    floats = values.dtype.kind == "f"
+    valid = ~np.isnan(values) if floats else np.ones(values.shape, dtype=bool)
+    if agg == "count":
+        result = np.add.reduceat(valid, starts, axis=0, dtype=np.int64)
+    elif agg in ("min", "max") and values.dtype.kind in "iub":
+        result = (np.minimum if agg == "min" else np.maximum).reduceat(values, starts, axis=0)
+    elif agg in ("min", "max"):
+        result = (np.fmin if agg == "min" else np.fmax).reduceat(values, starts, axis=0)
+    else:
+        dtype = np.result_type(values.dtype, np.float32)
+        x = values.astype(np.float64)
+        n = np.add.reduceat(valid, starts, axis=0, dtype=np.int64)
+        if agg == "mean":
+            total = np.add.reduceat(np.where(valid, x, 0.0), starts, axis=0)
+            result = total / np.maximum(n, 1)
+        else:
+            # Sort every bin, NaNs last, and average its two middle valid values
+            ends = np.append(starts[1:], len(x))
+            bins = np.repeat(np.arange(len(starts)), ends - starts)
+            x = np.take_along_axis(x, np.lexsort((x, np.broadcast_to(bins[:, None], x.shape)), axis=0), axis=0)
+            lo = np.maximum(starts[:, None] + (n - 1) // 2, 0)
+            hi = starts[:, None] + n // 2
+            result = (np.take_along_axis(x, lo, axis=0) + np.take_along_axis(x, hi, axis=0)) / 2
+        result = np.where(n > 0, result, np.nan).astype(dtype)
+    return result.reshape((len(starts), *shape[1:]))
+
+
+def _attrs(attrs: dict, dim: str, agg: str) -> dict:
+    if agg == "count":
+        return {**{k: v for k, v in attrs.items() if k not in _VALUE_ATTRS}, "units": "1"}
+    method = f"{dim}: {_CELL_METHODS[agg]}"
+    return {**attrs, "cell_methods": f"{attrs['cell_methods']} {method}" if attrs.get("cell_methods") else method}
+
+
+@metrics.timed("resample")
+def resample(ds: xr.Dataset, freq: str, agg: str = "mean") -> xr.Dataset:
+    """Aggregate *ds* along its time dimension into *freq* bins (a pandas frequency such as ``1h`` or ``1D``).
+
+    Numeric data variables are reduced with *agg*, other variables along time
+    are dropped. Coordinates along time, such as the position of a ship, are
+    averaged. Empty bins are left out and time is labelled as by
+    ``pandas.DataFrame.resample``. Returns *ds* unchanged without a time dimension.
+    """
+    dim = utils.time_dim_name(ds)
+    if not dim or dim not in ds.dims or ds[dim].dtype.kind != "M" or ds.sizes[dim] == 0:
+        return ds
+
+    times = ds[dim].values
+    keep = np.flatnonzero(~np.isnat(times))
+    if len(keep) < len(times) or not pd.Index(times).is_monotonic_increasing:
+        ds = ds.isel({dim: keep[np.argsort(times[keep], kind="stable")]})
+    labels, starts = _bins(ds[dim].values, freq)
+
+    variables, dropped = {}, []
+    for name, var in ds.variables.items():
+        if name == dim or dim not in var.dims:
+            continue
+        if var.dtype.kind not in "iufb":
+            dropped.append(name)
+            continue
+        coord = name in ds.coords
+        how = "mean" if coord else agg
+        axis = var.dims.index(dim)
+        reduced = np.moveaxis(reduce_bins(np.moveaxis(var.values, axis, 0), starts, how), 0, axis)
+        variables[name] = xr.Variable(var.dims, reduced, var.attrs if coord else _attrs(var.attrs, dim, agg))
+
+    out = ds.drop_vars(dropped).isel({dim: starts})
+    out = out.assign_coords({k: v for k, v in variables.items() if k in ds.coords})
+    out = out.assign({k: v for k, v in variables.items() if k not in ds.coords})
+    return out.assign_coords({dim: xr.Variable(dim, labels.values, ds[dim].attrs, ds[dim].encoding)})
+
+
+@metrics.timed("resample")
+def resample_frame(
+    df: pd.DataFrame, time: str, freq: str, agg: str = "mean", by: tuple[str, ...] = (), first: tuple[str, ...] = ()
+) -> pd.DataFrame:
+    """Aggregate the rows of *df* into *freq* bins of column *time*, separately for every combination of *by*.
+
+    Numeric columns are reduced with *agg*; the *first* columns and the
+    non-numeric ones keep their first value per bin. Empty bins are left out.
+    """
+    offset = pd.tseries.frequencies.to_offset(freq)
+    if isinstance(offset, pd.offsets.Tick):
+        bins = pd.Series(_floor(df[time].to_numpy(), offset), index=df.index, name=time)
+    else:
+        bins = pd.Grouper(key=time, freq=freq)
+    grouped = df.groupby([*by, bins], sort=True)
+    rest = [c for c in df.columns if c not in by and c != time]
+    numeric = [c for c in rest if c not in first and df[c].dtype.kind in "iufb"]
+    out = grouped[numeric].agg(agg)
+    if len(numeric) < len(rest):
+        out = out.join(grouped[[c for c in rest if c not in numeric]].first())
+    return out.reset_index()[list(df.columns)]
@@ -0,0 +1,242 @@
+import contextlib
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Iterator
+
+import numpy as np
+import xarray as xr
+
+from xview import timeindex, utils
+from xview.cache import normalize_url
+from xview.config import SETTINGS
+
+logger = logging.getLogger(__name__)
+
+_LOCKS: dict[str, threading.Lock] = {}
+_LOCKS_LOCK = threading.Lock()
+_LAST_SYNC: dict[str, float] = {}
+
+
+def _store_dir(key: str) -> str:
+    return os.path.join(SETTINGS.tail_cache_dir, hashlib.sha1(key.encode()).hexdigest())
+
+
+def _lock(key: str) -> threading.Lock:
+    with _LOCKS_LOCK:
+        return _LOCKS.setdefault(key, threading.Lock())
+
+
+@contextlib.contextmanager
+def _locked(root: str, exclusive: bool) -> Iterator[None]:
+    """Lock the store at *root* against other processes: exclusively to write it, shared to map its files.
+
+    The store is shared by all workers, and a sync may remove the files of the
+    previous generation; ``flock`` is released when the lock file is closed.
+    """
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, "lock"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+
+
+def _schema(ds: xr.Dataset, dim: str) -> dict[str, list] | None:
+    """Return ``{name: [dtype, trailing shape]}`` of the variables along *dim*, or None if they can't be mirrored.
+
+    Every variable using *dim* must have it first and a fixed-size dtype.
+    """
+    schema = {}
+    for name, var in ds.variables.items():
+        if dim not in var.dims:
+            continue
+        if var.dims[0] != dim or var.dtype.kind == "O":
+            return None
+        schema[name] = [var.dtype.str, list(var.shape[1:])]
+    return schema
+
+
+def _read_manifest(root: str) -> dict | None:
+    try:
+        with open(os.path.join(root, "manifest.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_manifest(root: str, manifest: dict) -> None:
+    tmp = os.path.join(root, f"manifest.json.{os.getpid()}")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, os.path.join(root, "manifest.json"))
+
+
+def _path(root: str, manifest: dict, i: int) -> str:
+    return os.path.join(root, f"v{i}.{manifest['generation']}.bin")
+
+
+def _memmap(root: str, manifest: dict, i: int, name: str) -> np.ndarray:
+    dtype, tail = manifest["schema"][name]
+    return np.memmap(_path(root, manifest, i), dtype=np.dtype(dtype), mode="r", shape=(manifest["length"], *tail))
+
+
+def _map(root: str, manifest: dict | None) -> dict[str, np.ndarray] | None:
+    """Map every variable of *manifest*, or return None if nothing is cached. Call with the store locked."""
+    if manifest is None or manifest["length"] == 0:
+        return None
+    return {name: _memmap(root, manifest, i, name) for i, name in enumerate(manifest["schema"])}
+
+
+def _new_generation(root: str, manifest: dict | None, schema: dict, dim: str, offset: int) -> dict:
+    """Start a new set of files; files of the old generation are removed (open maps keep working)."""
+    generation = 0 if manifest is None else manifest["generation"] + 1
+    new = {"dim": dim, "schema": schema, "offset": offset, "length": 0, "generation": generation}
+    for i in range(len(schema)):
+        open(_path(root, new, i), "wb").close()
+    if manifest is not None:
+        for i in range(len(manifest["schema"])):
+            try:
+                os.remove(_path(root, manifest, i))
+            except OSError:
+                pass
+    return new
+
+
+def _write_rows(root: str, manifest: dict, i: int, row: int, values: np.ndarray) -> None:
+    values = np.ascontiguousarray(values)
+    with open(_path(root, manifest, i), "r+b") as f:
+        f.seek(row * (values.nbytes // max(1, len(values))))
+        f.write(values.tobytes())
+
+
+def _compact(root: str, manifest: dict, rows: int) -> dict:
+    """Drop the first *rows* steps by copying the rest into a new generation; no upstream reads."""
+    new = {
+        **manifest,
+        "offset": manifest["offset"] + rows,
+        "length": manifest["length"] - rows,
+        "generation": manifest["generation"] + 1,
+    }
+    for i, name in enumerate(manifest["schema"]):
+        with open(_path(root, new, i), "wb") as f:
+            f.write(np.ascontiguousarray(_memmap(root, manifest, i, name)[rows:]).tobytes())
+        os.remove(_path(root, manifest, i))
+    return new
+
+
+def sync(url: str, ds: xr.Dataset) -> dict | None:
+    """Bring the local tail of *url* up to date with the open dataset *ds* and return its manifest.
+
+    Only steps after the cached ones, plus the last ``tail_cache_revalidate``
+    cached steps (to pick up late corrections), are read from *ds*. Returns
+    None if *ds* has no monotonic datetime dimension, or has variables that
+    can't be stored as fixed-size arrays along it. Call with the store's
+    exclusive lock held (see :func:`open_tail`).
+    """
+    index = timeindex.get(url, ds)
+    if index is None or not index.monotonic or len(index) == 0 or utils.is_ragged_tsp(ds):
+        return None
+    schema = _schema(ds, index.dim)
+    if schema is None:
+        return None
+
+    root = _store_dir(normalize_url(url))
+    os.makedirs(root, exist_ok=True)
+    manifest = _read_manifest(root)
+    n_up = len(index)
+    window_start = int(np.searchsorted(index.values, index.values[-1] - int(SETTINGS.tail_cache_window * 1e9)))
+
+    # Start over when the layout changed or the upstream no longer has all cached steps
+    if manifest is None or manifest["schema"] != schema or manifest["dim"] != index.dim:
+        manifest = _new_generation(root, manifest, schema, index.dim, window_start)
+    elif manifest["offset"] + manifest["length"] > n_up or manifest["offset"] > window_start:
+        manifest = _new_generation(root, manifest, schema, index.dim, window_start)
+
+    names = list(schema)
+    offset, length = manifest["offset"], manifest["length"]
+    first = max(0, length - SETTINGS.tail_cache_revalidate)
+    if length:
+        # Refetch from the first step whose timestamp no longer matches upstream
+        local_time = _memmap(root, manifest, names.index(index.dim), index.dim).astype("datetime64[ns]").view("int64")
+        changed = np.flatnonzero(local_time != index.values[offset : offset + length])
+        if len(changed):
+            first = min(first, int(changed[0]))
+
+    block = SETTINGS.csv_block_size
+    for row in range(first, n_up - offset, block):
+        chunk = ds[names].isel({index.dim: slice(offset + row, min(offset + row + block, n_up))})
+        for i, name in enumerate(names):
+            _write_rows(root, manifest, i, row, chunk[name].values)
+    manifest["length"] = n_up - offset
+    logger.debug("Tail cache %s: refreshed %d of %d steps", url, manifest["length"] - first, manifest["length"])
+
+    if window_start - manifest["offset"] > manifest["length"] // 2:
+        manifest = _compact(root, manifest, window_start - manifest["offset"])
+    _write_manifest(root, manifest)
+    return manifest
+
+
+def open_tail(url: str, ds: xr.Dataset) -> xr.Dataset | None:
+    """Return the cached tail of *url* as a dataset backed by memory-mapped files, syncing first if due.
+
+    Variables along the time dimension come from the local files; the others
+    stay lazy views of *ds*. Returns None when tail caching is disabled or
+    does not apply to *ds*.
+    """
+    if not SETTINGS.tail_cache_dir:
+        return None
+    key = normalize_url(url)
+    root = _store_dir(key)
+    with _lock(key):
+        with _locked(root, exclusive=False):
+            manifest = _read_manifest(root)
+            due = (
+                manifest is None
+                or time.monotonic() - _LAST_SYNC.get(key, -np.inf) > SETTINGS.tail_cache_interval
+                or manifest["offset"] + manifest["length"] > ds.sizes.get(manifest["dim"], 0)
+            )
+            arrays = None if due else _map(root, manifest)
+        if due:
+            with _locked(root, exclusive=True):
+                manifest = sync(url, ds)
+                _LAST_SYNC[key] = time.monotonic()
+                arrays = _map(root, manifest)
+    if arrays is None:
+        return None
+
+    dim, offset = manifest["dim"], manifest["offset"]
+    local = ds.isel({dim: slice(offset, offset + manifest["length"])})
+    for name, array in arrays.items():
+        local[name] = local[name].variable.copy(data=array)
+    return local
+
+
+def _may_cover(url: str, ds: xr.Dataset, start: datetime) -> bool:
+    """Return whether the tail of *url* can cover *start*, judged from its manifest without syncing."""
+    index = timeindex.get(url, ds)
+    if index is None or not index.monotonic or len(index) == 0:
+        return False
+    manifest = _read_manifest(_store_dir(normalize_url(url)))
+    if manifest is not None and manifest["dim"] == index.dim and manifest["offset"] < len(index):
+        first = index.values[manifest["offset"]]
+    else:
+        first = index.values[-1] - int(SETTINGS.tail_cache_window * 1e9)
+    return timeindex._to_epoch_ns(start) >= first
+
+
+def window(url: str, ds: xr.Dataset, start: datetime | None) -> xr.Dataset:
+    """Return the local tail of *url* if it covers everything from *start* on, otherwise *ds*."""
+    if not isinstance(start, datetime) or not SETTINGS.tail_cache_dir or not _may_cover(url, ds, start):
+        return ds
+    local = open_tail(url, ds)
+    if local is None:
+        return ds
+    dim = utils.time_dim_name(local)
+    first = local.indexes[dim][0] if dim in local.indexes else local[dim].values[0]
+    if np.datetime64(timeindex._to_epoch_ns(start), "ns") < np.datetime64(first, "ns"):
+        return ds
+    return local
@@ -0,0 +1,86 @@
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from xview import utils
+from xview.cache import LRUCache, normalize_url
+from xview.config import SETTINGS
+
+
+def _to_epoch_ns(value: datetime) -> int:
+    ts = pd.Timestamp(value)
+    if ts.tz is not None:
+        ts = ts.tz_convert("UTC").tz_localize(None)
+    return ts.as_unit("ns").value
+
+
+@dataclass(eq=False)
+class TimeIndex:
+    """The time coordinate of a dataset as an int64 epoch-nanosecond array.
+
+    Datetime ranges resolve to integer positions with ``searchsorted`` when the
+    coordinate is monotonic, so only the matching ``isel`` slice has to be read.
+    """
+
+    dim: str
+    values: np.ndarray
+    monotonic: bool
+
+    @classmethod
+    def from_dataset(cls, ds: xr.Dataset) -> "TimeIndex | None":
+        """Build the index for the time dimension of *ds*, or None if there is no datetime dimension."""
+        dim_name = utils.time_dim_name(ds)
+        if not dim_name or dim_name not in ds.dims or dim_name not in ds.variables:
+            return None
+        if dim_name in ds.indexes:
+            # Dimension coordinates are already held in memory as a pandas index
+            values = ds.indexes[dim_name].values
+        else:
+            values = ds[dim_name].values
+        if values.dtype.kind != "M":
+            return None
+        values = values.astype("datetime64[ns]").view("int64")
+        return cls(dim=dim_name, values=values, monotonic=bool(np.all(np.diff(values) >= 0)))
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def timestamp(self, i: int) -> pd.Timestamp:
+        return pd.Timestamp(self.values[i], unit="ns")
+
+    @property
+    def min(self) -> pd.Timestamp:
+        return self.timestamp(0) if self.monotonic else pd.Timestamp(self.values.min(), unit="ns")
+
+    @property
+    def max(self) -> pd.Timestamp:
+        return self.timestamp(-1) if self.monotonic else pd.Timestamp(self.values.max(), unit="ns")
+
+    def slice(self, start: datetime | None, end: datetime | None) -> slice | None:
+        """Return the positional slice for ``sel(slice(start, end))``, both ends inclusive.
+
+        Returns None if the coordinate is not monotonic.
+        """
+        if not self.monotonic:
+            return None
+        i0 = 0 if start is None else int(np.searchsorted(self.values, _to_epoch_ns(start), side="left"))
+        i1 = len(self.values) if end is None else int(np.searchsorted(self.values, _to_epoch_ns(end), side="right"))
+        return slice(i0, max(i0, i1))
+
+
+TIME_INDEXES = LRUCache(maxsize=SETTINGS.dataset_cache_size, ttl=SETTINGS.dataset_cache_ttl, name="time_indexes")
+
+
+def get(url: str, ds: xr.Dataset) -> TimeIndex | None:
+    """Return the cached time index for *url*, rebuilding it if *ds* has grown or shrunk."""
+    key = normalize_url(url)
+    index = TIME_INDEXES.get(key)
+    if index is not None and ds.sizes.get(index.dim) == len(index):
+        return index
+    index = TimeIndex.from_dataset(ds)
+    if index is not None:
+        TIME_INDEXES.put(key, index)
+    return index
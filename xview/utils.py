@@ -1,3 +1,5 @@
+import fnmatch
+
 import xarray as xr
 import cf_xarray  # noqa: F401 – registers the .cf accessor
 import numpy as np
@@ -6,12 +8,11 @@ from datetime import datetime, timedelta
 from dataclasses import dataclass
 import pandas as pd
 
-import os
-import requests
+import asyncio
 
-import elementpath
-from lxml import etree
-from urllib.parse import urlparse
+from xview import catalog, metrics
+from xview.cache import LRUCache, normalize_url
+from xview.config import SETTINGS
 
 
 def time_dim_name(ds: xr.Dataset) -> str:
@@ -46,24 +47,126 @@ def get_timeseries_id_var(ds: xr.Dataset) -> str | None:
     )
 
 
-def subset_by_timeseries_id(ds: xr.Dataset, timeseries_id_value: str) -> xr.Dataset:
+def subset_by_timeseries_id(ds: xr.Dataset, timeseries_id_value: str, url: str | None = None) -> xr.Dataset:
     """Return a dataset subset to the given timeseries_id value.
 
-    Finds the variable with ``cf_role='timeseries_id'``, locates the matching
-    station along its dimension, and returns ``ds.isel(station_dim=idx)``.
+    Finds the variable with ``cf_role='timeseries_id'``, looks the station up
+    in its :class:`StationIndex` (cached per *url* when given), and returns
+    ``ds.isel(station_dim=idx)``.
     If the variable is scalar (0-d) or not found, returns *ds* unchanged.
 
     Raises ``ValueError`` if *timeseries_id_value* is not found.
     """
-    stn_var = get_timeseries_id_var(ds)
-    if stn_var is None or ds[stn_var].ndim == 0:
+    index = station_index(ds, url)
+    if index is None or index.dim is None:
         return ds
-    stn_dim = ds[stn_var].dims[0]
-    values = _decode_bytes(ds[stn_var].values)
-    idx_arr = np.where(values == timeseries_id_value)[0]
-    if len(idx_arr) == 0:
+    if timeseries_id_value not in index.positions:
         raise ValueError(f"timeseries_id '{timeseries_id_value}' not found in dataset")
-    return ds.isel({stn_dim: int(idx_arr[0])})
+    return ds.isel({index.dim: int(index.positions[timeseries_id_value][0])})
+
+
+def parse_timeseries_ids(value: str | None) -> list[str] | None:
+    """Split a ``timeseries-id`` query value into its comma separated ids and patterns; None if there are none."""
+    return [v.strip() for v in (value or "").split(",") if v.strip()] or None
+
+
+def _is_pattern(selector: str) -> bool:
+    return any(c in selector for c in "*?[")
+
+
+def _match_patterns(ids: np.ndarray, patterns: list[str]) -> np.ndarray:
+    regex = "|".join(fnmatch.translate(p) for p in patterns)
+    return np.flatnonzero(np.asarray(pd.Index(ids).str.match(regex), dtype=bool))
+
+
+def match_timeseries_ids(ids: np.ndarray, selectors: list[str]) -> np.ndarray:
+    """Return the sorted positions of *ids* equal to one of *selectors* or matching one of its glob patterns.
+
+    Entries containing ``*``, ``?`` or ``[`` are patterns (see :mod:`fnmatch`).
+    All selectors are resolved in one vectorized pass over *ids*.
+    """
+    ids = np.asarray(ids).astype(str)
+    patterns = [s for s in selectors if _is_pattern(s)]
+    mask = np.isin(ids, [s for s in selectors if s not in patterns])
+    if patterns:
+        mask[_match_patterns(ids, patterns)] = True
+    return np.flatnonzero(mask)
+
+
+@dataclass(eq=False)
+class StationIndex:
+    """The ``cf_role='timeseries_id'`` values of a dataset as strings, with a hash map from id to its positions.
+
+    ``dim`` is None when the id variable is scalar (a single-station dataset).
+    """
+
+    var: str
+    dim: str | None
+    ids: np.ndarray
+    positions: dict[str, np.ndarray]
+
+    @classmethod
+    def from_dataset(cls, ds: xr.Dataset) -> "StationIndex | None":
+        """Build the index of *ds*, or None if it has no timeseries_id variable."""
+        var = get_timeseries_id_var(ds)
+        if var is None:
+            return None
+        # Selectors are strings, so numeric ids are matched by their text as in match_timeseries_ids
+        ids = np.atleast_1d(_decode_bytes(ds[var].values)).astype(str)
+        # Duplicated ids map to every position they occur at, in order
+        positions = pd.Series(ids).groupby(ids).indices
+        return cls(var=var, dim=ds[var].dims[0] if ds[var].ndim else None, ids=ids, positions=positions)
+
+    def match(self, selectors: list[str]) -> np.ndarray:
+        """Return the sorted positions of the stations matching *selectors* (see :func:`match_timeseries_ids`)."""
+        patterns = [s for s in selectors if _is_pattern(s)]
+        exact = [self.positions[s] for s in selectors if s not in patterns and s in self.positions]
+        found = _match_patterns(self.ids, patterns) if patterns else np.empty(0, dtype=int)
+        return np.union1d(np.concatenate([np.empty(0, dtype=int), *exact]), found)
+
+
+STATION_INDEXES = LRUCache(maxsize=SETTINGS.dataset_cache_size, ttl=SETTINGS.dataset_cache_ttl, name="station_indexes")
+
+
+def station_index(ds: xr.Dataset, url: str | None = None) -> StationIndex | None:
+    """Return the station index of *ds*, cached for *url* and rebuilt when its stations change.
+
+    Without *url* the index is built afresh. Only pass *url* with the full
+    dataset opened from it, not with a station subset.
+    """
+    if url is None:
+        return StationIndex.from_dataset(ds)
+    key = normalize_url(url)
+    index = STATION_INDEXES.get(key)
+    if (
+        index is None
+        or index.var not in ds
+        or (index.dim is not None and ds.sizes.get(index.dim) != len(index.ids))
+    ):
+        index = StationIndex.from_dataset(ds)
+        if index is not None:
+            STATION_INDEXES.put(key, index)
+    return index
+
+
+def subset_by_timeseries_ids(ds: xr.Dataset, selectors: list[str], url: str | None = None) -> xr.Dataset:
+    """Return *ds* subset to every station matching *selectors* (see :func:`match_timeseries_ids`).
+
+    The station dimension is kept, and all stations are taken with one
+    ``isel`` with an index array, so each variable is read once. Stations
+    are looked up in the :class:`StationIndex` cached for *url*. If the
+    ``cf_role='timeseries_id'`` variable is scalar (0-d) or not found,
+    returns *ds* unchanged.
+
+    Raises ``ValueError`` if no station matches.
+    """
+    index = station_index(ds, url)
+    if index is None or index.dim is None:
+        return ds
+    idx = index.match(selectors)
+    if len(idx) == 0:
+        raise ValueError(f"No timeseries_id matching '{','.join(selectors)}' found in dataset")
+    return ds.isel({index.dim: idx})
 
 
 def is_ragged_tsp(ds: xr.Dataset) -> bool:
@@ -89,32 +192,59 @@ def ragged_counting_vars(ds: xr.Dataset) -> tuple[str | None, str | None]:
     return row_size_var, station_index_var
 
 
+def ragged_depth_var(ds: xr.Dataset) -> str | None:
+    """Return the obs-level depth variable of a ragged-array dataset, or None."""
+    row_size_var, _ = ragged_counting_vars(ds)
+    obs_dim = ds[row_size_var].attrs["sample_dimension"]
+    return next(
+        (v for v in list(ds.data_vars) + list(ds.coords)
+         if v in ds and ds[v].dims == (obs_dim,)
+         and ds[v].attrs.get("standard_name", "") in ("depth", "altitude", "height")),
+        next((v for v in ("depth", "DEPTH", "z", "altitude") if v in ds and ds[v].dims == (obs_dim,)), None),
+    )
+
+
+def _decode_one(value: bytes) -> str:
+    try:
+        return value.decode("utf-8")
+    except UnicodeDecodeError:
+        return value.decode("latin-1")
+
+
 def _decode_bytes(arr: np.ndarray) -> np.ndarray:
     """Decode a numpy array of byte strings to Unicode strings.
 
-    Tries UTF-8 first, falls back to Latin-1 (covers Norwegian/Western-European
-    characters stored as single-byte encodings, e.g. ``ø`` = 0xf8 in Latin-1).
+    All entries are decoded in bulk by widening every byte to a code point,
+    which is exact for ASCII and Latin-1. Only entries with non-ASCII bytes are
+    then decoded one by one, as UTF-8 where valid and otherwise kept as Latin-1
+    (Norwegian/Western-European characters stored as single-byte encodings,
+    e.g. ``ø`` = 0xf8 in Latin-1). Object arrays are decoded where they hold
+    bytes; other arrays are returned unchanged.
     """
     if arr.dtype.kind == "S":
-        # Fixed-length byte strings (b'...')
-        try:
-            return arr.astype("U")
-        except UnicodeDecodeError:
-            return np.array([v.decode("latin-1") for v in arr])
+        flat = np.ascontiguousarray(arr).reshape(-1)
+        codes = flat.view(np.uint8).reshape(len(flat), arr.itemsize)
+        out = codes.astype(np.uint32).view(f"U{arr.itemsize}").reshape(-1)
+        for i in np.flatnonzero((codes >= 0x80).any(axis=1)):
+            try:
+                out[i] = flat[i].decode("utf-8")
+            except UnicodeDecodeError:
+                pass
+        return out.reshape(arr.shape)
     if arr.dtype == object:
-        decoded = []
-        for v in arr:
-            if isinstance(v, (bytes, np.bytes_)):
-                try:
-                    decoded.append(v.decode("utf-8"))
-                except UnicodeDecodeError:
-                    decoded.append(v.decode("latin-1"))
-            else:
-                decoded.append(v)
-        return np.array(decoded, dtype=object)
+        kind = pd.api.types.infer_dtype(arr.reshape(-1), skipna=True)
+        if kind == "bytes":
+            out = arr.copy()
+            present = ~pd.isna(arr)
+            out[present] = _decode_bytes(arr[present].astype("S"))
+            return out
+        if kind.startswith("mixed"):
+            decoded = [_decode_one(v) if isinstance(v, (bytes, np.bytes_)) else v for v in arr.reshape(-1)]
+            return np.array(decoded, dtype=object).reshape(arr.shape)
     return arr
 
 
+@metrics.timed("expand_ragged_tsp")
 def expand_ragged_tsp(ds: xr.Dataset) -> pd.DataFrame:
     """Expand a ragged-array timeSeriesProfile dataset into a flat DataFrame.
 
@@ -144,44 +274,309 @@ def expand_ragged_tsp(ds: xr.Dataset) -> pd.DataFrame:
             if ds[v].dims == (instance_dim,):
                 result[v] = _decode_bytes(ds[v].values)[stn_of_obs]
 
+    # Byte strings are decoded before broadcasting, once per station or profile
     for v in list(ds.data_vars) + list(ds.coords):
         if v not in ds or v in skip:
             continue
         if ds[v].dims == (profile_dim,):
-            result[v] = ds[v].values[profile_of_obs]
+            result[v] = _decode_bytes(ds[v].values)[profile_of_obs]
 
     for v in list(ds.data_vars) + list(ds.coords):
         if v not in ds or v == row_size_var:
             continue
         if ds[v].dims == (obs_dim,):
-            result[v] = ds[v].values
+            result[v] = _decode_bytes(ds[v].values)
+
+    return pd.DataFrame(result)
+
+
+@dataclass
+class RaggedTSP:
+    """An expanded ragged timeSeriesProfile with CSR-style offsets into ``df``.
+
+    Rows of ``df`` are grouped by station (stable, so profile order is kept
+    within a station). The observations of ``station_ids[i]`` are
+    ``df.iloc[station_offsets[i]:station_offsets[i + 1]]`` and those of the
+    ``j``-th profile in that order are ``df.iloc[profile_offsets[j]:profile_offsets[j + 1]]``;
+    ``profile_order[j]`` is that profile's index in the dataset.
+    """
+
+    df: pd.DataFrame
+    station_ids: np.ndarray
+    station_offsets: np.ndarray
+    profile_offsets: np.ndarray
+    profile_order: np.ndarray
+
+    def __post_init__(self):
+        self._lookup = {sid: i for i, sid in enumerate(self.station_ids.tolist())}
+
+    def station(self, timeseries_id: str) -> pd.DataFrame:
+        """Return the rows of one station as a slice; raises ``KeyError`` if unknown."""
+        i = self._lookup[timeseries_id]
+        return self.df.iloc[self.station_offsets[i] : self.station_offsets[i + 1]]
+
+
+def expand_ragged_tsp_indexed(ds: xr.Dataset) -> RaggedTSP:
+    """Expand a ragged-array timeSeriesProfile and index it by station and profile.
+
+    Single-station layouts (no ``instance_dimension`` variable) get one
+    station covering all rows.
+    """
+    return read_ragged_tsp(ds)
+
+
+def _fetch_obs(var: xr.DataArray, obs_dim: str, blocks: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """Read the given ``[start, stop)`` *blocks* of an obs variable and pick *positions* from them."""
+    if len(blocks) == 1 and blocks[0, 0] == 0 and blocks[0, 1] == var.sizes[obs_dim]:
+        values = var.values
+    elif len(blocks) == 0:
+        values = var.values[:0]
+    else:
+        values = np.concatenate([var.isel({obs_dim: slice(a, b)}).values for a, b in blocks])
+    return values[positions]
+
+
+@dataclass
+class _RaggedSelection:
+    """Profiles of a ragged timeSeriesProfile picked by station and profile-level time."""
+
+    obs_dim: str
+    profile_dim: str
+    instance_dim: str | None
+    time_var: str | None
+    obs_start: np.ndarray
+    stn_of_profile: np.ndarray
+    station_ids: np.ndarray
+    order: np.ndarray
+
+    @property
+    def sizes(self) -> np.ndarray:
+        return np.diff(self.obs_start)[self.order]
+
+
+def _select_ragged_profiles(
+    ds: xr.Dataset,
+    timeseries_ids: list[str] | None,
+    start: datetime | None,
+    end: datetime | None,
+    url: str | None = None,
+) -> _RaggedSelection:
+    """Resolve station and time predicates on the station and profile variables only.
+
+    Stations are looked up in the :class:`StationIndex` cached for *url*.
+    The selected profiles are stably sorted by station.
+
+    Raises ``ValueError`` if *timeseries_ids* matches no station, as
+    :func:`subset_by_timeseries_ids` does.
+    """
+    row_size_var, station_index_var = ragged_counting_vars(ds)
+    if row_size_var is None:
+        raise ValueError("No variable with 'sample_dimension' attribute found in dataset")
+
+    profile_dim = ds[row_size_var].dims[0]
+    row_sizes = ds[row_size_var].values.astype(int)
+
+    instance_dim = None
+    if station_index_var is not None:
+        instance_dim = ds[station_index_var].attrs["instance_dimension"]
+        stn_of_profile = ds[station_index_var].values.astype(int)
+        n_stations = ds.sizes[instance_dim]
+    else:
+        stn_of_profile = np.zeros(len(row_sizes), dtype=int)
+        n_stations = 1
+
+    index = station_index(ds, url)
+    station_ids = index.ids if index is not None else np.arange(n_stations).astype(str)
+
+    mask = np.ones(len(row_sizes), dtype=bool)
+    if timeseries_ids is not None:
+        if index is not None:
+            matched = index.match(timeseries_ids)
+        else:
+            matched = match_timeseries_ids(station_ids, timeseries_ids)
+        if len(matched) == 0:
+            raise ValueError(f"No timeseries_id matching '{','.join(timeseries_ids)}' found in dataset")
+        mask &= np.isin(stn_of_profile, matched)
+    time_var = next((v for v in ("time", "TIME") if v in ds), None)
+    if time_var is not None and ds[time_var].dims == (profile_dim,) and (start is not None or end is not None):
+        times = ds[time_var].values
+        if start is not None:
+            mask &= times >= np.datetime64(start)
+        if end is not None:
+            mask &= times <= np.datetime64(end)
+
+    selected = np.flatnonzero(mask)
+    return _RaggedSelection(
+        obs_dim=ds[row_size_var].attrs["sample_dimension"],
+        profile_dim=profile_dim,
+        instance_dim=instance_dim,
+        time_var=time_var,
+        obs_start=np.concatenate([[0], np.cumsum(row_sizes)]),
+        stn_of_profile=stn_of_profile,
+        station_ids=station_ids,
+        order=selected[np.argsort(stn_of_profile[selected], kind="stable")],
+    )
+
+
+def ragged_tsp_columns(ds: xr.Dataset, variables: set[str] | None = None) -> list[str]:
+    """Return the columns :func:`read_ragged_tsp` produces, in order.
+
+    Station-level variables come first, then profile-level, then obs-level.
+    With *variables* set, data variables that are not coordinates, not
+    ``cf_role`` variables and not requested are left out.
+    """
+    row_size_var, station_index_var = ragged_counting_vars(ds)
+    obs_dim = ds[row_size_var].attrs["sample_dimension"]
+    profile_dim = ds[row_size_var].dims[0]
+    instance_dim = ds[station_index_var].attrs["instance_dimension"] if station_index_var is not None else None
+
+    def keep(v):
+        return variables is None or v in variables or v not in ds.data_vars or ds[v].attrs.get("cf_role")
+
+    names = [v for v in list(ds.data_vars) + list(ds.coords) if v in ds and keep(v)]
+    columns = [v for v in names if instance_dim is not None and ds[v].dims == (instance_dim,)]
+    columns += [v for v in names if v not in (row_size_var, station_index_var) and ds[v].dims == (profile_dim,)]
+    columns += [v for v in names if v != row_size_var and ds[v].dims == (obs_dim,)]
+    return columns
+
+
+# Reported under the same stage as the full expansion it replaces on /data
+@metrics.timed("expand_ragged_tsp")
+def read_ragged_tsp(
+    ds: xr.Dataset,
+    variables: set[str] | None = None,
+    timeseries_ids: list[str] | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    max_gap: int = 1024,
+    url: str | None = None,
+) -> RaggedTSP:
+    """Expand only the requested part of a ragged-array timeSeriesProfile.
+
+    Station and time predicates are resolved on the small station and profile
+    variables first (``stationIndex``, ``rowSize`` offsets and a profile-level
+    ``time``/``TIME``), so only the matching obs ranges are read. Ranges less
+    than *max_gap* apart are fetched together. With *variables* set, data
+    variables that are not coordinates, not ``cf_role`` variables and not
+    requested are skipped entirely. An obs-level time is filtered after reading.
+    Stations are looked up in the :class:`StationIndex` cached for *url*.
+
+    Rows are grouped by station as in :class:`RaggedTSP`, with offsets
+    relative to the returned frame. Raises ``ValueError`` if *timeseries_ids*
+    matches no station.
+    """
+    sel = _select_ragged_profiles(ds, timeseries_ids, start, end, url)
+    order, sizes, obs_start = sel.order, sel.sizes, sel.obs_start
+    n_stations = len(sel.station_ids)
+    profile_offsets = np.concatenate([[0], np.cumsum(sizes)])
+    n_rows = profile_offsets[-1]
+    obs_idx = np.repeat(obs_start[order] - profile_offsets[:-1], sizes) + np.arange(n_rows)
+    row_profile = np.repeat(np.arange(len(order)), sizes)
+    stn_of_row = sel.stn_of_profile[order][row_profile]
+
+    # Coalesce the selected obs into blocks, bridging gaps up to max_gap
+    if n_rows:
+        run_starts = np.sort(obs_start[order][sizes > 0])
+        run_ends = np.sort(obs_start[order][sizes > 0] + sizes[sizes > 0])
+        breaks = np.flatnonzero(run_starts[1:] - run_ends[:-1] > max_gap)
+        blocks = np.column_stack([run_starts[np.r_[0, breaks + 1]], run_ends[np.r_[breaks, len(run_ends) - 1]]])
+        block_len = blocks[:, 1] - blocks[:, 0]
+        block_of_row = np.searchsorted(blocks[:, 0], obs_idx, side="right") - 1
+        positions = obs_idx - blocks[block_of_row, 0] + np.concatenate([[0], np.cumsum(block_len)])[block_of_row]
+    else:
+        blocks = np.empty((0, 2), dtype=int)
+        positions = obs_idx
+
+    result: dict[str, np.ndarray] = {}
+    for v in ragged_tsp_columns(ds, variables):
+        if ds[v].dims == (sel.instance_dim,):
+            result[v] = _decode_bytes(ds[v].values)[stn_of_row]
+        elif ds[v].dims == (sel.profile_dim,):
+            result[v] = _decode_bytes(ds[v].values[order])[row_profile]
+        else:
+            result[v] = _decode_bytes(_fetch_obs(ds[v], sel.obs_dim, blocks, positions))
 
     df = pd.DataFrame(result)
 
-    # Ensure any remaining byte-string columns are decoded to str
-    for col in df.columns:
-        if df[col].dtype.kind == "S" or (
-            df[col].dtype == object and df[col].apply(lambda v: isinstance(v, (bytes, np.bytes_))).any()
-        ):
-            df[col] = _decode_bytes(df[col].values)
+    time_var = sel.time_var
+    if time_var is not None and ds[time_var].dims == (sel.obs_dim,) and (start is not None or end is not None):
+        obs_time = result[time_var] if time_var in result else _fetch_obs(ds[time_var], sel.obs_dim, blocks, positions)
+        rows = np.ones(len(df), dtype=bool)
+        if start is not None:
+            rows &= obs_time >= np.datetime64(start)
+        if end is not None:
+            rows &= obs_time <= np.datetime64(end)
+        df = df[rows].reset_index(drop=True)
+        row_profile, stn_of_row = row_profile[rows], stn_of_row[rows]
+        profile_offsets = np.concatenate([[0], np.cumsum(np.bincount(row_profile, minlength=len(order)))])
+
+    station_offsets = np.concatenate([[0], np.cumsum(np.bincount(stn_of_row, minlength=n_stations))])
+    return RaggedTSP(
+        df=df,
+        station_ids=sel.station_ids,
+        station_offsets=station_offsets,
+        profile_offsets=profile_offsets,
+        profile_order=order,
+    )
+
+
+def ragged_tsp_schema(
+    ds: xr.Dataset,
+    variables: set[str] | None = None,
+    timeseries_ids: list[str] | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    url: str | None = None,
+) -> dict[str, np.ndarray]:
+    """Return placeholder columns with the names, dtypes and length :func:`read_ragged_tsp` would give.
+
+    Only the station and profile variables are read, plus an obs-level time
+    when it has to be filtered on. The columns are zero-stride views, so they
+    cost no memory whatever the length.
+    """
+    sel = _select_ragged_profiles(ds, timeseries_ids, start, end, url)
+    n_rows = int(sel.sizes.sum())
 
-    return df
+    time_var = sel.time_var
+    if time_var is not None and ds[time_var].dims == (sel.obs_dim,) and (start is not None or end is not None):
+        profile_offsets = np.concatenate([[0], np.cumsum(sel.sizes)])
+        obs_idx = np.repeat(sel.obs_start[sel.order] - profile_offsets[:-1], sel.sizes) + np.arange(n_rows)
+        times = ds[time_var].values[obs_idx]
+        rows = np.ones(n_rows, dtype=bool)
+        if start is not None:
+            rows &= times >= np.datetime64(start)
+        if end is not None:
+            rows &= times <= np.datetime64(end)
+        n_rows = int(rows.sum())
 
+    return {v: np.broadcast_to(np.zeros((), dtype=ds[v].dtype), (n_rows,)) for v in ragged_tsp_columns(ds, variables)}
 
+
+@metrics.timed("subset")
 def subset(
     ds: xr.Dataset,
     vars,
     start: Optional[int | datetime],
     end: Optional[int | datetime],
     step: Optional[int],
+    time_index=None,
 ) -> xr.Dataset:
+    """Select variables and a time range (by datetime or index) from *ds*.
+
+    With a ``timeindex.TimeIndex`` for the time dimension, datetime ranges are
+    resolved to positions locally instead of going through ``ds.sel``.
+    """
     if vars:
         ds = ds[[v for v in ds.data_vars if v in vars]]
     dim_name = time_dim_name(ds)
     if not dim_name:
         return ds
-    if isinstance(start, datetime):
-        ds = ds.sel({dim_name: slice(start, end)})
+    if isinstance(start, datetime) or isinstance(end, datetime):
+        positions = time_index.slice(start, end) if time_index is not None and time_index.dim == dim_name else None
+        if positions is not None:
+            ds = ds.isel({dim_name: positions})
+        else:
+            ds = ds.sel({dim_name: slice(start, end)})
         return ds.isel({dim_name: slice(None, None, step)})
     else:
         return ds.isel({dim_name: slice(start, end, step)})
@@ -201,6 +596,7 @@ def datetime_with_attrs(ds, var) -> xr.Dataset:
     return ds
 
 
+@metrics.timed("to_json_types")
 def to_json_types(ds: xr.Dataset, fill_nan: bool = True) -> xr.Dataset:
     for var in ds.data_vars:
         if ds[var].dtype.kind == "M":
@@ -218,27 +614,9 @@ def to_json_types(ds: xr.Dataset, fill_nan: bool = True) -> xr.Dataset:
 
 
 def walk_catalog(catalog_base: str) -> dict[str,list]:
-    catalog_url = f"{urlparse(catalog_base).scheme}://{urlparse(catalog_base).netloc}"
-    catalogs = [catalog_base]
-    dap_lookup = {}
-    datasets = {}
-    while catalogs:
-        cat = catalogs.pop(0)
-        base = cat.rsplit(".", 1)[0]
-        cat_doc = etree.fromstring(requests.get(cat).content)
-        name = os.path.basename(cat).split(".")[0]
-        datasets[name] = []
-        for el in cat_doc:
-            if el.tag.endswith("catalogRef"):
-                catalogs.append(f"{base}/{el.get('{http://www.w3.org/1999/xlink}href')}")
-            elif el.tag.endswith("service"):
-                services = elementpath.select(el, "//*[lower-case(@serviceType)='opendap']")
-                if services:
-                    for service in services:
-                        dap_lookup[service.getparent().get("name")] = service.get("base")
-            elif el.tag.endswith("dataset"):
-                for t in el:
-                    if t.tag.endswith("serviceName") and t.text in dap_lookup:
-                        datasets[name].append(f"{catalog_url}{dap_lookup[t.text]}{el.get('urlPath')}")
-    
-    return datasets
\ No newline at end of file
+    """Crawl a THREDDS catalog tree and return ``{catalog_name: [opendap_urls]}``.
+
+    Blocking wrapper around :func:`xview.catalog.crawl_catalog`; await that
+    directly from async code.
+    """
+    return asyncio.run(catalog.crawl_catalog(catalog_base))
@@ -1,5 +1,6 @@
 import hvplot.xarray
 import hvplot.pandas
+import holoviews as hv
 import panel as pn
 import cf_xarray
 import geoviews as gv
@@ -7,14 +8,56 @@ import numpy as np
 import xarray as xr
 import urllib.parse
 import pandas as pd
+import contextlib
 from datetime import datetime, timedelta
 
 
-from xview import utils
+from xview import cache, downsample, profiling, tailcache, timeindex, utils
 from xview.config import SETTINGS
 from dataclasses import dataclass
 
-DEFAULT_N_POINTS = 100000
+
+def _nbytes(obj, seen: set[int] | None = None) -> int:
+    """Estimate the bytes of data held by a cached plot, selection or expanded dataset."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True).sum())
+    if isinstance(obj, (xr.DataArray, xr.Dataset, np.ndarray)):
+        return int(obj.nbytes)
+    if isinstance(obj, utils.RaggedTSP):
+        arrays = (obj.station_ids, obj.station_offsets, obj.profile_offsets, obj.profile_order)
+        return _nbytes(obj.df, seen) + sum(a.nbytes for a in arrays)
+    if isinstance(obj, dict):
+        return sum(_nbytes(v, seen) for v in obj.values())
+    if isinstance(obj, hv.DynamicMap):
+        return sum(_nbytes(i, seen) for i in obj.callback.inputs) + sum(_nbytes(v, seen) for v in obj.data.values())
+    if isinstance(obj, hv.Element):
+        return _nbytes(obj.data, seen)
+    if isinstance(obj, hv.core.Dimensioned):
+        return sum(_nbytes(v, seen) for v in obj.data.values())
+    return 0
+
+
+# Plots and expanded ragged datasets shared by all preview sessions. Keys hold the dataset URL
+# and sizes instead of the dataset itself, so lookups are cheap and a grown dataset gets new plots
+PLOTS = cache.LRUCache(
+    maxsize=SETTINGS.plot_cache_size,
+    ttl=SETTINGS.dataset_cache_ttl,
+    maxbytes=SETTINGS.plot_cache_bytes,
+    sizeof=_nbytes,
+    name="plots",
+)
+
+
+def _cached(url: str | None, ds: xr.Dataset | None, key: tuple, factory):
+    """Return the plot for (*url*, sizes of *ds*, *key*) from ``PLOTS``, built on a miss; uncached without a URL."""
+    if url is None:
+        return factory()
+    sizes = tuple(ds.sizes.items()) if ds is not None else ()
+    return PLOTS.get_or_create((cache.normalize_url(url), sizes, *key), factory)
 
 
 @dataclass
@@ -24,17 +67,43 @@ class Params:
     start: datetime | int | None
     end: datetime | int | None
     step: str | int = 1
+    max_points: int = SETTINGS.plot_max_points
+    time_index: timeindex.TimeIndex | None = None
 
 
 def create_app():
+    profile_id = profiling.verify(pn.state.session_args.get("profile", [b""])[0].decode("utf-8"))
+    if profile_id is None:
+        return _create_app()
+
+    # Sample this thread until the session has loaded, so the initial plots are included
+    query = {k: v[0].decode("utf-8") for k, v in pn.state.session_args.items() if k != "profile"}
+    profile = profiling.Profile("/panel", query, profile_id).start()
+    attached = contextlib.ExitStack()
+    attached.enter_context(profile.attach())
+
+    def finish():
+        attached.close()
+        profile.finish()
+
+    try:
+        app = _create_app()
+    except BaseException:
+        finish()
+        raise
+    pn.state.onload(finish)
+    return app
+
+
+def _create_app():
     url = urllib.parse.unquote(pn.state.session_args.get("url", [None])[0].decode("utf-8"))
-    ds = xr.open_dataset(url)
+    ds = cache.open_dataset(url)
 
     title, info, ds_pane = create_info(ds, url)
 
     if len(ds.dims) == 1 and utils.time_dim_name(ds):
         app = pn.FlexBox()
-        params = query_params(ds)
+        params = query_params(ds, timeindex.get(url, ds))
         map_col, plot_col = discrete_time_widgets(ds, url, params)
         app.extend(
             [title, pn.FlexBox(pn.Column(info, ds_pane, max_width=600), map_col, flex_direction="row"), plot_col]
@@ -60,7 +129,7 @@ def create_app():
 
     if utils.time_dim_name(ds) and utils.depth_dim_name(ds):
         app = pn.FlexBox()
-        params = query_params(ds)
+        params = query_params(ds, timeindex.get(url, ds))
         map_col, plot_col = tsp_orthogonal_widgets(ds, url, params)
         app.extend(
             [title, pn.FlexBox(pn.Column(info, ds_pane, max_width=600), map_col, flex_direction="row"), plot_col]
@@ -92,10 +161,10 @@ def create_info(ds, url):
     return pn.pane.Markdown(info_txt), pn.pane.Markdown(ds_txt), pn.panel(ds)
 
 
-def query_params(ds):
+def query_params(ds, time_index: timeindex.TimeIndex | None = None):
     params = {
         p: pn.state.session_args[p][0].decode("utf-8")
-        for p in ["parameter-name", "start", "end", "step"]
+        for p in ["parameter-name", "start", "end", "step", "max-points"]
         if pn.state.session_args.get(p)
     }
 
@@ -119,12 +188,8 @@ def query_params(ds):
     if "step" in params and params["step"].isdigit():
         params["step"] = int(params["step"])
 
-    if "start" not in params and len(ds[dim_name]) > DEFAULT_N_POINTS:
-        # If the dataset is large and no start time is provided, set a default start time
-        if time_default:
-            params["start"] = pd.to_datetime(ds[dim_name].values[-DEFAULT_N_POINTS])
-        else:
-            params["start"] = -DEFAULT_N_POINTS
+    if "max-points" in params and params["max-points"].isdigit():
+        params["max-points"] = int(params["max-points"])
 
     param_list = [
         f"{ds[v].attrs['long_name']}[{v}]" if "long_name" in ds[v].attrs else v
@@ -134,12 +199,20 @@ def query_params(ds):
     if "parameter-name" not in params:
         params["parameter-name"] = param_list[0] if param_list else None
 
+    if time_index is not None:
+        t_min, t_max, n_times = time_index.min, time_index.max, len(time_index)
+    else:
+        t_min, t_max = pd.to_datetime(ds[dim_name].min().values), pd.to_datetime(ds[dim_name].max().values)
+        n_times = len(ds[dim_name])
+
     return Params(
         current_param=params["parameter-name"],
         param_list=param_list,
-        start=params.get("start", pd.to_datetime(ds[dim_name].min().values) if time_default else 0),
-        end=params.get("end", pd.to_datetime(ds[dim_name].max().values) if time_default else len(ds[dim_name]) - 1),
+        start=params.get("start", t_min if time_default else 0),
+        end=params.get("end", t_max if time_default else n_times - 1),
         step=params.get("step", 1),
+        max_points=params.get("max-points", SETTINGS.plot_max_points),
+        time_index=time_index,
     )
 
 
@@ -165,10 +238,12 @@ def data_links(url, start=None, end=None, step=None, timeseries_id=None):
     return pn.pane.Markdown(txt)
 
 
-@pn.cache
-def sel(ds, dim_name, start, end, step):
+def sel(ds, dim_name, start, end, step, time_index=None):
 
     if isinstance(start, datetime):
+        positions = time_index.slice(start, end) if time_index is not None else None
+        if positions is not None:
+            return ds.isel({dim_name: positions}).isel({dim_name: slice(None, None, step)})
         return ds.sel({dim_name: slice(start, end)}).isel({dim_name: slice(None, None, step)})
 
     return ds.isel({dim_name: slice(start, end, step)})
@@ -184,36 +259,64 @@ def time_dim_name(ds) -> str:
     return utils.time_dim_name(ds)
 
 
-@pn.cache
-def time_plot_widget(variable_selector, ds, dim_name, start, end, step):
+def lttb(da: xr.DataArray, dim_name, max_points):
+    """Reduce a 1-D series to *max_points* with LTTB, keeping its visual shape."""
+    if da.ndim != 1 or da.sizes[dim_name] <= max_points:
+        return da
+    return da.isel({dim_name: downsample.lttb_indices(da[dim_name].values, da.values, max_points)})
+
+
+def time_plot_widget(
+    variable_selector, ds, dim_name, start, end, step, max_points=SETTINGS.plot_max_points, time_index=None, url=None
+):
     var = varname_from_selector(variable_selector)
+    return _cached(
+        url,
+        ds,
+        ("time_plot", var, start, end, step, max_points),
+        lambda: _time_plot(var, ds, dim_name, start, end, step, max_points, time_index, url),
+    )
+
 
+def _time_plot(var, ds, dim_name, start, end, step, max_points, time_index, url):
     point_size = 5
     if ds[var].size < 10000:
         point_size = 50
-    return sel(ds[var], dim_name, start, end, step).hvplot.scatter(
+    source = tailcache.window(url, ds, start) if url else ds
+    if source is not ds:
+        time_index = None
+    return lttb(sel(source[var], dim_name, start, end, step, time_index), dim_name, max_points).hvplot.scatter(
         x=dim_name, size=point_size, sizing_mode="stretch_width", min_height=400, max_height=600, responsive=True
     )
 
 
-@pn.cache
-def map_plot_widget(ds, variable_selector, dim_name, end, start, step, apply_to_map):
-
+def map_plot_widget(ds, variable_selector, dim_name, end, start, step, apply_to_map, time_index=None, url=None):
     var = varname_from_selector(variable_selector)
+    return _cached(
+        url,
+        ds,
+        ("map_plot", var, start, end, step, bool(apply_to_map)),
+        lambda: _map_plot(ds, var, dim_name, end, start, step, apply_to_map, time_index, url),
+    )
+
 
+def _map_plot(ds, var, dim_name, end, start, step, apply_to_map, time_index, url):
     x = ds.cf["longitude"].name
     y = ds.cf["latitude"].name
 
     if isinstance(end, int):
-        end = pd.to_datetime(ds[dim_name].values[end])
+        end = time_index.timestamp(end) if time_index is not None else pd.to_datetime(ds[dim_name].values[end])
 
     if not apply_to_map:
         # use default range
         start = end - timedelta(days=1)
     elif isinstance(start, int):
-        start = pd.to_datetime(ds[dim_name].values[start])
+        start = time_index.timestamp(start) if time_index is not None else pd.to_datetime(ds[dim_name].values[start])
 
-    df = ds.sel({dim_name: slice(start, end)}).isel({dim_name: slice(None, None, step)}).to_dataframe()
+    source = tailcache.window(url, ds, start) if url else ds
+    if source is not ds:
+        time_index = None
+    df = sel(source, dim_name, start, end, step, time_index).to_dataframe()
     if len(df) == 0:
         return pn.pane.Markdown(f"No data in range {start} - {end}")
 
@@ -225,6 +328,10 @@ def map_plot_widget(ds, variable_selector, dim_name, end, start, step, apply_to_
         is_cbar = False
         point_size = 150
 
+    clabel = f"{ds[var].attrs.get('long_name', var)}[{ds[var].attrs.get('units', '')}]"
+    if len(df) > SETTINGS.map_rasterize_threshold:
+        return rasterized_track(df, x, y, var, hover_cols, clabel)
+
     return (
         df.hvplot.points(
             x=x,
@@ -237,31 +344,49 @@ def map_plot_widget(ds, variable_selector, dim_name, end, start, step, apply_to_
             size=point_size,
             height=600,
             colorbar=is_cbar,
-            clabel=f"{ds[var].attrs.get('long_name', var)}[{ds[var].attrs.get('units', '')}]",
+            clabel=clabel,
             min_width=200,
             max_width=800,
         )
     ).opts(default_span=800.0, width=800, responsive=True)
 
 
+def rasterized_track(df, x, y, var, hover_cols, clabel):
+    """Datashade a long track server-side, with hover on an evenly decimated invisible overlay."""
+    raster = df.hvplot.points(
+        x=x,
+        y=y,
+        c=var,
+        geo=True,
+        tiles="OSM",
+        rasterize=True,
+        aggregator="mean",
+        cmap="viridis",
+        height=600,
+        colorbar=True,
+        clabel=clabel,
+        min_width=200,
+        max_width=800,
+    )
+    hover_df = df.iloc[:: max(1, len(df) // SETTINGS.map_hover_points)]
+    hover = hover_df.hvplot.points(x=x, y=y, hover_cols=hover_cols, geo=True, alpha=0, size=15)
+    return (raster * hover).opts(default_span=800.0, width=800, responsive=True)
+
+
 def time_control_widgets(ds, params, dim_name):
     variable_selector = pn.widgets.Select(name="Variable", options=params.param_list, value=params.current_param)
     step_slider = pn.widgets.IntSlider(name="plot every n point", value=params.step, start=1, end=100, step=10)
 
+    index = params.time_index
     if isinstance(params.start, datetime):
-        start_slider = pn.widgets.DatetimeSlider(
-            name="Start Time", start=ds[dim_name].min().values, end=ds[dim_name].max().values, value=params.start
-        )
-        end_slider = pn.widgets.DatetimeSlider(
-            name="End Time", start=ds[dim_name].min().values, end=ds[dim_name].max().values, value=params.end
-        )
+        t_min = index.min if index is not None else ds[dim_name].min().values
+        t_max = index.max if index is not None else ds[dim_name].max().values
+        start_slider = pn.widgets.DatetimeSlider(name="Start Time", start=t_min, end=t_max, value=params.start)
+        end_slider = pn.widgets.DatetimeSlider(name="End Time", start=t_min, end=t_max, value=params.end)
     else:
-        start_slider = pn.widgets.IntSlider(
-            name="Start Range", start=0, end=len(ds[dim_name]) - 1, step=1, value=params.start
-        )
-        end_slider = pn.widgets.IntSlider(
-            name="End Range", start=0, end=len(ds[dim_name]) - 1, step=1, value=params.end
-        )
+        n_times = len(index) if index is not None else len(ds[dim_name])
+        start_slider = pn.widgets.IntSlider(name="Start Range", start=0, end=n_times - 1, step=1, value=params.start)
+        end_slider = pn.widgets.IntSlider(name="End Range", start=0, end=n_times - 1, step=1, value=params.end)
 
     return variable_selector, step_slider, start_slider, end_slider
 
@@ -284,6 +409,9 @@ def discrete_time_widgets(ds: xr.Dataset, url, params: Params):
         start=start_slider,
         end=end_slider,
         step=step_slider,
+        max_points=params.max_points,
+        time_index=params.time_index,
+        url=url,
     )
     download_binding = pn.bind(data_links, url=url, start=start_slider, end=end_slider, step=step_slider)
 
@@ -291,7 +419,7 @@ def discrete_time_widgets(ds: xr.Dataset, url, params: Params):
     apply_to_map = None
     if ds.cf["longitude"].size > 1:
         apply_to_map = pn.widgets.Checkbox(name="Apply to map", value=False)
-        map_title = "### Map Preview (default is 24 hours)"
+        map_title = "### Map Preview (default is 24 hours, long tracks are rasterized)"
     
 
     map_plot = pn.bind(
@@ -303,6 +431,8 @@ def discrete_time_widgets(ds: xr.Dataset, url, params: Params):
         start=start_slider,
         step=step_slider,
         apply_to_map=apply_to_map,
+        time_index=params.time_index,
+        url=url,
     )
 
     controls = [
@@ -316,7 +446,7 @@ def discrete_time_widgets(ds: xr.Dataset, url, params: Params):
     return pn.Column(map_title, map_plot), time_box
 
 
-def _multi_station_map_widget(ds: xr.Dataset, stn_id_var: str) -> pn.viewable.Viewable:
+def _multi_station_map_widget(ds: xr.Dataset, stn_id_var: str, url: str | None = None) -> pn.viewable.Viewable:
     """Static map showing all station locations for a multi-station timeseries dataset."""
     stn_dim = ds[stn_id_var].dims[0]
 
@@ -350,7 +480,7 @@ def _multi_station_map_widget(ds: xr.Dataset, stn_id_var: str) -> pn.viewable.Vi
         "lon": ds[lon_var].values.astype(float),
     })
     if stn_id_var in ds:
-        location_df["station"] = utils._decode_bytes(ds[stn_id_var].values)
+        location_df["station"] = utils.station_index(ds, url).ids
 
     hover_cols = [c for c in ("lat", "lon", "station") if c in location_df.columns]
     plot = location_df.hvplot.points(
@@ -360,22 +490,41 @@ def _multi_station_map_widget(ds: xr.Dataset, stn_id_var: str) -> pn.viewable.Vi
     return pn.Column("### Station Locations", plot)
 
 
-@pn.cache
-def multi_station_time_plot_widget(variable_selector, station, ds, dim_name, start, end, step):
+def multi_station_time_plot_widget(
+    variable_selector,
+    station,
+    ds,
+    dim_name,
+    start,
+    end,
+    step,
+    max_points=SETTINGS.plot_max_points,
+    time_index=None,
+    url=None,
+):
     var = varname_from_selector(variable_selector)
-    ds_sub = utils.subset_by_timeseries_id(ds, station)
+    return _cached(
+        url,
+        ds,
+        ("station_time_plot", var, station, start, end, step, max_points),
+        lambda: _station_time_plot(var, station, ds, dim_name, start, end, step, max_points, time_index, url),
+    )
+
+
+def _station_time_plot(var, station, ds, dim_name, start, end, step, max_points, time_index, url):
+    ds_sub = utils.subset_by_timeseries_id(ds, station, url)
     point_size = 5
     if ds_sub[var].size < 10000:
         point_size = 50
-    return sel(ds_sub[var], dim_name, start, end, step).hvplot.scatter(
+    return lttb(sel(ds_sub[var], dim_name, start, end, step, time_index), dim_name, max_points).hvplot.scatter(
         x=dim_name, size=point_size, sizing_mode="stretch_width", min_height=400, max_height=600, responsive=True
     )
 
 
 def multi_station_time_widgets(ds: xr.Dataset, url: str):
     """Widgets for an orthogonal multi-station timeseries dataset."""
-    stn_id_var = utils.get_timeseries_id_var(ds)
-    stations = utils._decode_bytes(ds[stn_id_var].values).tolist()
+    index = utils.station_index(ds, url)
+    stn_id_var, stations = index.var, index.ids.tolist()
 
     raw = pn.state.session_args.get("timeseries-id", [None])[0]
     selected = raw.decode("utf-8") if raw else stations[0]
@@ -389,9 +538,9 @@ def multi_station_time_widgets(ds: xr.Dataset, url: str):
 
     # Subset to the initial station to derive time-range params; all stations
     # share the same time axis in an orthogonal timeseries dataset.
-    ds_sub = utils.subset_by_timeseries_id(ds, selected)
+    ds_sub = utils.subset_by_timeseries_id(ds, selected, url)
     dim_name = utils.time_dim_name(ds_sub)
-    params = query_params(ds_sub)
+    params = query_params(ds_sub, timeindex.get(url, ds))
 
     variable_selector, step_slider, start_slider, end_slider = time_control_widgets(ds_sub, params, dim_name)
 
@@ -409,6 +558,9 @@ def multi_station_time_widgets(ds: xr.Dataset, url: str):
         start=start_slider,
         end=end_slider,
         step=step_slider,
+        max_points=params.max_points,
+        time_index=params.time_index,
+        url=url,
     )
     download_binding = pn.bind(
         data_links,
@@ -428,7 +580,7 @@ def multi_station_time_widgets(ds: xr.Dataset, url: str):
     time_box = pn.FlexBox(sizing_mode="stretch_width")
     time_box.extend([*controls, download_binding, time_plot])
 
-    return _multi_station_map_widget(ds, stn_id_var), time_box
+    return _multi_station_map_widget(ds, stn_id_var, url), time_box
 
 
 # ---------------------------------------------------------------------------
@@ -436,10 +588,18 @@ def multi_station_time_widgets(ds: xr.Dataset, url: str):
 # ---------------------------------------------------------------------------
 
 
-@pn.cache
-def tsp_heatmap_widget(variable_selector, ds, dim_time, dim_depth, start, end, step):
+def tsp_heatmap_widget(variable_selector, ds, dim_time, dim_depth, start, end, step, time_index=None, url=None):
     var = varname_from_selector(variable_selector)
-    ds_sub = sel(ds, dim_time, start, end, step)
+    return _cached(
+        url,
+        ds,
+        ("heatmap", var, start, end, step),
+        lambda: _heatmap(var, ds, dim_time, dim_depth, start, end, step, time_index),
+    )
+
+
+def _heatmap(var, ds, dim_time, dim_depth, start, end, step, time_index):
+    ds_sub = sel(ds, dim_time, start, end, step, time_index)
     label = f"{ds[var].attrs.get('long_name', var)} [{ds[var].attrs.get('units', '')}]"
     positive_down = ds[dim_depth].attrs.get("positive", "down") == "down"
     return ds_sub[var].hvplot.quadmesh(
@@ -497,6 +657,8 @@ def tsp_orthogonal_widgets(ds: xr.Dataset, url: str, params: Params):
         start=start_slider,
         end=end_slider,
         step=step_slider,
+        time_index=params.time_index,
+        url=url,
     )
     download_binding = pn.bind(data_links, url=url, start=start_slider, end=end_slider, step=step_slider)
 
@@ -516,22 +678,32 @@ def tsp_orthogonal_widgets(ds: xr.Dataset, url: str, params: Params):
 # ---------------------------------------------------------------------------
 
 
-@pn.cache
-def _get_expanded_ragged_df(url: str) -> pd.DataFrame:
-    """Open dataset and expand ragged arrays; result is cached by URL."""
-    ds = xr.open_dataset(url)
-    return utils.expand_ragged_tsp(ds)
+def _get_expanded_ragged(url: str, ds: xr.Dataset) -> utils.RaggedTSP:
+    """Expand the ragged arrays of *ds* with a per-station index; result is cached by URL."""
+    return _cached(url, ds, ("expanded_ragged",), lambda: utils.expand_ragged_tsp_indexed(ds))
 
 
-@pn.cache
 def tsp_ragged_plot_widget(station, variable_selector, url, dim_time, dim_depth, stn_id_var):
-    df = _get_expanded_ragged_df(url)
+    ds = cache.open_dataset(url)
     var = varname_from_selector(variable_selector)
+    return _cached(
+        url,
+        ds,
+        ("ragged_plot", var, station, dim_time, dim_depth, stn_id_var),
+        lambda: _ragged_plot(
+            _get_expanded_ragged(url, ds), station, var, variable_selector, dim_time, dim_depth, stn_id_var
+        ),
+    )
+
 
+def _ragged_plot(ragged, station, var, variable_selector, dim_time, dim_depth, stn_id_var):
     if stn_id_var and station is not None:
-        plot_df = df[df[stn_id_var] == station].copy()
+        try:
+            plot_df = ragged.station(station).copy()
+        except KeyError:
+            plot_df = ragged.df.iloc[:0].copy()
     else:
-        plot_df = df.copy()
+        plot_df = ragged.df.copy()
 
     if len(plot_df) == 0:
         return pn.pane.Markdown("No data for the selected station.")
@@ -563,7 +735,9 @@ def tsp_ragged_plot_widget(station, variable_selector, url, dim_time, dim_depth,
     )
 
 
-def _tsp_ragged_map_widget(ds: xr.Dataset, station_index_var: str | None, stn_id_var: str | None):
+def _tsp_ragged_map_widget(
+    ds: xr.Dataset, station_index_var: str | None, stn_id_var: str | None, url: str | None = None
+):
     """Static map showing all station locations from the ragged dataset."""
     if station_index_var is None:
         return pn.pane.Markdown("### Location\nNo multi-station location data available.")
@@ -590,7 +764,7 @@ def _tsp_ragged_map_widget(ds: xr.Dataset, station_index_var: str | None, stn_id
         {"lat": ds[lat_var].values.astype(float), "lon": ds[lon_var].values.astype(float)}
     )
     if stn_id_var and stn_id_var in ds:
-        location_df["station"] = utils._decode_bytes(ds[stn_id_var].values)
+        location_df["station"] = utils.station_index(ds, url).ids
 
     hover_cols = [c for c in location_df.columns if c in ("lat", "lon", "station")]
     plot = location_df.hvplot.points(
@@ -621,17 +795,7 @@ def tsp_ragged_widgets(ds: xr.Dataset, url: str):
         if ds[v].dims == (obs_dim,) and v not in skip and not v.endswith("_qc")
     ]
 
-    depth_var = next(
-        (v for v in list(ds.data_vars) + list(ds.coords)
-         if v in ds and v not in skip
-         and ds[v].dims == (obs_dim,)
-         and ds[v].attrs.get("standard_name", "") in ("depth", "altitude", "height")),
-        next(
-            (v for v in ("depth", "DEPTH", "z", "altitude")
-             if v in ds and ds[v].dims == (obs_dim,)),
-            None,
-        ),
-    )
+    depth_var = utils.ragged_depth_var(ds)
 
     time_var = next(
         (v for v in list(ds.data_vars) + list(ds.coords)
@@ -655,10 +819,7 @@ def tsp_ragged_widgets(ds: xr.Dataset, url: str):
 
     station_selector = None
     if station_index_var is not None and stn_id_var is not None and stn_id_var in ds:
-        stations = [
-            v.decode("latin-1") if isinstance(v, (bytes, np.bytes_)) else str(v)
-            for v in ds[stn_id_var].values
-        ]
+        stations = utils.station_index(ds, url).ids.tolist()
         raw = pn.state.session_args.get("timeseries-id", [None])[0]
         selected = raw.decode("utf-8") if raw else stations[0]
         if selected not in stations:
@@ -699,6 +860,6 @@ def tsp_ragged_widgets(ds: xr.Dataset, url: str):
     plot_box = pn.FlexBox(sizing_mode="stretch_width")
     plot_box.extend([*controls, download_binding, plot])
 
-    map_col = _tsp_ragged_map_widget(ds, station_index_var, stn_id_var)
+    map_col = _tsp_ragged_map_widget(ds, station_index_var, stn_id_var, url)
     return map_col, plot_box
 